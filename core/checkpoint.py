@@ -0,0 +1,126 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import struct
+import threading
+import numpy as np
+
+ADICAO = b"A"
+REMOCAO = b"R"
+ATUALIZACAO = b"U"  # Registro alterado no log (sem mudança de vetor)
+_CABECALHO = struct.Struct("<cBq")  # operação, nível, ID do registro
+
+
+def gravar_atomico(path: str, dados: bytes):
+    """Grava o arquivo inteiro num temporário e o troca pelo definitivo com rename."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(dados)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def ler_manifesto(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"geracao": 0}
+
+
+def gravar_manifesto(path: str, manifesto: dict):
+    gravar_atomico(path, json.dumps(manifesto, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+class WriteAheadLog:
+    """
+    Log de operações (adições com o vetor e remoções) feitas desde o último
+    checkpoint dos índices.
+
+    Cada entrada é um cabeçalho fixo (operação, nível, ID) seguido do vetor
+    float32 nas adições. Atualizações só registram o ID: o registro novo já
+    está no log e é relido na reaplicação. No checkpoint o arquivo é rotacionado para
+    `.anterior` antes de gravar os índices e só é apagado depois que todos
+    foram trocados; na abertura as entradas dos dois arquivos são
+    reaplicadas. A reaplicação é idempotente, então um checkpoint
+    interrompido no meio nunca duplica vetores.
+    """
+
+    def __init__(self, path: str, dimensao: int, niveis: tuple):
+        self.path = path
+        self.path_anterior = path + ".anterior"
+        self.dimensao = dimensao
+        self.niveis = niveis
+        self._lock = threading.RLock()
+        self._arquivo = None
+        self.pendentes = 0
+
+    def _abrir_para_escrita(self):
+        if self._arquivo is None:
+            self._arquivo = open(self.path, "ab")
+        return self._arquivo
+
+    def _gravar(self, dados: bytes):
+        with self._lock:
+            f = self._abrir_para_escrita()
+            f.write(dados)
+            f.flush()
+            self.pendentes += 1
+
+    def registrar_adicao(self, registro_id: int, nivel: str, vetor):
+        codigo = self.niveis.index(nivel) if nivel in self.niveis else 0
+        vetor = np.asarray(vetor, dtype=np.float32).reshape(self.dimensao)
+        self._gravar(_CABECALHO.pack(ADICAO, codigo, int(registro_id)) + vetor.tobytes())
+
+    def registrar_remocao(self, registro_ids):
+        self._gravar(b"".join(_CABECALHO.pack(REMOCAO, 0, int(i)) for i in registro_ids))
+
+    def registrar_atualizacao(self, registro_id: int):
+        self._gravar(_CABECALHO.pack(ATUALIZACAO, 0, int(registro_id)))
+
+    def rotacionar(self):
+        """Separa as entradas atuais para o checkpoint; novas entradas vão para um arquivo novo."""
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.close()
+                self._arquivo = None
+            if not os.path.exists(self.path):
+                return
+            if os.path.exists(self.path_anterior):
+                # Um checkpoint anterior falhou: acumula as entradas para a próxima tentativa
+                with open(self.path, "rb") as origem, open(self.path_anterior, "ab") as destino:
+                    destino.write(origem.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.path_anterior)
+            self.pendentes = 0
+
+    def descartar_anterior(self):
+        with self._lock:
+            if os.path.exists(self.path_anterior):
+                os.remove(self.path_anterior)
+
+    def entradas(self):
+        """Percorre (operação, ID, nível, vetor) do arquivo anterior e do atual; ignora uma entrada final incompleta."""
+        tamanho_vetor = self.dimensao * 4
+        for path in (self.path_anterior, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                dados = f.read()
+            pos = 0
+            while pos + _CABECALHO.size <= len(dados):
+                operacao, codigo, registro_id = _CABECALHO.unpack_from(dados, pos)
+                pos += _CABECALHO.size
+                vetor = None
+                if operacao == ADICAO:
+                    if pos + tamanho_vetor > len(dados):
+                        break
+                    vetor = np.frombuffer(dados, dtype=np.float32, count=self.dimensao, offset=pos)
+                    pos += tamanho_vetor
+                elif operacao not in (REMOCAO, ATUALIZACAO):
+                    break  # Lixo no fim do arquivo
+                nivel = self.niveis[codigo] if codigo < len(self.niveis) else self.niveis[0]
+                yield operacao, registro_id, nivel, vetor
@@ -6,13 +6,13 @@ import numpy as np
 import re
 import psutil
 from datetime import datetime
-from core.storage import metadata, faiss_index
+from core.memory_service import get_memory_service
+from core.memory_index import NIVEIS
+from core.memory_filters import CHAVES_ESTRUTURADAS
 from models.embedding import embed_text
 import hashlib
 import glob
-import faiss
-from core.storage import FAISS_INDEX_PATH, METADATA_PATH, CODE_VERSION
-import json
+from core.storage import CODE_VERSION
 from utils.logger import write_monitor_log as log
 from models.llm_manager import ask_with_model
 from models.llm_config import NODE_MODELS_DEFAULT
@@ -45,55 +45,94 @@ def refinar_query_semanticamente(query: str, turnos: list[dict]) -> str:
     return resposta_refinada.strip()
 
 
+# Peso de cada posição da preferência hierárquica na pontuação final
+PESOS_PREFERENCIA = (1.0, 0.85, 0.7)
+# Constante da reciprocal rank fusion (valor usual da literatura)
+RRF_K = 60
+
+def _pontuar(distancia: float, posicao: int) -> float:
+    """Converte a distância L2 em similaridade e aplica o peso da camada."""
+    peso = PESOS_PREFERENCIA[min(posicao, len(PESOS_PREFERENCIA) - 1)]
+    return peso / (1.0 + distancia)
+
 # --- Busca no FAISS e retorna SÓ os índices dos blocos mais relevantes ---
-def consultar_faiss(query: str, k: int = 5, preferencia: str = "curto>medio>longo", filtros: dict = None) -> list[int]:
-    if not os.path.exists(FAISS_INDEX_PATH) or not os.path.exists(METADATA_PATH):
-        return []
+def consultar_faiss(
+    query: str,
+    k: int = 5,
+    preferencia: str = "curto>medio>longo",
+    filtros: dict = None,
+    k_por_nivel: dict[str, int] | None = None,
+    hibrida: bool = True
+) -> list[int]:
+    """
+    Busca em cada camada da preferência com um orçamento próprio de k e
+    funde os resultados por uma pontuação que combina similaridade e camada.
+    Camadas fora da preferência não são consultadas.
 
-    index = faiss.read_index(FAISS_INDEX_PATH)
-    with open(METADATA_PATH, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
+    `filtros` aceita nivel, tags, active_window, inicio e fim, aplicados dentro
+    da busca vetorial; outras chaves caem no filtro por substring sobre o log.
 
-    # Filtro estruturado, se solicitado (opcional, pode ser removido se não usar)
-    if filtros:
+    Com o backend SQLite (NEXUS_METADATA_BACKEND=sqlite) e `hibrida`, o
+    ranking vetorial é fundido ao ranking BM25 da busca por palavra-chave
+    por reciprocal rank fusion, o que recupera códigos de erro, nomes de
+    arquivo e títulos de janela que a similaridade semântica perde.
+    """
+    memoria = get_memory_service()
+    if not len(memoria):
+        return []
+
+    # Filtros estruturados vão para a busca; chaves livres exigem varrer o log
+    filtros = filtros or {}
+    estruturados = {c: v for c, v in filtros.items() if c in CHAVES_ESTRUTURADAS}
+    livres = {c: v for c, v in filtros.items() if c not in CHAVES_ESTRUTURADAS}
+    permitidos = None
+    if livres:
         def match(item):
-            for chave, valor in filtros.items():
+            for chave, valor in livres.items():
                 if valor not in str(item.get(chave, "")):
                     return False
             return True
-        filtered = [i for i, b in enumerate(metadata) if match(b)]
-    else:
-        filtered = list(range(len(metadata)))
+        permitidos = {i for i, b in memoria.iterar() if match(b)}
+        if not permitidos:
+            return []
 
-    if not filtered:
-        return []
-
-    # Busca vetorial normal nos blocos filtrados
+    # Busca vetorial no índice residente
     query_vec = embed_text([query])
     query_vec = np.array(query_vec).astype("float32")
     if query_vec.ndim == 1:
         query_vec = query_vec.reshape(1, -1)
 
-    # Importante: se usou filtro, precisamos buscar nos índices originais!
-    # Por padrão busca nos 50 primeiros e depois "mapeia" para os índices corretos
-    dists, indices = index.search(query_vec, 50)
-    ranked = []
-    for dist, i in zip(dists[0], indices[0]):
-        if isinstance(i, int) and i < len(metadata):
-            if not filtros or i in filtered:
-                ranked.append((i, dist))
-    # Ordenação por preferência hierárquica e score
-    ordem = preferencia.split(">")
-    ranked.sort(key=lambda x: (ordem.index(metadata[x[0]].get("nivel", "longo")), x[1]))
+    # Orçamento de candidatos por camada (cada camada concorre só consigo mesma)
+    ordem = [nivel.strip() for nivel in preferencia.split(">") if nivel.strip()]
+    if k_por_nivel is None:
+        k_por_nivel = {nivel: max(2 * k, 10) for nivel in ordem}
+    else:
+        k_por_nivel = {nivel: k_por_nivel[nivel] for nivel in ordem if nivel in k_por_nivel}
+
+    candidatos = memoria.buscar_por_nivel(query_vec, k_por_nivel, estruturados, permitidos)
+    ranked = [(i, _pontuar(dist, ordem.index(nivel))) for i, dist, nivel in candidatos]
+    ranked.sort(key=lambda x: x[1], reverse=True)
+
+    # Busca por palavra-chave nas mesmas camadas e com os mesmos filtros
+    texto = []
+    if hibrida:
+        filtros_texto = dict(estruturados)
+        if not set(NIVEIS) <= set(ordem):
+            filtros_texto.setdefault("nivel", ordem)
+        texto = memoria.buscar_texto(query, max(2 * k, 10), filtros_texto, permitidos)
+    if texto:
+        fundido = {}
+        for lista in ([i for i, _ in ranked], [i for i, _ in texto]):
+            for posicao, i in enumerate(lista):
+                fundido[i] = fundido.get(i, 0.0) + 1.0 / (RRF_K + posicao + 1)
+        ranked = sorted(fundido.items(), key=lambda x: x[1], reverse=True)
 
     # Retorna só os índices dos top-k blocos relevantes
     return [i for i, _ in ranked[:k]]
 
 # --- Recupera blocos a partir de lista de índices ---
 def get_blocks_by_indices(indices: list[int]):
-    with open(METADATA_PATH, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    return [metadata[i] for i in indices if isinstance(i, int) and i < len(metadata)]
+    return get_memory_service().obter(indices)
 
 
 
@@ -295,14 +334,16 @@ def check_running_processes():
 # Função para recuperar contexto com base na consulta
 def retrieve_context(query, top_k=5):
     query_embedding = embed_text([query])
-    distances, indices = faiss_index.search(np.array(query_embedding), top_k)
+    memoria = get_memory_service()
+    distances, indices = memoria.buscar(np.array(query_embedding), top_k)
 
     running_processes = check_running_processes()
 
     results = []
     for idx, dist in zip(indices[0], distances[0]):
-        if idx < len(metadata):
-            result = metadata[idx].copy()
+        bloco = memoria.registro(int(idx))
+        if bloco is not None:
+            result = bloco.copy()
             result['distance'] = float(dist)
 
             # Análise de OCR + processos
@@ -0,0 +1,186 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+from datetime import datetime
+import faiss
+import numpy as np
+
+# Abaixo deste número de candidatos a busca exata sobre os vetores filtrados
+# é mais barata (e sempre correta) do que passar um seletor ao índice.
+LIMITE_BUSCA_EXATA = 2048
+
+# Chaves de filtro resolvidas pela tabela de atributos e pelo índice temporal
+CHAVES_ESTRUTURADAS = {"nivel", "tags", "active_window", "inicio", "fim", "projeto"}
+
+
+def epoch(valor) -> float | None:
+    """Converte um timestamp ISO8601 em segundos desde a época (None se inválido)."""
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(str(valor)).timestamp()
+    except ValueError:
+        return None
+
+
+def extrair_atributos(registro: dict) -> tuple:
+    """
+    Normaliza os campos filtráveis de um registro de qualquer camada:
+    (nivel, tags, janela, inicio, fim). Blocos médios e longos usam nomes
+    de campo próprios para janela, tags e período.
+    """
+    nivel = registro.get("nivel", "curto")
+    tags = registro.get("tags") or registro.get("principais_tags") or []
+    janela = registro.get("active_window") or registro.get("janela_mais_frequente") or ""
+    inicio = epoch(registro.get("timestamp") or registro.get("timestamp_inicio") or registro.get("timestamp_gerado"))
+    fim = epoch(registro.get("timestamp_fim")) or inicio
+    return nivel, frozenset(t.lower() for t in tags), janela.lower(), inicio, fim
+
+
+def projeto_do_registro(registro: dict) -> str:
+    """Namespace do projeto do registro ("" para registros sem projeto detectado)."""
+    return str(registro.get("projeto") or "")
+
+
+def texto_para_embedding(registro: dict) -> str:
+    """
+    Texto que gera o vetor do registro: janela + resumo nos registros curtos,
+    só o resumo nos blocos médios e longos. A ingestão e a reindexação usam
+    a mesma regra, então um índice reconstruído reproduz o original.
+    """
+    if registro.get("nivel", "curto") == "curto":
+        return f"{registro.get('active_window', '')} {registro.get('context_summary', '')}"
+    return registro.get("context_summary", "")
+
+
+def _como_lista(valor) -> list:
+    if valor is None:
+        return []
+    return list(valor) if isinstance(valor, (list, tuple, set, frozenset)) else [valor]
+
+
+class TabelaAtributos:
+    """
+    Índices invertidos residentes (nível, tag, janela, projeto) usados para resolver
+    filtros estruturados em um conjunto de IDs sem ler os registros do log.
+    O filtro de período fica a cargo do índice temporal (core.time_index).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.por_nivel = {}
+        self.por_tag = {}
+        self.por_janela = {}
+        self.por_projeto = {}
+        self._atributos = {}
+
+    def adicionar(self, registro_id: int, registro: dict):
+        nivel, tags, janela, _, _ = extrair_atributos(registro)
+        projeto = projeto_do_registro(registro)
+        with self._lock:
+            self.remover(registro_id)
+            self._atributos[registro_id] = (nivel, tags, janela, projeto)
+            self.por_nivel.setdefault(nivel, set()).add(registro_id)
+            for tag in tags:
+                self.por_tag.setdefault(tag, set()).add(registro_id)
+            self.por_janela.setdefault(janela, set()).add(registro_id)
+            self.por_projeto.setdefault(projeto, set()).add(registro_id)
+
+    def remover(self, registro_id: int):
+        with self._lock:
+            atributos = self._atributos.pop(registro_id, None)
+            if atributos is None:
+                return
+            nivel, tags, janela, projeto = atributos
+            self.por_nivel.get(nivel, set()).discard(registro_id)
+            for tag in tags:
+                self.por_tag.get(tag, set()).discard(registro_id)
+            self.por_janela.get(janela, set()).discard(registro_id)
+            self.por_projeto.get(projeto, set()).discard(registro_id)
+
+    def selecionar(self, filtros: dict, nivel: str | None = None, ids_periodo: set[int] | None = None) -> set[int]:
+        """
+        Resolve os filtros estruturados em um conjunto de IDs:
+        - nivel: nível ou lista de níveis
+        - tags: tag ou lista de tags (basta uma)
+        - active_window: trecho do título da janela (sem diferenciar maiúsculas)
+        - projeto: namespace ou lista de namespaces de projeto
+        `ids_periodo`, quando informado, é o resultado do filtro inicio/fim.
+        """
+        with self._lock:
+            conjuntos = [] if ids_periodo is None else [ids_periodo]
+            niveis = _como_lista(filtros.get("nivel"))
+            if nivel:
+                if niveis and nivel not in niveis:
+                    return set()
+                niveis = [nivel]
+            if niveis:
+                conjuntos.append(set().union(*(self.por_nivel.get(n, set()) for n in niveis)))
+            tags = [t.lower() for t in _como_lista(filtros.get("tags"))]
+            if tags:
+                conjuntos.append(set().union(*(self.por_tag.get(t, set()) for t in tags)))
+            janela = str(filtros.get("active_window", "")).lower()
+            if janela:
+                conjuntos.append(set().union(*(ids for titulo, ids in self.por_janela.items() if janela in titulo)))
+            projetos = _como_lista(filtros.get("projeto"))
+            if projetos:
+                conjuntos.append(set().union(*(self.por_projeto.get(p, set()) for p in projetos)))
+            if not conjuntos:
+                conjuntos.append(set(self._atributos))
+
+            # Interseção começando pelo menor conjunto
+            conjuntos.sort(key=len)
+            selecionados = set(conjuntos[0])
+            for conjunto in conjuntos[1:]:
+                selecionados &= conjunto
+                if not selecionados:
+                    break
+            return selecionados
+
+
+def parametros_busca(index, seletor):
+    """
+    Parâmetros de busca com seletor no tipo esperado pelo índice interno,
+    preservando efSearch (HNSW) e nprobe (IVF) configurados no próprio índice.
+    """
+    interno = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if isinstance(interno, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=seletor, efSearch=interno.hnsw.efSearch)
+    if isinstance(interno, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=seletor, nprobe=interno.nprobe)
+    return faiss.SearchParameters(sel=seletor)
+
+
+def buscar_com_selecao(index, query_vec, k: int, ids_permitidos):
+    """
+    Busca restrita a um subconjunto de IDs dentro do próprio índice.
+
+    Subconjuntos pequenos são resolvidos por busca exata sobre os vetores
+    reconstruídos; os maiores usam um IDSelector nos parâmetros da busca,
+    de modo que o top-k já sai filtrado (sem pós-filtro sobre um top-50 fixo).
+    """
+    ids = np.fromiter(ids_permitidos, dtype=np.int64)
+    vazio = (np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64))
+    if ids.size == 0 or index.ntotal == 0 or k <= 0:
+        return vazio
+
+    if ids.size <= LIMITE_BUSCA_EXATA or not hasattr(faiss, "SearchParameters"):
+        vetores, validos = [], []
+        for i in ids:
+            try:
+                vetores.append(index.reconstruct(int(i)))
+                validos.append(i)
+            except RuntimeError:
+                continue  # ID não pertence a este índice
+        if not validos:
+            return vazio
+        vetores = np.vstack(vetores)
+        dists = ((vetores - query_vec[0]) ** 2).sum(axis=1)
+        ordem = np.argsort(dists)[:k]
+        return dists[ordem].reshape(1, -1).astype(np.float32), np.array(validos, dtype=np.int64)[ordem].reshape(1, -1)
+
+    seletor = faiss.IDSelectorBatch(ids)
+    dists, labels = index.search(query_vec, min(k, index.ntotal), params=parametros_busca(index, seletor))
+    validos = labels[0] >= 0
+    return dists[:, validos], labels[:, validos]
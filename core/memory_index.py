@@ -0,0 +1,643 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import io
+import threading
+import time
+import faiss
+import numpy as np
+from core.memory_filters import buscar_com_selecao, parametros_busca
+from core.vector_sidecar import VetoresExatos, reranquear
+from core.checkpoint import gravar_atomico
+from utils.logger import write_monitor_log as log
+
+# Camadas da memória hierárquica, da mais recente para a mais consolidada
+NIVEIS = ("curto", "medio", "longo")
+
+# --- Configuração do tipo de índice ---
+# "auto": começa exato (Flat) e promove para o tipo aproximado ao passar do limiar
+# "flat": sempre exato
+MODO_INDICE = os.getenv("NEXUS_INDEX_MODE", "auto").strip().lower()
+TIPO_APROXIMADO = os.getenv("NEXUS_INDEX_APPROX", "hnsw").strip().lower()  # hnsw | ivf
+LIMIAR_PROMOCAO = int(os.getenv("NEXUS_INDEX_PROMOTION_THRESHOLD", "20000"))
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+IVF_NPROBE_MIN = 8
+
+# Índices abertos mapeados em memória e somente leitura; a cópia gravável só é
+# carregada no processo que de fato escreve (o de ingestão)
+MAPEAR_INDICES = os.getenv("NEXUS_INDEX_MMAP", "1").strip() != "0"
+
+# --- Compressão das camadas consolidadas ---
+# "sq8": quantização escalar de 8 bits (4x menor); "pq": product quantization
+# (1 byte a cada 8 dimensões, 32x menor).
+COMPRESSAO = os.getenv("NEXUS_INDEX_COMPRESSION", "none").strip().lower()  # none | sq8 | pq
+NIVEIS_COMPRIMIDOS = ("medio", "longo")
+LIMIAR_COMPRESSAO = int(os.getenv("NEXUS_INDEX_COMPRESSION_THRESHOLD", "2000"))
+MINIMO_TREINO_PQ = 1024  # O k-means de cada subquantizador usa 256 centróides
+# Opcional: mantém uma cópia float16 dos vetores (2 bytes por dimensão, mais
+# que o próprio PQ) e re-ranqueia os candidatos com a distância exata. Troca
+# parte da economia de disco e RAM por recall
+RERANQUEAMENTO_EXATO = os.getenv("NEXUS_INDEX_EXACT_RERANK", "0").strip() == "1"
+FATOR_RERANQUEAMENTO = 4
+
+
+def subvetores_pq(dimensao: int) -> int:
+    """Maior divisor da dimensão que não passa de dimensao/8 (1 byte por subvetor)."""
+    for m in range(max(1, dimensao // 8), 0, -1):
+        if dimensao % m == 0:
+            return m
+    return 1
+
+
+def descricao_indice(tipo: str, total: int = 0, dimensao: int = 384, codec: str = "flat") -> str:
+    """Descrição (sintaxe do faiss.index_factory) para a estrutura, o codec e o tamanho da camada."""
+    codigo = {"sq8": "SQ8", "pq": f"PQ{subvetores_pq(dimensao)}"}.get(codec, "Flat")
+    if tipo == "hnsw":
+        return f"HNSW{HNSW_M}" if codigo == "Flat" else f"HNSW{HNSW_M}_{codigo}"
+    if tipo == "ivf":
+        nlist = max(16, int(np.sqrt(max(total, 1))))
+        return f"IVF{nlist},{codigo}"
+    return codigo
+
+
+def perfil_alvo(nivel: str, total: int) -> tuple[str, str]:
+    """(estrutura, codec) que a camada deve ter com `total` vetores, segundo a configuração."""
+    estrutura = TIPO_APROXIMADO if MODO_INDICE == "auto" and total >= LIMIAR_PROMOCAO else "flat"
+    codec = "flat"
+    if COMPRESSAO in ("sq8", "pq") and nivel in NIVEIS_COMPRIMIDOS:
+        minimo = LIMIAR_COMPRESSAO if COMPRESSAO == "sq8" else max(LIMIAR_COMPRESSAO, MINIMO_TREINO_PQ)
+        if total >= minimo:
+            codec = COMPRESSAO
+    return estrutura, codec
+
+
+def criar_indice(dimensao: int, descricao: str = "Flat"):
+    """Cria um índice com IDs estáveis (IDMap2) a partir da descrição do faiss."""
+    return faiss.index_factory(dimensao, f"IDMap2,{descricao}")
+
+
+def _interno(index):
+    return faiss.downcast_index(index.index)
+
+
+def esta_mapeado(index) -> bool:
+    """
+    True se os códigos do índice são uma visão do arquivo mapeado, e não uma
+    cópia na RAM. O faiss só mapeia os códigos de índices "flat codes"
+    (Flat, SQ, PQ, e o armazenamento do HNSW); as listas do IVF são lidas
+    inteiras.
+    """
+    interno = _interno(index)
+    if isinstance(interno, faiss.IndexHNSW):
+        interno = faiss.downcast_index(interno.storage)
+    codigos = getattr(interno, "codes", None)
+    return codigos is not None and hasattr(codigos, "is_owned") and not codigos.is_owned
+
+
+_avisos_mapeamento = set()
+
+
+def _avisar_leitura_completa(motivo: str):
+    if motivo not in _avisos_mapeamento:
+        _avisos_mapeamento.add(motivo)
+        log(f"Índices FAISS sem mapeamento em memória ({motivo}): leitura completa para a RAM.")
+
+
+def ler_indice(path: str, mapear: bool = MAPEAR_INDICES):
+    """
+    Lê um índice do disco. Com `mapear`, os códigos ficam mapeados (mmap,
+    somente leitura) e só as páginas tocadas pela busca vão para a RAM.
+    Retorna (índice, mapeado); `mapeado` só é True se o índice lido de fato
+    aponta para o arquivo (ver esta_mapeado).
+    """
+    if mapear:
+        if not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            # O IO_FLAG_MMAP antigo não mapeia os códigos dos índices flat
+            _avisar_leitura_completa("faiss sem IO_FLAG_MMAP_IFC")
+        else:
+            try:
+                index = faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                index = None  # Tipo de índice sem suporte a mmap nesta versão do faiss
+            if index is not None and esta_mapeado(index):
+                return index, True
+            # Só parte do índice ficou mapeada (ex.: o id_map do IVF) e não
+            # pode ser alterada: relê tudo para a RAM
+            _avisar_leitura_completa(f"tipo {tipo_do_indice(index) if index is not None else 'desconhecido'}")
+            del index
+    return faiss.read_index(path), False
+
+
+def ajustar_parametros_busca(index):
+    """Aplica os parâmetros de busca do índice aproximado (efSearch / nprobe)."""
+    interno = _interno(index)
+    if isinstance(interno, faiss.IndexHNSW):
+        interno.hnsw.efSearch = HNSW_EF_SEARCH
+    elif isinstance(interno, faiss.IndexIVF):
+        interno.nprobe = max(IVF_NPROBE_MIN, interno.nlist // 16)
+        if interno.direct_map.no():
+            interno.make_direct_map()  # necessário para reconstruct (busca exata filtrada)
+
+
+def tipo_do_indice(index) -> str:
+    interno = _interno(index)
+    if isinstance(interno, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(interno, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def codec_do_indice(index) -> str:
+    interno = _interno(index)
+    if isinstance(interno, faiss.IndexHNSW):
+        interno = faiss.downcast_index(interno.storage)
+    if isinstance(interno, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "sq8"
+    if isinstance(interno, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    return "flat"
+
+
+def tamanho_do_indice(index) -> int:
+    """Bytes ocupados pelo índice serializado (aproxima a RAM e o arquivo)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def avaliar_indice(antigo, candidato, vetores, ids, consultas, k: int = 10, buscar_candidato=None) -> dict:
+    """
+    Compara o índice candidato com o antigo nas mesmas consultas: recall@k do
+    candidato contra a busca exata sobre `vetores`/`ids` e latência média por
+    consulta de ambos. `buscar_candidato(consultas, k) -> ids` substitui a
+    busca direta no candidato (ex.: busca comprimida seguida de re-ranqueamento).
+    """
+    k = min(k, len(ids))
+    if k <= 0 or len(consultas) == 0:
+        return {"recall": 1.0, "latencia_antes_ms": 0.0, "latencia_depois_ms": 0.0, "consultas": 0}
+    exato = faiss.IndexFlatL2(vetores.shape[1])
+    exato.add(vetores)
+    _, posicoes = exato.search(consultas, k)
+    esperado = ids[posicoes]
+    inicio = time.perf_counter()
+    antigo.search(consultas, k)
+    latencia_antes = (time.perf_counter() - inicio) * 1000 / len(consultas)
+    inicio = time.perf_counter()
+    if buscar_candidato is not None:
+        obtido = buscar_candidato(consultas, k)
+    else:
+        _, obtido = candidato.search(consultas, k)
+    latencia_depois = (time.perf_counter() - inicio) * 1000 / len(consultas)
+    acertos = sum(len(set(e) & set(o)) for e, o in zip(esperado, obtido))
+    return {
+        "recall": acertos / (k * len(consultas)),
+        "latencia_antes_ms": latencia_antes,
+        "latencia_depois_ms": latencia_depois,
+        "consultas": len(consultas),
+    }
+
+
+class IndiceCamada:
+    """
+    Índice FAISS de uma única camada da memória (curto, médio ou longo prazo).
+
+    Cada camada tem seu próprio arquivo e seu próprio tipo de índice, de modo
+    que uma consulta só toca as camadas de que precisa. Os IDs são os IDs
+    estáveis dos registros no log.
+
+    No modo "auto" a camada começa exata (Flat) e, ao passar de
+    LIMIAR_PROMOCAO vetores, é migrada para HNSW ou IVF por uma thread em
+    segundo plano: buscas e inserções continuam no índice antigo, as
+    mudanças feitas durante a construção são reaplicadas no novo e a troca
+    acontece sob o lock. Recall e latência antes/depois vão para o log.
+
+    Com NEXUS_INDEX_COMPRESSION, as camadas médio e longo passam pelo mesmo
+    processo para um codec SQ8/PQ. Com NEXUS_INDEX_EXACT_RERANK, os vetores
+    originais também ficam numa cópia float16 ao lado do índice
+    (core.vector_sidecar) para o re-ranqueamento.
+
+    O índice é aberto mapeado e somente leitura. Escritas sobre o índice
+    mapeado (ex.: o WAL reaplicado na abertura por um processo que só lê)
+    vão para um delta em memória: um Flat pequeno com as adições, buscado
+    junto com o índice, e exclusões para as remoções. Só o checkpoint (ou o
+    vacuum) troca o mapeamento por uma cópia gravável e incorpora o delta.
+
+    O vacuum (core.vacuum) reconstrói a camada com `reconstruir`, que
+    descarta de fato os IDs excluídos e as linhas mortas da cópia float16.
+    """
+
+    def __init__(self, nivel: str, path: str, dimensao: int):
+        self.nivel = nivel
+        self.path = path
+        self.dimensao = dimensao
+        self._lock = threading.RLock()
+        self._sujo = False
+        self._promocao = None
+        self._mudancas = None
+        self._adiar_promocao_ate = 0
+        self.ultimo_relatorio = None
+        self._mapeado = False
+        self._delta = None  # Adições feitas sobre o índice mapeado
+        self._delta_pendente = False  # Há adições ou remoções ainda fora do arquivo mapeado
+        if os.path.exists(path):
+            self.index, self._mapeado = ler_indice(path)
+            ajustar_parametros_busca(self.index)
+        else:
+            self.index = criar_indice(dimensao, "Flat")
+        # Só o Flat remove vetores com segurança sob o IDMap2 (HNSW não remove e o
+        # IVF desalinha as posições): nos demais, IDs removidos viram exclusões
+        # aplicadas na busca até a próxima reconstrução do índice
+        self._excluidos = set()
+        if os.path.exists(self._path_excluidos):
+            self._excluidos = set(int(i) for i in np.load(self._path_excluidos))
+        # Vetores exatos só são mantidos, se pedidos, para camadas (que serão) comprimidas
+        self._exatos = None
+        if RERANQUEAMENTO_EXATO and (
+            self.codec != "flat" or (COMPRESSAO in ("sq8", "pq") and nivel in NIVEIS_COMPRIMIDOS)
+        ):
+            self._exatos = VetoresExatos(self._paths_exatos[0], dimensao)
+
+    @property
+    def _paths_exatos(self) -> tuple[str, str]:
+        return self.path + ".f16", self.path + ".f16.ids"
+
+    @property
+    def _path_excluidos(self) -> str:
+        return self.path + ".excluidos.npy"
+
+    @property
+    def tipo(self) -> str:
+        return tipo_do_indice(self.index)
+
+    @property
+    def codec(self) -> str:
+        return codec_do_indice(self.index)
+
+    @property
+    def ntotal(self) -> int:
+        delta = self._delta.ntotal if self._delta is not None else 0
+        return self.index.ntotal + delta - len(self._excluidos)
+
+    def ids(self) -> np.ndarray:
+        """IDs presentes na camada, na ordem de inserção."""
+        with self._lock:
+            ids = faiss.vector_to_array(self.index.id_map).copy()
+            if self._delta is not None:
+                ids = np.concatenate([ids, faiss.vector_to_array(self._delta.id_map)])
+            if self._excluidos:
+                ids = ids[~np.isin(ids, np.fromiter(self._excluidos, dtype=np.int64))]
+            return ids
+
+    def vetor(self, registro_id: int) -> np.ndarray | None:
+        """Vetor do ID (exato se houver a cópia float16; senão o reconstruído pelo índice)."""
+        with self._lock:
+            registro_id = int(registro_id)
+            if registro_id in self._excluidos:
+                return None
+            if self._delta is not None:
+                try:
+                    return self._delta.reconstruct(registro_id)
+                except RuntimeError:
+                    pass
+            try:
+                vetor = self.index.reconstruct(registro_id)
+            except RuntimeError:
+                return None  # ID não pertence a esta camada
+            if self._exatos is not None and registro_id in self._exatos:
+                return self._exatos.obter([registro_id])[0][0]
+            return vetor
+
+    def _garantir_gravavel(self):
+        """
+        Troca o índice mapeado por uma cópia gravável em memória e incorpora
+        o delta (chamado sob o lock, só pelo checkpoint e pelo vacuum).
+        """
+        if not self._mapeado:
+            return
+        index = faiss.read_index(self.path)
+        ajustar_parametros_busca(index)
+        if self._delta is not None and self._delta.ntotal:
+            vetores = self._delta.index.reconstruct_n(0, self._delta.ntotal)
+            ids = faiss.vector_to_array(self._delta.id_map).copy()
+            if self._exatos is not None:
+                self._exatos.adicionar(vetores, ids)
+            index.add_with_ids(vetores, ids)
+        if self._excluidos and tipo_do_indice(index) == "flat":
+            index.remove_ids(np.fromiter(self._excluidos, dtype=np.int64))
+            self._excluidos = set()
+        self.index = index
+        self._mapeado = False
+        self._delta = None
+        if self._delta_pendente:
+            self._sujo = True
+            self._delta_pendente = False
+        log(f"Índice '{self.nivel}': carregada cópia gravável ({self.index.ntotal} vetores).")
+
+    def adicionar(self, vetores, ids):
+        vetores = np.asarray(vetores, dtype=np.float32).reshape(-1, self.dimensao)
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            if self._mapeado:
+                # Sem copiar o índice mapeado: a adição fica no delta até o checkpoint
+                if self._delta is None:
+                    self._delta = criar_indice(self.dimensao, "Flat")
+                self._delta.add_with_ids(vetores, ids)
+                self._delta_pendente = True
+                return
+            if self._exatos is not None:
+                self._exatos.adicionar(vetores, ids)
+            self.index.add_with_ids(vetores, ids)
+            self._sujo = True
+            if self._mudancas is not None:
+                self._mudancas.append(("add", vetores, ids))
+        self._verificar_promocao()
+
+    def remover(self, ids) -> int:
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            if self._mapeado:
+                removidos = self._delta.remove_ids(ids) if self._delta is not None else 0
+                presentes = ids[np.isin(ids, faiss.vector_to_array(self.index.id_map))]
+                novos = set(int(i) for i in presentes) - self._excluidos
+                self._excluidos |= novos
+                removidos += len(novos)
+                if removidos:
+                    self._delta_pendente = True
+                return removidos
+            if self._mudancas is not None:
+                self._mudancas.append(("del", None, ids))
+            if self.tipo != "flat":
+                presentes = ids[np.isin(ids, faiss.vector_to_array(self.index.id_map))]
+                novos = set(int(i) for i in presentes) - self._excluidos
+                self._excluidos |= novos
+                removidos = len(novos)
+            else:
+                removidos = self.index.remove_ids(ids)
+            if removidos:
+                self._sujo = True
+            return removidos
+
+    def buscar(self, query_vec, k: int, ids_permitidos=None):
+        """
+        Retorna (distâncias, IDs) da camada; vazio se a camada não tem vetores.
+        Com `ids_permitidos`, a busca considera apenas esses IDs.
+        Em camadas comprimidas, busca FATOR_RERANQUEAMENTO * k candidatos e
+        devolve o top-k pela distância exata.
+        """
+        with self._lock:
+            comprimido = self._exatos is not None and self.codec != "flat"
+            k_busca = k * FATOR_RERANQUEAMENTO if comprimido else k
+            dists, ids = self._buscar_no_indice(query_vec, k_busca, ids_permitidos)
+            if comprimido and ids.size:
+                return reranquear(self._exatos, query_vec, dists, ids, k)
+            return dists, ids
+
+    def _buscar_no_indice(self, query_vec, k: int, ids_permitidos=None):
+        if self._delta is None or self._delta.ntotal == 0:
+            return self._buscar_no_principal(query_vec, k, ids_permitidos)
+        # Índice mapeado com delta: junta os dois resultados pela distância
+        if ids_permitidos is not None:
+            delta = buscar_com_selecao(self._delta, query_vec, k, ids_permitidos)
+        else:
+            delta = self._delta.search(query_vec, min(k, self._delta.ntotal))
+        principal = self._buscar_no_principal(query_vec, k, ids_permitidos)
+        dists = np.concatenate([principal[0][0], delta[0][0]])
+        ids = np.concatenate([principal[1][0], delta[1][0]])
+        validos = ids >= 0
+        dists, ids = dists[validos], ids[validos]
+        ordem = np.argsort(dists, kind="stable")[:k]
+        return dists[ordem].reshape(1, -1), ids[ordem].reshape(1, -1)
+
+    def _buscar_no_principal(self, query_vec, k: int, ids_permitidos=None):
+        if ids_permitidos is not None:
+            return buscar_com_selecao(self.index, query_vec, k, set(ids_permitidos) - self._excluidos)
+        vivos = self.index.ntotal - len(self._excluidos)
+        if vivos <= 0 or k <= 0:
+            return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+        if self._excluidos:
+            excluidos = faiss.IDSelectorBatch(np.fromiter(self._excluidos, dtype=np.int64))
+            seletor = faiss.IDSelectorNot(excluidos)
+            params = parametros_busca(self.index, seletor)
+            dists, ids = self.index.search(query_vec, min(k, vivos), params=params)
+            validos = ids[0] >= 0
+            return dists[:, validos], ids[:, validos]
+        return self.index.search(query_vec, min(k, self.index.ntotal))
+
+    # --- Promoção para índice aproximado / comprimido ---
+    def _verificar_promocao(self):
+        if self._mapeado or self.ntotal < max(self._adiar_promocao_ate, 1):
+            return
+        atual = (self.tipo, self.codec)
+        alvo = perfil_alvo(self.nivel, self.ntotal)
+        # Só promove: cada componente atual é exato ou já é o do alvo
+        if alvo == atual or any(a != "flat" and a != b for a, b in zip(atual, alvo)):
+            return
+        with self._lock:
+            if self._promocao is not None or self._mudancas is not None:
+                return  # Promoção ou reconstrução em andamento
+            # Fotografia do índice atual; o que mudar depois vai para `_mudancas`
+            ids = faiss.vector_to_array(self.index.id_map).copy()
+            vetores = self.index.index.reconstruct_n(0, self.index.ntotal)
+            if self._excluidos:
+                manter = ~np.isin(ids, np.fromiter(self._excluidos, dtype=np.int64))
+                ids, vetores = ids[manter], vetores[manter]
+            if self.codec != "flat" and self._exatos is not None:
+                # Recompressão: parte dos vetores originais, não dos decodificados
+                exatos, encontrados = self._exatos.obter(ids)
+                vetores[encontrados] = exatos[encontrados]
+            self._mudancas = []
+            self._promocao = threading.Thread(
+                target=self._promover, args=(self.index, vetores, ids, alvo), daemon=True
+            )
+            self._promocao.start()
+
+    def _promover(self, antigo, vetores, ids, alvo):
+        estrutura, codec = alvo
+        nome = descricao_indice(estrutura, len(ids), self.dimensao, codec)
+        try:
+            log(f"Índice '{self.nivel}': promovendo {len(ids)} vetores para {nome}...")
+            bytes_exatos_antes = self._exatos.tamanho_em_disco() if self._exatos is not None else 0
+            if self._exatos is not None:
+                # Vindos de um índice sem compressão, estes vetores ainda são exatos
+                self._exatos.adicionar(vetores, ids)
+
+            # Construção fora do lock: o tracker continua inserindo no índice antigo
+            novo = criar_indice(self.dimensao, nome)
+            if not novo.is_trained:
+                novo.train(vetores)
+            novo.add_with_ids(vetores, ids)
+            ajustar_parametros_busca(novo)
+
+            def buscar_reranqueado(consultas, k):
+                resultado = []
+                for q in consultas:
+                    d, i = novo.search(q.reshape(1, -1), k * FATOR_RERANQUEAMENTO)
+                    resultado.append(reranquear(self._exatos, q.reshape(1, -1), d, i, k)[1][0])
+                return resultado
+
+            reranqueia = codec != "flat" and self._exatos is not None
+            amostra = vetores[np.random.default_rng(0).choice(len(vetores), min(200, len(vetores)), replace=False)]
+            relatorio = avaliar_indice(
+                antigo, novo, vetores, ids, amostra, buscar_candidato=buscar_reranqueado if reranqueia else None
+            )
+            # A cópia float16 entra na conta: ela também ocupa disco e RAM
+            relatorio["bytes_reranqueamento"] = self._exatos.tamanho_em_disco() if self._exatos is not None else 0
+            relatorio["bytes_antes"] = tamanho_do_indice(antigo) + bytes_exatos_antes
+            relatorio["bytes_depois"] = tamanho_do_indice(novo) + relatorio["bytes_reranqueamento"]
+
+            with self._lock:
+                self._trocar_indice(novo)
+                self.ultimo_relatorio = relatorio
+            log(
+                f"Índice '{self.nivel}' promovido para {nome}: "
+                f"recall@10={relatorio['recall']:.3f} | "
+                f"latência {relatorio['latencia_antes_ms']:.3f} ms -> {relatorio['latencia_depois_ms']:.3f} ms por consulta | "
+                f"tamanho {relatorio['bytes_antes'] / 1e6:.1f} MB -> {relatorio['bytes_depois'] / 1e6:.1f} MB"
+                + (f" (cópia float16: {relatorio['bytes_reranqueamento'] / 1e6:.1f} MB)."
+                   if relatorio["bytes_reranqueamento"] else ".")
+            )
+        except Exception as e:
+            # Só tenta de novo quando a camada dobrar de tamanho
+            self._adiar_promocao_ate = 2 * self.ntotal
+            log(f"Falha ao promover o índice '{self.nivel}': {e}. Mantendo o índice atual.")
+        finally:
+            with self._lock:
+                self._mudancas = None
+                self._promocao = None
+
+    def _trocar_indice(self, novo):
+        """
+        Troca o índice pelo construído a partir da fotografia (chamado sob o
+        lock). Exclusões anteriores ficaram fora da fotografia; reaplica só o
+        que mudou durante a construção.
+        """
+        self._excluidos = set()
+        for operacao, vetores_mud, ids_mud in self._mudancas:
+            if operacao == "add":
+                novo.add_with_ids(vetores_mud, ids_mud)
+            elif tipo_do_indice(novo) == "flat":
+                novo.remove_ids(ids_mud)
+            else:
+                presentes = ids_mud[np.isin(ids_mud, faiss.vector_to_array(novo.id_map))]
+                self._excluidos |= set(int(i) for i in presentes)
+        self.index = novo
+        self._mapeado = False
+        self._sujo = True
+
+    def aguardar_promocao(self, timeout: float | None = None):
+        promocao = self._promocao
+        if promocao is not None:
+            promocao.join(timeout)
+
+    # --- Reconstrução (vacuum) ---
+    def vetores(self, lote):
+        """Vetores dos IDs do lote (exatos se houver a cópia float16); IDs que saíram da camada são omitidos."""
+        with self._lock:
+            if self._exatos is not None:
+                vetores, encontrados = self._exatos.obter(lote)
+            else:
+                vetores = np.zeros((len(lote), self.dimensao), dtype=np.float32)
+                encontrados = np.zeros(len(lote), dtype=bool)
+            manter = np.ones(len(lote), dtype=bool)
+            for n in np.flatnonzero(~encontrados):
+                try:
+                    vetores[n] = self.index.reconstruct(int(lote[n]))
+                except RuntimeError:
+                    manter[n] = False
+            return vetores[manter], lote[manter]
+
+    def reconstruir(self, tamanho_lote: int = 4096) -> int:
+        """
+        Reconstrói o índice só com os vetores vivos, em lotes, descartando os
+        IDs excluídos e as linhas mortas da cópia float16. Como na promoção,
+        buscas e inserções continuam no índice atual e as mudanças feitas
+        durante a construção são reaplicadas na troca. O tipo do índice novo
+        segue `perfil_alvo` para o tamanho que sobrou. Retorna o número de
+        vetores descartados (0 se não havia o que recuperar).
+        """
+        with self._lock:
+            if self._promocao is not None or self._mudancas is not None:
+                return 0  # Promoção em andamento: a próxima rodada tenta de novo
+            if self._delta_pendente:
+                self._garantir_gravavel()
+            if self._exatos is None:
+                self._descartar_exatos_orfaos()
+            lixo_exatos = self._exatos is not None and len(self._exatos) > self.ntotal
+            if not self._excluidos and not lixo_exatos:
+                return 0
+            ids = self.ids()
+            descartados = self.index.ntotal - len(ids)
+            self._mudancas = []
+        try:
+            estrutura, codec = perfil_alvo(self.nivel, len(ids))
+            nome = descricao_indice(estrutura, len(ids), self.dimensao, codec)
+            novo = criar_indice(self.dimensao, nome)
+            lotes = [ids[i:i + tamanho_lote] for i in range(0, len(ids), tamanho_lote)]
+            if not novo.is_trained:
+                # Treina com uma amostra dos primeiros lotes (até ~64k vetores)
+                treino = [self.vetores(lote)[0] for lote in lotes[:max(1, 65536 // tamanho_lote)]]
+                novo.train(np.vstack(treino))
+            for lote in lotes:
+                vetores, presentes = self.vetores(lote)
+                if len(presentes):
+                    novo.add_with_ids(vetores, presentes)
+            ajustar_parametros_busca(novo)
+            with self._lock:
+                self._trocar_indice(novo)
+                if self._exatos is not None:
+                    self._exatos.compactar(faiss.vector_to_array(novo.id_map), tamanho_lote)
+            log(f"Índice '{self.nivel}' reconstruído como {nome}: {len(ids)} vetores vivos, {descartados} descartados.")
+            return descartados
+        except Exception as e:
+            log(f"Falha ao reconstruir o índice '{self.nivel}': {e}. Mantendo o índice atual.")
+            return 0
+        finally:
+            with self._lock:
+                self._mudancas = None
+
+    def _descartar_exatos_orfaos(self):
+        """Apaga a cópia float16 deixada por uma execução com NEXUS_INDEX_EXACT_RERANK (hoje desligado)."""
+        for caminho in self._paths_exatos:
+            if os.path.exists(caminho):
+                try:
+                    os.remove(caminho)
+                    log(f"Índice '{self.nivel}': cópia float16 sem uso removida ({os.path.basename(caminho)}).")
+                except OSError:
+                    pass  # Ainda mapeada por outro processo; a próxima rodada tenta de novo
+
+    # --- Persistência ---
+    def instantaneo(self, forcar: bool = False):
+        """
+        Serializa o índice e as exclusões se houver algo a gravar (None caso
+        contrário). É a única parte do checkpoint feita sob o lock da camada:
+        a gravação em disco (`gravar`) não bloqueia buscas nem inserções.
+        """
+        with self._lock:
+            if self._mapeado:
+                if not self._delta_pendente:
+                    return None  # Mapeado sem delta = idêntico ao arquivo (e regravá-lo invalidaria o mapa)
+                self._garantir_gravavel()
+            if not (self._sujo or forcar or not os.path.exists(self.path)):
+                return None
+            self._sujo = False
+            return faiss.serialize_index(self.index), np.fromiter(self._excluidos, dtype=np.int64)
+
+    def gravar(self, instantaneo):
+        """Grava um instantâneo com temp + rename; em caso de falha a camada volta a ficar suja."""
+        dados, excluidos = instantaneo
+        try:
+            gravar_atomico(self.path, dados.tobytes())
+            if excluidos.size:
+                buffer = io.BytesIO()
+                np.save(buffer, excluidos)
+                gravar_atomico(self._path_excluidos, buffer.getvalue())
+            elif os.path.exists(self._path_excluidos):
+                os.remove(self._path_excluidos)
+        except OSError:
+            self._sujo = True
+            raise
+
+    def salvar(self, forcar: bool = False):
+        instantaneo = self.instantaneo(forcar)
+        if instantaneo is not None:
+            self.gravar(instantaneo)
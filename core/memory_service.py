@@ -0,0 +1,588 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import atexit
+import threading
+from datetime import datetime
+import numpy as np
+from core.storage import (
+    EMBEDDING_REGISTRY_PATH, METADATA_PATH, TIME_INDEX_PATH, MANIFEST_PATH, load_faiss_and_metadata, metadata_files
+)
+from core.memory_index import NIVEIS
+from core.checkpoint import ADICAO, ATUALIZACAO, REMOCAO, WriteAheadLog, ler_manifesto, gravar_manifesto
+from core.model_registry import ativar_indice, caminhos_indice, indice_ativo
+from core.memory_filters import TabelaAtributos, extrair_atributos, epoch, projeto_do_registro
+from core.time_index import IndiceTemporal
+from core.sqlite_store import FILTROS_SQL
+from utils.logger import write_monitor_log as log
+
+# Checkpoint em grupo: os índices vão para o disco a cada INTERVALO_CHECKPOINT
+# segundos ou a cada MAX_PENDENTES operações, o que vier primeiro
+INTERVALO_CHECKPOINT = float(os.getenv("NEXUS_CHECKPOINT_INTERVAL", "30"))
+MAX_PENDENTES = int(os.getenv("NEXUS_CHECKPOINT_MAX_PENDING", "256"))
+
+
+class MemoryService:
+    """
+    Mantém os índices FAISS de cada camada abertos (mapeados em memória
+    enquanto o processo só lê) e o log de registros aberto.
+
+    Uma única instância é compartilhada pelos nós do grafo, pelo NexusRetriever
+    e pelo tracker. Os arquivos só são relidos quando a geração em disco muda
+    (outro processo gravou), nunca a cada consulta. Os registros ficam no
+    log append-only (ver core.record_log) e são lidos por seek sob demanda.
+
+    Cada camada é particionada por período (core.memory_shards): uma
+    consulta com período só abre e busca as partições que o cobrem.
+
+    A abertura não depende do tamanho da memória: os índices são mapeados,
+    o índice temporal é lido pronto e a tabela de atributos só é montada
+    na primeira consulta com filtros.
+
+    Escritas não regravam os índices: cada operação vai para o log de
+    registros e para um write-ahead log (core.checkpoint) e os índices são
+    gravados em grupo por uma thread de checkpoint (temp + rename, com um
+    manifesto gravado por último). Após uma queda, o WAL é reaplicado na
+    abertura, num delta em memória ao lado dos índices mapeados (ver
+    IndiceCamada): um processo que só lê não copia os índices para a RAM.
+
+    Os índices abertos são os do índice ativo no registro de modelos
+    (core.model_registry). Uma reindexação com outro modelo constrói um
+    índice novo ao lado e o troca pelo atual em `concluir_reindexacao`.
+    """
+
+    def __init__(self, metadata_path=METADATA_PATH):
+        self.metadata_path = metadata_path
+        self._lock = threading.RLock()
+        self._camadas = None
+        self._log = None
+        self._atributos = None
+        self._tempo = IndiceTemporal(TIME_INDEX_PATH)
+        self._geracao = None
+        self._wal = None
+        self._manifesto = {"geracao": 0}
+        self._indice = None
+        # Remoções e atualizações feitas durante uma reindexação, reaplicadas no índice novo
+        self._mudancas_reindexacao = None
+        self._lock_checkpoint = threading.Lock()
+        self._evento_checkpoint = threading.Event()
+        self._thread_checkpoint = None
+
+    # --- Controle de geração ---
+    def _geracao_em_disco(self):
+        """
+        Identifica a versão dos arquivos em disco por (mtime, tamanho). Os
+        índices só mudam num checkpoint, que sempre termina no manifesto.
+        """
+        geracao = []
+        for path in [MANIFEST_PATH, EMBEDDING_REGISTRY_PATH] + metadata_files(self.metadata_path):
+            try:
+                st = os.stat(path)
+                geracao.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                geracao.append(None)
+        return tuple(geracao)
+
+    def _carregar(self):
+        self._indice = indice_ativo()
+        self._camadas, self._log = load_faiss_and_metadata(self.metadata_path, self._indice)
+        self._manifesto = ler_manifesto(MANIFEST_PATH)
+        self._wal = WriteAheadLog(caminhos_indice(self._indice)[1], self._indice["dimensao"], NIVEIS)
+        self._atributos = None
+        self._tempo = IndiceTemporal(TIME_INDEX_PATH)
+        if not self._tempo.carregar() or self._tempo.total_log > len(self._log):
+            self._tempo = IndiceTemporal(TIME_INDEX_PATH)
+            for registro_id, registro in self._log.iterar():
+                _, _, _, inicio, fim = extrair_atributos(registro)
+                self._tempo.adicionar(registro_id, inicio, fim)
+        else:
+            # Só os registros acrescentados depois do último checkpoint
+            for registro_id in range(self._tempo.total_log, len(self._log)):
+                registro = self._log.get(registro_id)
+                if registro is not None:
+                    _, _, _, inicio, fim = extrair_atributos(registro)
+                    self._tempo.adicionar(registro_id, inicio, fim)
+        reaplicadas = self._reaplicar_wal()
+        self._geracao = self._geracao_em_disco()
+        log(
+            f"MemoryService: memória carregada ({len(self._log)} registros"
+            + (f", {reaplicadas} operações reaplicadas do WAL)." if reaplicadas else ").")
+        )
+
+    def _reaplicar_wal(self) -> int:
+        """
+        Reaplica nos índices as operações posteriores ao último checkpoint.
+        Operações já presentes nos índices (checkpoint interrompido no meio)
+        são ignoradas, assim como adições cujo registro não chegou ao log.
+        """
+        presentes = {}
+
+        def ids_da_camada(nivel):
+            if nivel not in presentes:
+                presentes[nivel] = set(self._camadas[nivel].ids().tolist())
+            return presentes[nivel]
+
+        reaplicadas = 0
+        for operacao, registro_id, nivel, vetor in self._wal.entradas():
+            if operacao == ADICAO:
+                if not self._log.ativo(registro_id) or registro_id in ids_da_camada(nivel):
+                    continue
+                registro = self._log.get(registro_id)
+                _, _, _, inicio, fim = extrair_atributos(registro)
+                self._camadas[nivel].adicionar([vetor], [registro_id], [inicio], [fim], [projeto_do_registro(registro)])
+                ids_da_camada(nivel).add(registro_id)
+                reaplicadas += 1
+            elif operacao == ATUALIZACAO:
+                # O período do registro pode ter mudado (ex.: duplicata fundida)
+                registro = self._log.get(registro_id)
+                if registro is not None:
+                    _, _, _, inicio, fim = extrair_atributos(registro)
+                    self._tempo.remover([registro_id])
+                    self._tempo.adicionar(registro_id, inicio, fim)
+                    reaplicadas += 1
+            else:
+                for nivel_camada, camada in self._camadas.items():
+                    if registro_id in ids_da_camada(nivel_camada):
+                        camada.remover([registro_id])
+                        ids_da_camada(nivel_camada).discard(registro_id)
+                        reaplicadas += 1
+                self._tempo.remover([registro_id])
+        return reaplicadas
+
+    def _garantir_atualizado(self):
+        if self._camadas is None or self._geracao_em_disco() != self._geracao:
+            self._carregar()
+
+    def _tabela_atributos(self) -> TabelaAtributos:
+        """Tabela de atributos, montada a partir do log no primeiro uso."""
+        if self._atributos is None:
+            tabela = TabelaAtributos()
+            for registro_id, registro in self._log.iterar():
+                tabela.adicionar(registro_id, registro)
+            self._atributos = tabela
+        return self._atributos
+
+    # --- Leitura ---
+    def __len__(self):
+        with self._lock:
+            self._garantir_atualizado()
+            return self._log.total_ativos()
+
+    def tamanho_log(self) -> int:
+        """Posições do log (ativas e removidas); o próximo registro recebe esse ID."""
+        with self._lock:
+            self._garantir_atualizado()
+            return len(self._log)
+
+    @property
+    def dimensao(self) -> int:
+        with self._lock:
+            self._garantir_atualizado()
+            return self._indice["dimensao"]
+
+    def ids_ativos(self) -> list[int]:
+        with self._lock:
+            self._garantir_atualizado()
+            return self._log.ids_ativos()
+
+    def ids_por_nivel(self, niveis: list[str]) -> list[int]:
+        """IDs ativos das camadas informadas, em ordem crescente (mais antigos primeiro)."""
+        with self._lock:
+            self._garantir_atualizado()
+            ids = [self._camadas[n].ids() for n in niveis if n in self._camadas]
+        return sorted(int(i) for i in np.concatenate(ids)) if ids else []
+
+    def ultimo_id(self, nivel: str) -> int | None:
+        """ID mais recente da camada (None se vazia); só abre as partições mais recentes."""
+        with self._lock:
+            self._garantir_atualizado()
+            camada = self._camadas.get(nivel)
+            return camada.ultimo_id() if camada is not None else None
+
+    def vetor(self, registro_id: int) -> np.ndarray | None:
+        """Vetor armazenado para o registro (None se não estiver em nenhuma camada)."""
+        with self._lock:
+            self._garantir_atualizado()
+            for camada in self._camadas.values():
+                vetor = camada.vetor(registro_id)
+                if vetor is not None:
+                    return vetor
+            return None
+
+    def total_por_nivel(self) -> dict[str, int]:
+        with self._lock:
+            self._garantir_atualizado()
+            return {nivel: camada.ntotal for nivel, camada in self._camadas.items()}
+
+    def selecionar(self, filtros: dict, nivel: str | None = None) -> set[int]:
+        """IDs ativos que atendem aos filtros estruturados (ver TabelaAtributos.selecionar)."""
+        with self._lock:
+            self._garantir_atualizado()
+            ids_periodo = None
+            if filtros.get("inicio") or filtros.get("fim"):
+                ids_periodo = set(self.intervalo(filtros.get("inicio"), filtros.get("fim")))
+            return self._tabela_atributos().selecionar(filtros, nivel, ids_periodo)
+
+    # --- Consultas temporais ---
+    def intervalo(self, inicio: str | None, fim: str | None) -> list[int]:
+        """IDs cujo período se sobrepõe a [inicio, fim] (ISO8601), em ordem cronológica."""
+        inicio = epoch(inicio)
+        fim = epoch(fim)
+        with self._lock:
+            self._garantir_atualizado()
+            ids = self._tempo.intervalo(
+                float("-inf") if inicio is None else inicio,
+                float("inf") if fim is None else fim
+            )
+            return [int(i) for i in ids if self._log.ativo(int(i))]
+
+    def ids_expirados(self, nivel: str, limite: float) -> list[int]:
+        """IDs da camada cujo período terminou antes de `limite` (epoch), em ordem crescente."""
+        with self._lock:
+            self._garantir_atualizado()
+            camada = self._camadas.get(nivel)
+            if camada is None:
+                return []
+            return [int(i) for i in np.intersect1d(self._tempo.anteriores(limite), camada.ids())]
+
+    def mais_recentes(self, n: int = 1) -> list[int]:
+        """Os `n` registros mais recentes, do mais novo para o mais antigo."""
+        with self._lock:
+            self._garantir_atualizado()
+            ids = [int(i) for i in self._tempo.mais_recentes(n) if self._log.ativo(int(i))]
+            return ids
+
+    def buscar_por_nivel(
+        self,
+        query_vec,
+        k_por_nivel: dict[str, int],
+        filtros: dict | None = None,
+        ids_permitidos: set[int] | None = None
+    ) -> list[tuple[int, float, str]]:
+        """
+        Busca em cada camada pedida com seu próprio orçamento de k.
+        Retorna tuplas (ID, distância, nível); camadas ausentes do dicionário não são tocadas.
+        Filtros estruturados e `ids_permitidos` são aplicados dentro da busca;
+        com projeto e/ou período (filtros "projeto", "inicio"/"fim"), só as
+        partições desse projeto que se sobrepõem ao período são consultadas.
+        """
+        query_vec = np.asarray(query_vec, dtype=np.float32)
+        if query_vec.ndim == 1:
+            query_vec = query_vec.reshape(1, -1)
+        # O projeto é resolvido pela escolha das partições, sem a tabela de atributos
+        filtros = dict(filtros or {})
+        projetos = filtros.pop("projeto", None)
+        if projetos is not None:
+            projetos = set(projetos) if isinstance(projetos, (list, tuple, set, frozenset)) else {projetos}
+        inicio, fim = epoch(filtros.get("inicio")), epoch(filtros.get("fim"))
+        with self._lock:
+            self._garantir_atualizado()
+            resultados = []
+            for nivel, k in k_por_nivel.items():
+                camada = self._camadas.get(nivel)
+                if camada is None:
+                    continue
+                permitidos = None
+                if filtros:
+                    permitidos = self.selecionar(filtros, nivel)
+                if ids_permitidos is not None:
+                    permitidos = ids_permitidos if permitidos is None else permitidos & ids_permitidos
+                dists, ids = camada.buscar(query_vec, k, permitidos, inicio, fim, projetos)
+                resultados.extend(
+                    (int(i), float(d), nivel) for d, i in zip(dists[0], ids[0]) if i >= 0
+                )
+            return resultados
+
+    def buscar_texto(
+        self,
+        consulta: str,
+        k: int,
+        filtros: dict | None = None,
+        ids_permitidos: set[int] | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        Busca por palavra-chave (BM25) quando o backend de registros tem índice
+        de texto (SQLite + FTS5); lista vazia no log JSONL. Retorna (ID, bm25)
+        do mais para o menos relevante.
+
+        nivel, projeto e tags são filtrados pelo próprio SQL; só janela e
+        período são resolvidos aqui em IDs, e só quando informados.
+        """
+        with self._lock:
+            self._garantir_atualizado()
+            if not hasattr(self._log, "buscar_texto"):
+                return []
+            filtros = filtros or {}
+            restantes = {c: v for c, v in filtros.items() if c not in FILTROS_SQL and v}
+            permitidos = self.selecionar(restantes) if restantes else None
+            if ids_permitidos is not None:
+                permitidos = set(ids_permitidos) if permitidos is None else permitidos & set(ids_permitidos)
+            return self._log.buscar_texto(consulta, k, permitidos, filtros)
+
+    def buscar(self, query_vec, k: int):
+        """Busca vetorial em todas as camadas. Retorna (distâncias, IDs) como o FAISS."""
+        resultados = self.buscar_por_nivel(query_vec, {nivel: k for nivel in NIVEIS})
+        resultados.sort(key=lambda r: r[1])
+        resultados = resultados[:k]
+        dists = np.array([[d for _, d, _ in resultados]], dtype=np.float32)
+        ids = np.array([[i for i, _, _ in resultados]], dtype=np.int64)
+        return dists, ids
+
+    def obter(self, indices: list[int]) -> list[dict]:
+        """Retorna os registros com os IDs informados (ignora IDs inválidos ou removidos)."""
+        with self._lock:
+            self._garantir_atualizado()
+            return self._log.get_many([i for i in indices if isinstance(i, (int, np.integer))])
+
+    def obter_por_id(self, indices: list[int]) -> dict[int, dict]:
+        """Como `obter`, mas indexado pela posição de cada registro encontrado."""
+        with self._lock:
+            self._garantir_atualizado()
+            encontrados = {}
+            for i in indices:
+                bloco = self._log.get(i)
+                if bloco is not None:
+                    encontrados[int(i)] = bloco
+            return encontrados
+
+    def registro(self, i: int) -> dict | None:
+        blocos = self.obter([i])
+        return blocos[0] if blocos else None
+
+    def iterar(self):
+        """Percorre (posição, registro) sequencialmente, sem carregar tudo em memória."""
+        with self._lock:
+            self._garantir_atualizado()
+            log_registros = self._log
+        return log_registros.iterar()
+
+    def registros(self) -> list[dict]:
+        """Lista completa de registros ativos (leitura integral do log)."""
+        return [r for _, r in self.iterar()]
+
+    # --- Escrita ---
+    def adicionar(self, embedding_vector, registro: dict) -> int:
+        """
+        Adiciona um vetor e seu registro ao índice da camada do registro.
+        O ID estável do vetor é a posição do registro no log. Retorna esse ID.
+        A operação é durável assim que retorna (log + WAL); o índice em disco
+        é atualizado no próximo checkpoint.
+        """
+        nivel = registro.get("nivel", "curto")
+        if nivel not in NIVEIS:
+            nivel = "curto"
+        with self._lock:
+            self._garantir_atualizado()
+            if np.size(embedding_vector) != self._indice["dimensao"]:
+                # Vetor gerado pelo modelo anterior a uma troca de índice
+                raise ValueError(
+                    f"Vetor de dimensão {np.size(embedding_vector)}; o índice ativo "
+                    f"({self._indice['modelo']}) usa {self._indice['dimensao']}."
+                )
+            # O WAL vem antes do log: uma adição sem registro no log é descartada na reaplicação
+            self._wal.registrar_adicao(len(self._log), nivel, embedding_vector)
+            registro_id = self._log.append(registro)
+            if self._atributos is not None:
+                self._atributos.adicionar(registro_id, registro)
+            _, _, _, inicio, fim = extrair_atributos(registro)
+            self._tempo.adicionar(registro_id, inicio, fim)
+            self._camadas[nivel].adicionar(
+                [embedding_vector], [registro_id], [inicio], [fim], [projeto_do_registro(registro)]
+            )
+            self._geracao = self._geracao_em_disco()
+        self._agendar_checkpoint()
+        return registro_id
+
+    def remover(self, ids: list[int]) -> int:
+        """Remove vetores e registros pelos IDs estáveis, sem tocar nos demais."""
+        if not ids:
+            return 0
+        with self._lock:
+            self._garantir_atualizado()
+            self._wal.registrar_remocao(ids)
+            if self._mudancas_reindexacao is not None:
+                self._mudancas_reindexacao.extend((REMOCAO, int(i)) for i in ids)
+            removidos = sum(camada.remover(ids) for camada in self._camadas.values())
+            for registro_id in ids:
+                self._log.remover(registro_id)
+                if self._atributos is not None:
+                    self._atributos.remover(registro_id)
+            self._tempo.remover(ids)
+            self._geracao = self._geracao_em_disco()
+        self._agendar_checkpoint()
+        return removidos
+
+    def atualizar(self, registro_id: int, registro: dict):
+        """
+        Substitui o registro de um ID existente mantendo seu vetor (ex.: ao
+        fundir uma duplicata). Atributos e índice temporal são reindexados.
+        """
+        with self._lock:
+            self._garantir_atualizado()
+            self._wal.registrar_atualizacao(registro_id)
+            if self._mudancas_reindexacao is not None:
+                self._mudancas_reindexacao.append((ATUALIZACAO, int(registro_id)))
+            self._log.atualizar(registro_id, registro)
+            if self._atributos is not None:
+                self._atributos.adicionar(registro_id, registro)
+            _, _, _, inicio, fim = extrair_atributos(registro)
+            self._tempo.remover([registro_id])
+            self._tempo.adicionar(registro_id, inicio, fim)
+            camada = self._camadas.get(registro.get("nivel", "curto"))
+            if camada is not None:
+                camada.estender_periodo(registro_id, fim)
+            self._geracao = self._geracao_em_disco()
+        self._agendar_checkpoint()
+
+    def compactar(self, tamanho_lote: int = 4096) -> dict:
+        """
+        Recupera o espaço dos registros removidos: reconstrói em lotes as
+        camadas com exclusões (ver IndiceCamada.reconstruir), compacta o
+        armazenamento de registros preservando os IDs e faz um checkpoint.
+        Retorna {"vetores": descartados, "bytes_registros": recuperados}.
+        """
+        with self._lock:
+            self._garantir_atualizado()
+            camadas = list(self._camadas.values())
+        # A reconstrução só toma o lock de cada camada entre lotes
+        vetores = sum(camada.reconstruir(tamanho_lote) for camada in camadas)
+        with self._lock:
+            bytes_registros = self._log.compactar()
+            self._geracao = self._geracao_em_disco()
+        self.salvar()
+        return {"vetores": vetores, "bytes_registros": bytes_registros}
+
+    # --- Reindexação ---
+    def iniciar_reindexacao(self) -> int:
+        """
+        Passa a registrar remoções e atualizações para o índice em construção.
+        Retorna o tamanho do log: os registros anteriores são lidos pela
+        reindexação, os posteriores são recuperados antes da troca.
+        """
+        with self._lock:
+            self._garantir_atualizado()
+            self._mudancas_reindexacao = []
+            return len(self._log)
+
+    def cancelar_reindexacao(self):
+        with self._lock:
+            self._mudancas_reindexacao = None
+
+    def concluir_reindexacao(self, indice: dict, camadas: dict, recuperar):
+        """
+        Troca o índice ativo pelo reconstruído. Sob o lock (o tracker espera),
+        `recuperar(fim)` indexa nas `camadas` novas os registros acrescentados
+        até a posição `fim` do log, as remoções e atualizações registradas
+        desde `iniciar_reindexacao` são reaplicadas e as camadas são gravadas.
+        A troca em si é a gravação atômica do registro de modelos; outros
+        processos a detectam pela geração e recarregam.
+        """
+        with self._lock_checkpoint:
+            with self._lock:
+                self._garantir_atualizado()
+                recuperar(len(self._log))
+                for operacao, registro_id in self._mudancas_reindexacao or []:
+                    if operacao == REMOCAO:
+                        for camada in camadas.values():
+                            camada.remover([registro_id])
+                        continue
+                    registro = self._log.get(registro_id)
+                    camada = camadas.get((registro or {}).get("nivel", "curto"))
+                    if registro is not None and camada is not None:
+                        camada.estender_periodo(registro_id, extrair_atributos(registro)[4])
+                self._mudancas_reindexacao = None
+                for camada in camadas.values():
+                    camada.aguardar_promocao()
+                    camada.salvar(forcar=True)
+                # O índice temporal vale para qualquer modelo; o WAL antigo deixa de ser lido
+                self._tempo.salvar(len(self._log))
+                ativar_indice(indice["nome"])
+                self._carregar()
+        self.salvar()
+
+    # --- Checkpoint ---
+    def _agendar_checkpoint(self):
+        """Inicia a thread de checkpoint no primeiro uso e a acorda quando o lote enche."""
+        if self._thread_checkpoint is None:
+            with self._lock:
+                if self._thread_checkpoint is None:
+                    self._thread_checkpoint = threading.Thread(target=self._laco_checkpoint, daemon=True)
+                    self._thread_checkpoint.start()
+                    atexit.register(self._checkpoint_final)
+        if self._wal.pendentes >= MAX_PENDENTES:
+            self._evento_checkpoint.set()
+
+    def _laco_checkpoint(self):
+        while True:
+            self._evento_checkpoint.wait(INTERVALO_CHECKPOINT)
+            self._evento_checkpoint.clear()
+            if self._wal.pendentes:
+                try:
+                    self.salvar()
+                except Exception as e:
+                    log(f"Falha no checkpoint da memória: {e}. O WAL será mantido para a próxima tentativa.")
+
+    def _checkpoint_final(self):
+        if self._wal is not None and self._wal.pendentes:
+            self.salvar()
+
+    def salvar(self):
+        """
+        Checkpoint: grava os índices alterados e o índice temporal com
+        temp + rename e, por último, o manifesto; só então descarta o WAL.
+        Sob o lock do serviço ficam apenas a rotação do WAL e a serialização
+        dos índices; a gravação em disco não bloqueia o tracker.
+        """
+        with self._lock_checkpoint:
+            with self._lock:
+                if self._camadas is None:
+                    self._carregar()
+                self._wal.rotacionar()
+                instantaneos = [(camada, camada.instantaneo()) for camada in self._camadas.values()]
+                total_log = len(self._log)
+
+            gravados = 0
+            for camada, instantaneo in instantaneos:
+                if instantaneo is not None:
+                    camada.gravar(instantaneo)
+                    gravados += 1
+
+            with self._lock:
+                self._tempo.salvar(total_log)
+                self._manifesto = {
+                    "geracao": self._manifesto.get("geracao", 0) + 1,
+                    "salvo_em": datetime.now().isoformat(),
+                    "total_log": total_log,
+                    "indice": self._indice["nome"],
+                    "modelo": self._indice["modelo"],
+                    "dimensao": self._indice["dimensao"],
+                    "camadas": {
+                        nivel: {
+                            "vetores": camada.ntotal, "particoes": len(camada),
+                            "tipo": camada.tipo, "codec": camada.codec,
+                        }
+                        for nivel, camada in self._camadas.items()
+                    },
+                }
+                gravar_manifesto(MANIFEST_PATH, self._manifesto)
+                self._wal.descartar_anterior()
+                # As gravações do próprio processo não devem provocar recarga
+                self._geracao = self._geracao_em_disco()
+        log(f"Checkpoint da memória {self._manifesto['geracao']}: {gravados} índice(s) gravado(s).")
+
+    def recarregar(self):
+        with self._lock:
+            self._carregar()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_memory_service() -> MemoryService:
+    """Retorna a instância única do serviço de memória do processo."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MemoryService()
+        return _service
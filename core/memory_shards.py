@@ -0,0 +1,345 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import glob
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+from core.memory_index import IndiceCamada
+from core.checkpoint import gravar_atomico
+
+# Granularidade das partições: "week" (semana ISO) ou "day"
+PERIODO_PARTICAO = os.getenv("NEXUS_SHARD_PERIOD", "week").strip().lower()
+MAX_BUSCAS_PARALELAS = min(8, os.cpu_count() or 1)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def chave_particao(instante: float | None) -> str:
+    """Chave da partição de um instante (epoch): "2026-W42" por semana ou "2026-10-18" por dia."""
+    data = datetime.fromtimestamp(time.time() if instante is None else instante)
+    if PERIODO_PARTICAO == "day":
+        return data.strftime("%Y-%m-%d")
+    ano, semana, _ = data.isocalendar()
+    return f"{ano}-W{semana:02d}"
+
+
+def chave_shard(projeto: str, instante: float | None) -> str:
+    """Chave da partição no catálogo: "<projeto>/<período>", ou só o período sem projeto."""
+    periodo = chave_particao(instante)
+    return f"{projeto}/{periodo}" if projeto else periodo
+
+
+def caminho_catalogo(diretorio: str, nivel: str) -> str:
+    return os.path.join(diretorio, f"catalogo_{nivel}.json")
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_BUSCAS_PARALELAS, thread_name_prefix="shard")
+        return _executor
+
+
+class CamadaParticionada:
+    """
+    Camada da memória dividida em partições por projeto e período (semana
+    ou dia), cada uma com seu próprio IndiceCamada, mais um catálogo em JSON
+    com o projeto, o período coberto, o total de vetores e a faixa de IDs de
+    cada partição.
+
+    As partições só são abertas quando uma operação precisa delas: buscas
+    com projeto e/ou período consultam apenas as partições desse projeto que
+    se sobrepõem ao período (em
+    paralelo, com os resultados fundidos por distância), e leituras ou
+    remoções por ID só tocam as partições cuja faixa de IDs os contém. Os
+    registros continuam no log único: os IDs são globais e o período de
+    cada um está no índice temporal.
+
+    Tem a mesma interface do IndiceCamada, de modo que o MemoryService não
+    distingue uma camada particionada de uma única.
+    """
+
+    def __init__(self, nivel: str, diretorio: str, dimensao: int):
+        self.nivel = nivel
+        self.diretorio = diretorio
+        self.dimensao = dimensao
+        self.path_catalogo = caminho_catalogo(diretorio, nivel)
+        self._lock = threading.RLock()
+        self._particoes = {}
+        self._catalogo_sujo = False
+        try:
+            with open(self.path_catalogo, "r", encoding="utf-8") as f:
+                self.catalogo = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.catalogo = {}
+
+    # --- Partições ---
+    def _dir_particao(self, chave: str) -> str:
+        return os.path.join(self.diretorio, *chave.split("/"))
+
+    def _path_particao(self, chave: str) -> str:
+        return os.path.join(self._dir_particao(chave), f"dev_activity_index_{self.nivel}.faiss")
+
+    def _particao(self, chave: str) -> IndiceCamada:
+        """Abre a partição no primeiro uso."""
+        with self._lock:
+            particao = self._particoes.get(chave)
+            if particao is None:
+                os.makedirs(self._dir_particao(chave), exist_ok=True)
+                particao = IndiceCamada(self.nivel, self._path_particao(chave), self.dimensao)
+                self._particoes[chave] = particao
+            return particao
+
+    def _atualizar_catalogo(self, chave: str, ids=None, inicio=None, fim=None, projeto: str = ""):
+        entrada = self.catalogo.setdefault(
+            chave, {"projeto": projeto, "inicio": None, "fim": None, "vetores": 0, "id_min": None, "id_max": None}
+        )
+        if inicio is not None:
+            entrada["inicio"] = inicio if entrada["inicio"] is None else min(entrada["inicio"], inicio)
+        if fim is not None:
+            entrada["fim"] = fim if entrada["fim"] is None else max(entrada["fim"], fim)
+        if ids is not None and len(ids):
+            menor, maior = int(np.min(ids)), int(np.max(ids))
+            entrada["id_min"] = menor if entrada["id_min"] is None else min(entrada["id_min"], menor)
+            entrada["id_max"] = maior if entrada["id_max"] is None else max(entrada["id_max"], maior)
+        entrada["vetores"] = self._particoes[chave].ntotal
+        self._catalogo_sujo = True
+
+    def _chaves_por_id(self, ids) -> list[str]:
+        """Partições cuja faixa de IDs contém algum dos IDs."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size == 0:
+            return []
+        return [
+            chave for chave, e in self.catalogo.items()
+            if e["id_min"] is not None and np.any((ids >= e["id_min"]) & (ids <= e["id_max"]))
+        ]
+
+    def _chaves_por_periodo(self, inicio: float | None, fim: float | None, projetos=None) -> list[str]:
+        """Partições dos `projetos` (None = todos) que se sobrepõem a [inicio, fim] (extremos None = abertos)."""
+        chaves = []
+        for chave, e in self.catalogo.items():
+            if e["vetores"] <= 0:
+                continue
+            if projetos is not None and e.get("projeto", "") not in projetos:
+                continue
+            if fim is not None and e["inicio"] is not None and e["inicio"] > fim:
+                continue
+            if inicio is not None and e["fim"] is not None and e["fim"] < inicio:
+                continue
+            chaves.append(chave)
+        return chaves
+
+    def __len__(self):
+        return len(self.catalogo)
+
+    # --- Leitura ---
+    @property
+    def ntotal(self) -> int:
+        with self._lock:
+            return sum(
+                self._particoes[c].ntotal if c in self._particoes else e["vetores"]
+                for c, e in self.catalogo.items()
+            )
+
+    def _mais_recente(self) -> IndiceCamada | None:
+        with self._lock:
+            if not self.catalogo:
+                return None
+            return self._particao(max(self.catalogo, key=lambda c: self.catalogo[c]["fim"] or 0))
+
+    @property
+    def tipo(self) -> str:
+        particao = self._mais_recente()
+        return particao.tipo if particao is not None else "flat"
+
+    @property
+    def codec(self) -> str:
+        particao = self._mais_recente()
+        return particao.codec if particao is not None else "flat"
+
+    def ids(self) -> np.ndarray:
+        """IDs presentes em todas as partições (abre todas)."""
+        with self._lock:
+            chaves = sorted(self.catalogo)
+        ids = [self._particao(c).ids() for c in chaves]
+        return np.sort(np.concatenate(ids)) if ids else np.empty(0, dtype=np.int64)
+
+    def ultimo_id(self) -> int | None:
+        """Maior ID presente, abrindo as partições da faixa de IDs mais alta para a mais baixa."""
+        with self._lock:
+            ordem = sorted(
+                ((e["id_max"], c) for c, e in self.catalogo.items() if e["id_max"] is not None),
+                reverse=True
+            )
+        melhor = None
+        for id_max, chave in ordem:
+            if melhor is not None and id_max <= melhor:
+                break
+            ids = self._particao(chave).ids()
+            if ids.size:
+                melhor = max(melhor if melhor is not None else -1, int(ids.max()))
+        return melhor
+
+    def vetor(self, registro_id: int) -> np.ndarray | None:
+        for chave in self._chaves_por_id([registro_id]):
+            vetor = self._particao(chave).vetor(registro_id)
+            if vetor is not None:
+                return vetor
+        return None
+
+    def buscar(
+        self, query_vec, k: int, ids_permitidos=None,
+        inicio: float | None = None, fim: float | None = None, projetos=None
+    ):
+        """
+        Busca nas partições dos `projetos` (None = todos) que se sobrepõem a
+        [inicio, fim], em paralelo, e funde os top-k por distância. Com
+        `ids_permitidos`, cada partição recebe só os IDs da sua faixa e
+        partições sem nenhum são puladas.
+        """
+        vazio = (np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64))
+        with self._lock:
+            chaves = self._chaves_por_periodo(inicio, fim, projetos)
+            tarefas = []
+            if ids_permitidos is not None:
+                permitidos = np.fromiter(ids_permitidos, dtype=np.int64)
+                for chave in chaves:
+                    e = self.catalogo[chave]
+                    faixa = permitidos[(permitidos >= e["id_min"]) & (permitidos <= e["id_max"])]
+                    if faixa.size:
+                        tarefas.append((self._particao(chave), set(faixa.tolist())))
+            else:
+                tarefas = [(self._particao(chave), None) for chave in chaves]
+        if not tarefas or k <= 0:
+            return vazio
+        if len(tarefas) == 1:
+            return tarefas[0][0].buscar(query_vec, k, tarefas[0][1])
+        resultados = list(_pool().map(lambda t: t[0].buscar(query_vec, k, t[1]), tarefas))
+        dists = np.concatenate([d[0] for d, _ in resultados])
+        ids = np.concatenate([i[0] for _, i in resultados])
+        ordem = np.argsort(dists, kind="stable")[:k]
+        return dists[ordem].reshape(1, -1), ids[ordem].reshape(1, -1)
+
+    # --- Escrita ---
+    def adicionar(self, vetores, ids, inicios=None, fins=None, projetos=None):
+        """
+        Adiciona os vetores na partição do projeto e do início de cada
+        registro (`inicios` em epoch; None = agora). `fins` estende o período
+        da partição no catálogo (blocos médios e longos cobrem um intervalo).
+        """
+        vetores = np.asarray(vetores, dtype=np.float32).reshape(-1, self.dimensao)
+        ids = np.asarray(ids, dtype=np.int64)
+        agora = time.time()
+        inicios = [agora if i is None else i for i in (inicios if inicios is not None else [None] * len(ids))]
+        fins = [i if f is None else f for i, f in zip(inicios, fins if fins is not None else [None] * len(ids))]
+        projetos = [p or "" for p in (projetos if projetos is not None else [""] * len(ids))]
+        grupos = {}
+        for n, instante in enumerate(inicios):
+            grupos.setdefault(chave_shard(projetos[n], instante), []).append(n)
+        with self._lock:
+            for chave, posicoes in grupos.items():
+                self._particao(chave).adicionar(vetores[posicoes], ids[posicoes])
+                self._atualizar_catalogo(
+                    chave, ids[posicoes],
+                    min(inicios[n] for n in posicoes), max(fins[n] for n in posicoes), projetos[posicoes[0]]
+                )
+
+    def estender_periodo(self, registro_id: int, fim: float | None):
+        """Amplia no catálogo o período da partição do registro (ex.: duplicata fundida)."""
+        with self._lock:
+            for chave in self._chaves_por_id([registro_id]):
+                entrada = self.catalogo[chave]
+                if fim is not None and (entrada["fim"] is None or fim > entrada["fim"]):
+                    entrada["fim"] = fim
+                    self._catalogo_sujo = True
+
+    def remover(self, ids) -> int:
+        ids = np.asarray(ids, dtype=np.int64)
+        removidos = 0
+        with self._lock:
+            for chave in self._chaves_por_id(ids):
+                removidos += self._particao(chave).remover(ids)
+                self._atualizar_catalogo(chave)
+        return removidos
+
+    def aguardar_promocao(self, timeout: float | None = None):
+        with self._lock:
+            particoes = list(self._particoes.values())
+        for particao in particoes:
+            particao.aguardar_promocao(timeout)
+
+    def reconstruir(self, tamanho_lote: int = 4096) -> int:
+        """
+        Reconstrói cada partição (ver IndiceCamada.reconstruir) e apaga as
+        que ficaram vazias. Retorna o número de vetores descartados.
+        """
+        with self._lock:
+            chaves = sorted(self.catalogo)
+        descartados = 0
+        for chave in chaves:
+            particao = self._particao(chave)
+            descartados += particao.reconstruir(tamanho_lote)
+            with self._lock:
+                if particao.ntotal == 0 and particao._mudancas is None:
+                    self._descartar_particao(chave)
+                else:
+                    ids = particao.ids()
+                    entrada = self.catalogo[chave]
+                    entrada["id_min"] = int(ids.min()) if ids.size else None
+                    entrada["id_max"] = int(ids.max()) if ids.size else None
+                    self._atualizar_catalogo(chave)
+        return descartados
+
+    def _descartar_particao(self, chave: str):
+        self._particoes.pop(chave, None)
+        self.catalogo.pop(chave, None)
+        self._catalogo_sujo = True
+        # O diretório do período é compartilhado pelas camadas: só apaga os arquivos desta
+        for path in glob.glob(glob.escape(self._path_particao(chave)) + "*"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Ainda mapeado por outro processo; some na próxima rodada
+        try:
+            os.removedirs(self._dir_particao(chave))
+        except OSError:
+            pass  # Outras camadas ainda usam o diretório
+
+    # --- Persistência ---
+    def instantaneo(self, forcar: bool = False):
+        """Instantâneos das partições abertas alteradas e do catálogo (None se nada mudou)."""
+        with self._lock:
+            particoes = []
+            for particao in self._particoes.values():
+                inst = particao.instantaneo(forcar)
+                if inst is not None:
+                    particoes.append((particao, inst))
+            if not particoes and not (self._catalogo_sujo or forcar or not os.path.exists(self.path_catalogo)):
+                return None
+            self._catalogo_sujo = False
+            catalogo = json.dumps(self.catalogo, ensure_ascii=False, indent=2, sort_keys=True).encode("utf-8")
+            return particoes, catalogo
+
+    def gravar(self, instantaneo):
+        """Grava as partições e, por último, o catálogo."""
+        particoes, catalogo = instantaneo
+        try:
+            for particao, inst in particoes:
+                particao.gravar(inst)
+            os.makedirs(self.diretorio, exist_ok=True)
+            gravar_atomico(self.path_catalogo, catalogo)
+        except OSError:
+            self._catalogo_sujo = True
+            raise
+
+    def salvar(self, forcar: bool = False):
+        instantaneo = self.instantaneo(forcar)
+        if instantaneo is not None:
+            self.gravar(instantaneo)
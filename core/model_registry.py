@@ -0,0 +1,148 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import re
+import shutil
+import threading
+from datetime import datetime
+from core.storage import EMBEDDING_REGISTRY_PATH, FAISS_DIR, SHARD_DIR, WAL_PATH
+from core.checkpoint import gravar_atomico
+
+# Modelo e dimensão da memória criada antes do registro (e de uma memória nova)
+MODELO_PADRAO = "all-MiniLM-L6-v2"
+DIMENSAO_PADRAO = 384
+INDICE_LEGADO = os.path.basename(SHARD_DIR)
+
+# Estados de um índice no registro
+CONSTRUINDO = "construindo"  # reindexação em andamento (ou interrompida)
+ATIVO = "ativo"
+INATIVO = "inativo"  # substituído; os arquivos são apagados pelo vacuum
+
+_lock = threading.Lock()
+_cache = {"assinatura": None, "registro": None}
+
+
+def _registro_inicial() -> dict:
+    return {
+        "ativo": INDICE_LEGADO,
+        "indices": {
+            INDICE_LEGADO: {
+                "modelo": MODELO_PADRAO,
+                "dimensao": DIMENSAO_PADRAO,
+                "shards": INDICE_LEGADO,
+                "wal": os.path.basename(WAL_PATH),
+                "estado": ATIVO,
+                "criado_em": None,
+            }
+        },
+    }
+
+
+def ler_registro(path: str = EMBEDDING_REGISTRY_PATH) -> dict:
+    """
+    Registro dos índices de embeddings: qual está ativo e, para cada um, o
+    modelo e a dimensão dos vetores, as pastas de partições e o WAL. Sem o
+    arquivo, descreve a memória original (MODELO_PADRAO em `shards/`).
+    Relido só quando o arquivo muda (outro processo trocou o índice).
+    """
+    try:
+        st = os.stat(path)
+        assinatura = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return _registro_inicial()
+    with _lock:
+        if _cache["assinatura"] != assinatura:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _cache["registro"] = json.load(f)
+            except json.JSONDecodeError:
+                _cache["registro"] = _registro_inicial()
+            _cache["assinatura"] = assinatura
+        return json.loads(json.dumps(_cache["registro"]))
+
+
+def gravar_registro(registro: dict, path: str = EMBEDDING_REGISTRY_PATH):
+    gravar_atomico(path, json.dumps(registro, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def indice_ativo() -> dict:
+    """Entrada do índice em uso, com o nome em "nome"."""
+    registro = ler_registro()
+    nome = registro["ativo"]
+    return dict(registro["indices"][nome], nome=nome)
+
+
+def modelo_ativo() -> str:
+    return indice_ativo()["modelo"]
+
+
+def caminhos_indice(entrada: dict) -> tuple[str, str]:
+    """(pasta das partições, WAL) de uma entrada do registro."""
+    return os.path.join(FAISS_DIR, entrada["shards"]), os.path.join(FAISS_DIR, entrada["wal"])
+
+
+def novo_indice(modelo: str, dimensao: int) -> dict:
+    """Registra um índice vazio (em construção) para o modelo, ao lado do ativo."""
+    sufixo = re.sub(r"[^\w.-]", "_", modelo) + datetime.now().strftime("_%Y%m%d%H%M%S")
+    entrada = {
+        "modelo": modelo,
+        "dimensao": int(dimensao),
+        "shards": f"{INDICE_LEGADO}_{sufixo}",
+        "wal": f"dev_activity_index_{sufixo}.wal",
+        "estado": CONSTRUINDO,
+        "criado_em": datetime.now().isoformat(),
+    }
+    registro = ler_registro()
+    registro["indices"][entrada["shards"]] = entrada
+    gravar_registro(registro)
+    return dict(entrada, nome=entrada["shards"])
+
+
+def ativar_indice(nome: str):
+    """Troca o índice ativo com uma única gravação atômica do registro."""
+    registro = ler_registro()
+    anterior = registro["ativo"]
+    if anterior != nome:
+        registro["indices"][anterior]["estado"] = INATIVO
+    registro["indices"][nome]["estado"] = ATIVO
+    registro["indices"][nome]["ativado_em"] = datetime.now().isoformat()
+    registro["ativo"] = nome
+    gravar_registro(registro)
+
+
+def _apagar_arquivos(entrada: dict) -> bool:
+    shard_dir, wal = caminhos_indice(entrada)
+    try:
+        shutil.rmtree(shard_dir, ignore_errors=False)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return False  # ainda mapeado por outro processo; fica para a próxima rodada
+    for path in (wal, wal + ".anterior"):
+        if os.path.exists(path):
+            os.remove(path)
+    return True
+
+
+def descartar_indices(estados: tuple = (INATIVO,)) -> list[str]:
+    """
+    Apaga os arquivos dos índices nos estados dados e os tira do registro.
+    Retorna os nomes removidos. O índice ativo nunca é apagado.
+    """
+    registro = ler_registro()
+    removidos = [
+        nome for nome, entrada in registro["indices"].items()
+        if nome != registro["ativo"] and entrada.get("estado") in estados and _apagar_arquivos(entrada)
+    ]
+    if removidos:
+        registro = ler_registro()
+        for nome in removidos:
+            registro["indices"].pop(nome, None)
+        gravar_registro(registro)
+    return removidos
+
+
+def pastas_dos_indices() -> list[tuple[str, str]]:
+    """(pasta das partições, WAL) de todos os índices registrados."""
+    return [caminhos_indice(entrada) for entrada in ler_registro()["indices"].values()]
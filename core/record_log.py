@@ -0,0 +1,295 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import threading
+from array import array
+
+REMOVIDO = -1  # Offset usado para marcar registros apagados (tombstone)
+MAGICO_IDX = -0x4E5849  # Primeiro int64 de um `.idx` com cabeçalho (nunca é um offset)
+CABECALHO = 16  # Bytes do cabeçalho do `.idx`: MAGICO_IDX e a posição do log coberta
+
+
+class RecordLog:
+    """
+    Log de registros append-only em JSONL com um índice lateral de offsets.
+
+    Cada registro ocupa uma linha do arquivo `.jsonl`; o arquivo `.idx` guarda,
+    para cada posição, o offset (int64) da linha correspondente. Acrescentar
+    um registro custa O(1) e ler a posição i é um único seek, sem parse do
+    arquivo inteiro. Atualizações gravam uma nova linha e apenas repontam o
+    offset; o espaço antigo é recuperado em `compactar`.
+
+    O cabeçalho do `.idx` guarda até onde o log já foi contabilizado (linhas
+    indexadas, substituídas ou removidas). Só o que vem depois disso é
+    candidato a registro novo na recuperação após uma interrupção.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or os.path.splitext(path)[0] + ".idx"
+        self._lock = threading.RLock()
+        self._offsets = array("q")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._abrir()
+
+    # --- Abertura e recuperação ---
+    def _abrir(self):
+        self._concluir_compactacao()
+        for p in (self.path, self.index_path):
+            if not os.path.exists(p):
+                open(p, "ab").close()
+        with open(self.index_path, "rb") as f:
+            dados = f.read()
+        cabecalho = array("q", dados[:CABECALHO]) if len(dados) >= CABECALHO else array("q")
+        coberto = None
+        if cabecalho and cabecalho[0] == MAGICO_IDX:
+            coberto = cabecalho[1]
+            dados = dados[CABECALHO:]
+        dados = dados[:len(dados) - len(dados) % self._offsets.itemsize]
+        self._offsets = array("q")
+        self._offsets.frombytes(dados)
+        self._recuperar_cauda(coberto)
+        self._removidos = self._offsets.count(REMOVIDO)
+
+    def _concluir_compactacao(self):
+        """
+        Uma compactação troca primeiro o log e depois o índice. Se só o `.tmp`
+        do índice sobrou, o log novo já está no lugar e a troca é concluída;
+        se sobraram os dois, o log antigo continua valendo e os temporários
+        são descartados.
+        """
+        tmp_log, tmp_idx = self.path + ".tmp", self.index_path + ".tmp"
+        if os.path.exists(tmp_idx) and not os.path.exists(tmp_log):
+            os.replace(tmp_idx, self.index_path)
+        for tmp in (tmp_log, tmp_idx):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _recuperar_cauda(self, coberto: int | None):
+        """
+        Reconcilia o índice com o log após uma interrupção: linhas completas
+        depois da posição coberta e sem offset são indexadas e uma linha
+        parcial no fim é descartada. `coberto` None é um `.idx` antigo, sem
+        cabeçalho: vazio, o log inteiro é indexado; com offsets, o log é
+        tomado como todo coberto e o índice ganha o cabeçalho.
+        """
+        tamanho = os.path.getsize(self.path)
+        if max(self._offsets, default=REMOVIDO) >= tamanho:
+            # Índice aponta para além do log: reconstrói do zero
+            self._reconstruir_indice()
+            return
+        legado = coberto is None
+        if legado:
+            coberto = self._fim_ultima_linha(tamanho) if self._offsets else 0
+        if coberto > tamanho:
+            # Atualização interrompida (a posição coberta é gravada antes da linha)
+            coberto = tamanho = self._fim_ultima_linha(tamanho)
+        # Um append interrompido pode ter gravado o offset antes da posição coberta
+        indexados = {o for o in self._offsets if o >= coberto}
+        novos = array("q")
+        with open(self.path, "rb") as f:
+            f.seek(coberto)
+            while True:
+                pos = f.tell()
+                linha = f.readline()
+                if not linha:
+                    break
+                if not linha.endswith(b"\n"):
+                    tamanho = pos
+                    break
+                if pos not in indexados:
+                    novos.append(pos)
+        if os.path.getsize(self.path) != tamanho:
+            with open(self.path, "r+b") as f:
+                f.truncate(tamanho)
+        self._offsets.extend(novos)
+        if legado:
+            self._gravar_indice(tamanho)
+        elif novos or coberto != tamanho:
+            with open(self.index_path, "r+b") as f:
+                f.seek(0, os.SEEK_END)
+                f.write(novos.tobytes())
+                self._gravar_coberto(f, tamanho)
+
+    def _fim_ultima_linha(self, tamanho: int) -> int:
+        """Posição logo depois da última quebra de linha do log (0 se não houver)."""
+        with open(self.path, "rb") as f:
+            fim = tamanho
+            while fim > 0:
+                inicio = max(0, fim - 65536)
+                f.seek(inicio)
+                bloco = f.read(fim - inicio)
+                quebra = bloco.rfind(b"\n")
+                if quebra >= 0:
+                    return inicio + quebra + 1
+                fim = inicio
+        return 0
+
+    def _reconstruir_indice(self):
+        self._offsets = array("q")
+        fim = 0
+        with open(self.path, "rb") as f:
+            while True:
+                pos = f.tell()
+                linha = f.readline()
+                if not linha.endswith(b"\n"):
+                    break
+                self._offsets.append(pos)
+                fim = f.tell()
+        with open(self.path, "r+b") as f:
+            f.truncate(fim)
+        self._gravar_indice(fim)
+
+    def _gravar_indice(self, coberto: int):
+        with open(self.index_path, "wb") as f:
+            f.write(array("q", [MAGICO_IDX, coberto]).tobytes())
+            f.write(self._offsets.tobytes())
+
+    @staticmethod
+    def _gravar_coberto(f, coberto: int):
+        f.seek(CABECALHO // 2)
+        f.write(array("q", [coberto]).tobytes())
+
+    # --- Leitura ---
+    def __len__(self):
+        return len(self._offsets)
+
+    def total_ativos(self) -> int:
+        return len(self._offsets) - self._removidos
+
+    def ultimo_ativo(self) -> int | None:
+        for i in range(len(self._offsets) - 1, -1, -1):
+            if self._offsets[i] != REMOVIDO:
+                return i
+        return None
+
+    def _ler(self, f, i):
+        if not 0 <= i < len(self._offsets) or self._offsets[i] == REMOVIDO:
+            return None
+        f.seek(self._offsets[i])
+        return json.loads(f.readline())
+
+    def get(self, i: int) -> dict | None:
+        with self._lock, open(self.path, "rb") as f:
+            return self._ler(f, int(i))
+
+    def get_many(self, indices: list[int]) -> list[dict]:
+        """Lê apenas as posições pedidas (na ordem pedida), ignorando inválidas."""
+        with self._lock, open(self.path, "rb") as f:
+            blocos = (self._ler(f, int(i)) for i in indices)
+            return [b for b in blocos if b is not None]
+
+    def ativo(self, i: int) -> bool:
+        return 0 <= i < len(self._offsets) and self._offsets[i] != REMOVIDO
+
+    def ids_ativos(self) -> list[int]:
+        return [i for i, o in enumerate(self._offsets) if o != REMOVIDO]
+
+    def iterar(self):
+        """Percorre (posição, registro) de todos os registros ativos."""
+        with self._lock:
+            offsets = list(self._offsets)
+        with open(self.path, "rb") as f:
+            for i, o in enumerate(offsets):
+                if o == REMOVIDO:
+                    continue
+                f.seek(o)
+                yield i, json.loads(f.readline())
+
+    # --- Escrita ---
+    @staticmethod
+    def _linha(registro: dict) -> bytes:
+        return (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _gravar_linha(self, linha: bytes) -> int:
+        with open(self.path, "ab") as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(linha)
+        return offset
+
+    def append(self, registro: dict) -> int:
+        """Acrescenta um registro e retorna sua posição."""
+        with self._lock:
+            linha = self._linha(registro)
+            offset = self._gravar_linha(linha)
+            with open(self.index_path, "r+b") as f:
+                f.seek(0, os.SEEK_END)
+                f.write(array("q", [offset]).tobytes())
+                self._gravar_coberto(f, offset + len(linha))
+            self._offsets.append(offset)
+            return len(self._offsets) - 1
+
+    def extend(self, registros: list[dict]) -> list[int]:
+        with self._lock:
+            return [self.append(r) for r in registros]
+
+    def _repontar(self, i: int, offset: int):
+        with open(self.index_path, "r+b") as f:
+            f.seek(CABECALHO + i * self._offsets.itemsize)
+            f.write(array("q", [offset]).tobytes())
+        self._offsets[i] = offset
+
+    def atualizar(self, i: int, registro: dict):
+        """Substitui o registro da posição i sem reescrever o log."""
+        with self._lock:
+            if not self.ativo(i):
+                raise IndexError(f"Registro {i} inexistente no log.")
+            linha = self._linha(registro)
+            # Cobre a linha antes de gravá-la: interrompida antes de repontar,
+            # ela fica órfã em vez de voltar como registro novo na recuperação
+            with open(self.index_path, "r+b") as f:
+                self._gravar_coberto(f, os.path.getsize(self.path) + len(linha))
+            self._repontar(i, self._gravar_linha(linha))
+
+    def remover(self, i: int):
+        with self._lock:
+            if self.ativo(i):
+                self._repontar(i, REMOVIDO)
+                self._removidos += 1
+
+    def compactar(self) -> int:
+        """
+        Reescreve o log só com as linhas vivas (sem registros removidos nem
+        versões antigas de registros atualizados), preservando os IDs: as
+        posições removidas continuam marcadas no índice. Retorna os bytes
+        recuperados.
+        """
+        with self._lock:
+            antes = os.path.getsize(self.path)
+            offsets = array("q")
+            tmp_log, tmp_idx = self.path + ".tmp", self.index_path + ".tmp"
+            with open(self.path, "rb") as origem, open(tmp_log, "wb") as destino:
+                for o in self._offsets:
+                    if o == REMOVIDO:
+                        offsets.append(REMOVIDO)
+                        continue
+                    origem.seek(o)
+                    offsets.append(destino.tell())
+                    destino.write(origem.readline())
+                destino.flush()
+                os.fsync(destino.fileno())
+            with open(tmp_idx, "wb") as f:
+                f.write(array("q", [MAGICO_IDX, os.path.getsize(tmp_log)]).tobytes())
+                f.write(offsets.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_log, self.path)
+            os.replace(tmp_idx, self.index_path)
+            self._offsets = offsets
+            return antes - os.path.getsize(self.path)
+
+
+def migrar_json_legado(json_path: str, log: RecordLog) -> int:
+    """
+    Migração única do antigo metadata em JSON para o log append-only.
+    O arquivo antigo é renomeado para `.migrado` e nunca mais é lido.
+    """
+    if not os.path.exists(json_path) or len(log) > 0:
+        return 0
+    with open(json_path, "r", encoding="utf-8") as f:
+        registros = json.load(f)
+    log.extend(registros)
+    os.replace(json_path, json_path + ".migrado")
+    return len(registros)
@@ -0,0 +1,134 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from core.memory_index import NIVEIS
+from core.memory_filters import extrair_atributos, projeto_do_registro, texto_para_embedding
+from core.memory_shards import CamadaParticionada
+from core.model_registry import CONSTRUINDO, caminhos_indice, descartar_indices, novo_indice
+from utils.logger import write_monitor_log as log
+
+TAMANHO_LOTE = int(os.getenv("NEXUS_REINDEX_BATCH", "256"))  # registros por lote enviado ao modelo
+WORKERS = int(os.getenv("NEXUS_REINDEX_WORKERS", "2"))
+
+
+class _Indexador:
+    """
+    Recebe (ID, registro) em fluxo, agrupa em lotes, codifica os lotes num
+    pool de threads (com no máximo 2 lotes por thread em voo) e acrescenta
+    os vetores às camadas novas na ordem de chegada.
+    """
+
+    def __init__(self, camadas: dict, codificar, tamanho_lote: int, workers: int):
+        self.camadas = camadas
+        self.codificar = codificar
+        self.tamanho_lote = tamanho_lote
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reindex")
+        self._em_voo = deque()
+        self._lote = []
+        self.total = 0
+
+    def adicionar(self, registro_id: int, registro: dict):
+        self._lote.append((registro_id, registro))
+        if len(self._lote) >= self.tamanho_lote:
+            self._enviar()
+
+    def _enviar(self):
+        if not self._lote:
+            return
+        lote, self._lote = self._lote, []
+        futuro = self._pool.submit(self.codificar, [texto_para_embedding(r) for _, r in lote])
+        self._em_voo.append((lote, futuro))
+        while len(self._em_voo) > 2 * self.workers:
+            self._gravar(*self._em_voo.popleft())
+
+    def _gravar(self, lote, futuro):
+        vetores = futuro.result()
+        por_nivel = {}
+        for (registro_id, registro), vetor in zip(lote, vetores):
+            nivel = registro.get("nivel", "curto")
+            por_nivel.setdefault(nivel if nivel in self.camadas else "curto", []).append((registro_id, registro, vetor))
+        for nivel, itens in por_nivel.items():
+            atributos = [extrair_atributos(r) for _, r, _ in itens]
+            self.camadas[nivel].adicionar(
+                [v for _, _, v in itens], [i for i, _, _ in itens],
+                [a[3] for a in atributos], [a[4] for a in atributos],
+                [projeto_do_registro(r) for _, r, _ in itens],
+            )
+        self.total += len(lote)
+
+    def esvaziar(self):
+        """Envia o lote parcial e espera todos os lotes em voo."""
+        self._enviar()
+        while self._em_voo:
+            self._gravar(*self._em_voo.popleft())
+
+    def encerrar(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def reindexar(modelo: str, tamanho_lote: int = TAMANHO_LOTE, workers: int = WORKERS, memoria=None) -> dict:
+    """
+    Reconstrói a memória vetorial com outro modelo de embeddings, sem parar
+    o tracker: os registros do log são lidos em fluxo e codificados em lotes
+    num pool de threads, e o índice novo é montado numa pasta própria ao
+    lado do atual. Os registros que chegam durante a reconstrução são
+    recuperados em rodadas; a última, sob o lock do serviço de memória,
+    precede a troca atômica do índice ativo (ver
+    MemoryService.concluir_reindexacao). O índice antigo fica inativo e é
+    apagado pelo vacuum. Retorna um resumo da reindexação.
+    """
+    from models.embedding import codificador, dimensao_modelo
+    if memoria is None:
+        from core.memory_service import get_memory_service
+        memoria = get_memory_service()
+    inicio = time.perf_counter()
+    # Restos de uma reindexação interrompida
+    descartar_indices((CONSTRUINDO,))
+    dimensao = dimensao_modelo(modelo)
+    indice = novo_indice(modelo, dimensao)
+    shard_dir, _ = caminhos_indice(indice)
+    camadas = {nivel: CamadaParticionada(nivel, shard_dir, dimensao) for nivel in NIVEIS}
+    indexador = _Indexador(camadas, codificador(modelo), max(1, tamanho_lote), max(1, workers))
+    log(f"Reindexação: construindo índice '{indice['nome']}' ({modelo}, {dimensao} dimensões).")
+
+    def recuperar(coberto: int, fim: int) -> int:
+        for registro_id, registro in sorted(memoria.obter_por_id(list(range(coberto, fim))).items()):
+            indexador.adicionar(registro_id, registro)
+        indexador.esvaziar()
+        return fim
+
+    try:
+        coberto = memoria.iniciar_reindexacao()
+        for registro_id, registro in memoria.iterar():
+            if registro_id < coberto:
+                indexador.adicionar(registro_id, registro)
+        indexador.esvaziar()
+        # Rodadas de recuperação fora do lock enquanto houver muitos registros novos
+        while memoria.tamanho_log() - coberto > tamanho_lote:
+            coberto = recuperar(coberto, memoria.tamanho_log())
+        memoria.concluir_reindexacao(indice, camadas, lambda fim: recuperar(coberto, fim))
+    except BaseException:
+        memoria.cancelar_reindexacao()
+        indexador.encerrar()
+        del camadas
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        descartar_indices((CONSTRUINDO,))
+        raise
+    indexador.encerrar()
+    resumo = {
+        "indice": indice["nome"],
+        "modelo": modelo,
+        "dimensao": dimensao,
+        "registros": indexador.total,
+        "duracao_s": time.perf_counter() - inicio,
+    }
+    log(
+        f"Reindexação concluída: {resumo['registros']} registros com {modelo} "
+        f"em {resumo['duracao_s']:.1f} s; índice ativo agora é '{indice['nome']}'."
+    )
+    return resumo
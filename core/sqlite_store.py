@@ -0,0 +1,253 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import re
+import sqlite3
+import threading
+
+# Campos indexados para busca por palavra-chave (BM25)
+CAMPOS_TEXTO = ("context_summary", "extracted_text", "active_window")
+# Filtros estruturados resolvidos na própria consulta FTS (junção com `registros`)
+FILTROS_SQL = ("nivel", "projeto", "tags")
+
+
+def fts5_disponivel() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(a)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _textos(registro: dict) -> tuple:
+    """Valores dos campos de texto; blocos médios/longos usam a janela mais frequente."""
+    janela = registro.get("active_window") or registro.get("janela_mais_frequente") or ""
+    return (
+        str(registro.get("context_summary") or ""),
+        str(registro.get("extracted_text") or ""),
+        str(janela),
+    )
+
+
+def _expressao_fts(consulta: str) -> str:
+    """Transforma a pergunta em uma expressão FTS5 (termos entre aspas, unidos por OR)."""
+    termos = re.findall(r"[\w\-]+", consulta.lower())
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in termos)
+
+
+def _lista(valor) -> list:
+    if valor is None:
+        return []
+    return list(valor) if isinstance(valor, (list, tuple, set, frozenset)) else [valor]
+
+
+def _condicoes_filtros(filtros: dict) -> tuple[list[str], list]:
+    """
+    Cláusulas WHERE (sobre `r`, a tabela de registros) equivalentes aos
+    filtros nivel, projeto e tags da TabelaAtributos, com os parâmetros.
+    """
+    condicoes, parametros = [], []
+    niveis = _lista(filtros.get("nivel"))
+    if niveis:
+        condicoes.append(f"COALESCE(json_extract(r.dados, '$.nivel'), 'curto') IN ({', '.join('?' * len(niveis))})")
+        parametros += [str(n) for n in niveis]
+    projetos = _lista(filtros.get("projeto"))
+    if projetos:
+        condicoes.append(f"COALESCE(json_extract(r.dados, '$.projeto'), '') IN ({', '.join('?' * len(projetos))})")
+        parametros += [str(p) for p in projetos]
+    tags = [str(t).lower() for t in _lista(filtros.get("tags"))]
+    if tags:
+        # Blocos médios/longos guardam as tags em principais_tags (ver extrair_atributos)
+        condicoes.append(
+            "EXISTS (SELECT 1 FROM json_each(r.dados, CASE WHEN json_array_length(r.dados, '$.tags') > 0 "
+            f"THEN '$.tags' ELSE '$.principais_tags' END) WHERE lower(value) IN ({', '.join('?' * len(tags))}))"
+        )
+        parametros += tags
+    return condicoes, parametros
+
+
+class SQLiteRecordStore:
+    """
+    Armazenamento dos registros de atividade em SQLite, com um índice FTS5
+    sobre context_summary, extracted_text e active_window.
+
+    Tem a mesma interface do RecordLog (IDs estáveis = posição do registro,
+    remoção por tombstone) e acrescenta `buscar_texto`, a busca por
+    palavra-chave ranqueada por BM25. Códigos de erro, nomes de arquivo e
+    títulos de janela, que a busca vetorial costuma perder, saem daqui.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS registros (id INTEGER PRIMARY KEY, dados TEXT)")
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS registros_fts USING fts5("
+            + ", ".join(CAMPOS_TEXTO)
+            + ", tokenize=\"unicode61 remove_diacritics 2 tokenchars '_-'\")"
+        )
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS permitidos (id INTEGER PRIMARY KEY)")
+        self._conn.commit()
+        ultimo = self._conn.execute("SELECT MAX(id) FROM registros").fetchone()[0]
+        self._total = 0 if ultimo is None else ultimo + 1
+        self._removidos = {i for (i,) in self._conn.execute("SELECT id FROM registros WHERE dados IS NULL")}
+
+    # --- Leitura ---
+    def __len__(self):
+        return self._total
+
+    def total_ativos(self) -> int:
+        return self._total - len(self._removidos)
+
+    def ultimo_ativo(self) -> int | None:
+        for i in range(self._total - 1, -1, -1):
+            if i not in self._removidos:
+                return i
+        return None
+
+    def ativo(self, i: int) -> bool:
+        return 0 <= i < self._total and i not in self._removidos
+
+    def ids_ativos(self) -> list[int]:
+        return [i for i in range(self._total) if i not in self._removidos]
+
+    def get(self, i: int) -> dict | None:
+        with self._lock:
+            linha = self._conn.execute("SELECT dados FROM registros WHERE id = ?", (int(i),)).fetchone()
+        return json.loads(linha[0]) if linha and linha[0] is not None else None
+
+    def get_many(self, indices: list[int]) -> list[dict]:
+        """Lê apenas as posições pedidas (na ordem pedida), ignorando inválidas."""
+        blocos = (self.get(i) for i in indices)
+        return [b for b in blocos if b is not None]
+
+    def iterar(self):
+        """Percorre (posição, registro) de todos os registros ativos."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT id, dados FROM registros WHERE dados IS NOT NULL ORDER BY id"
+            ).fetchall()
+        for i, dados in linhas:
+            yield i, json.loads(dados)
+
+    def buscar_texto(
+        self,
+        consulta: str,
+        k: int,
+        ids_permitidos=None,
+        filtros: dict | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        Busca por palavra-chave no índice FTS5. Retorna (ID, bm25) do mais para
+        o menos relevante (no SQLite, bm25 menor = mais relevante).
+
+        Os filtros em FILTROS_SQL viram condições sobre a tabela de registros
+        na mesma consulta; `ids_permitidos` (filtros resolvidos fora daqui)
+        passa pela tabela temporária.
+        """
+        expressao = _expressao_fts(consulta)
+        if not expressao or k <= 0:
+            return []
+        condicoes, parametros = _condicoes_filtros(filtros or {})
+        sql = "SELECT registros_fts.rowid, bm25(registros_fts) FROM registros_fts"
+        if condicoes:
+            sql += " JOIN registros r ON r.id = registros_fts.rowid"
+        sql += " WHERE registros_fts MATCH ?"
+        for condicao in condicoes:
+            sql += " AND " + condicao
+        with self._lock:
+            if ids_permitidos is not None:
+                self._conn.execute("DELETE FROM permitidos")
+                self._conn.executemany("INSERT INTO permitidos (id) VALUES (?)", ((int(i),) for i in ids_permitidos))
+                sql += " AND registros_fts.rowid IN (SELECT id FROM permitidos)"
+            sql += " ORDER BY bm25(registros_fts) LIMIT ?"
+            try:
+                return [(int(i), float(s)) for i, s in self._conn.execute(sql, (expressao, *parametros, k))]
+            except sqlite3.OperationalError:
+                return []
+
+    # --- Escrita ---
+    def _inserir(self, i: int, registro: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO registros (id, dados) VALUES (?, ?)",
+            (i, json.dumps(registro, ensure_ascii=False))
+        )
+        self._conn.execute("DELETE FROM registros_fts WHERE rowid = ?", (i,))
+        self._conn.execute(
+            f"INSERT INTO registros_fts (rowid, {', '.join(CAMPOS_TEXTO)}) VALUES (?, ?, ?, ?)",
+            (i, *_textos(registro))
+        )
+
+    def append(self, registro: dict) -> int:
+        """Acrescenta um registro e retorna sua posição."""
+        with self._lock:
+            i = self._total
+            self._inserir(i, registro)
+            self._conn.commit()
+            self._total += 1
+            return i
+
+    def extend(self, registros: list[dict]) -> list[int]:
+        with self._lock:
+            ids = []
+            for registro in registros:
+                if registro is None:
+                    # Tombstone (migração de um log com registros removidos)
+                    self._conn.execute("INSERT INTO registros (id, dados) VALUES (?, NULL)", (self._total,))
+                    self._removidos.add(self._total)
+                else:
+                    self._inserir(self._total, registro)
+                ids.append(self._total)
+                self._total += 1
+            self._conn.commit()
+            return ids
+
+    def atualizar(self, i: int, registro: dict):
+        with self._lock:
+            if not self.ativo(i):
+                raise IndexError(f"Registro {i} inexistente no armazenamento.")
+            self._inserir(i, registro)
+            self._conn.commit()
+
+    def remover(self, i: int):
+        with self._lock:
+            if self.ativo(i):
+                self._conn.execute("UPDATE registros SET dados = NULL WHERE id = ?", (i,))
+                self._conn.execute("DELETE FROM registros_fts WHERE rowid = ?", (i,))
+                self._conn.commit()
+                self._removidos.add(i)
+
+    def _tamanho_em_disco(self) -> int:
+        return sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+
+    def compactar(self) -> int:
+        """
+        Otimiza o índice FTS5 e executa VACUUM, devolvendo ao sistema as
+        páginas dos registros removidos. Os IDs (e tombstones) são mantidos.
+        Retorna os bytes recuperados.
+        """
+        with self._lock:
+            antes = self._tamanho_em_disco()
+            self._conn.execute("INSERT INTO registros_fts (registros_fts) VALUES ('optimize')")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return antes - self._tamanho_em_disco()
+
+
+def migrar_log_para_sqlite(log, store: SQLiteRecordStore) -> int:
+    """
+    Copia o log JSONL para o SQLite preservando os IDs (inclusive os removidos).
+    O log antigo é renomeado para `.migrado` e nunca mais é lido.
+    """
+    if len(log) == 0 or len(store) > 0:
+        return 0
+    store.extend([log.get(i) for i in range(len(log))])
+    for path in (log.path, log.index_path):
+        os.replace(path, path + ".migrado")
+    return log.total_ativos()
@@ -1,9 +1,10 @@
 import os
-import json
+import glob
 import faiss
 from langchain_community.vectorstores import FAISS
 import numpy as np
 from datetime import datetime
+from functools import lru_cache
 # from utils.logger import write_monitor_log as log
 import pygetwindow as gw
 import os
@@ -88,6 +89,18 @@ def detect_active_project_root(fallback=BASE_DIR):
         return fallback
 
 
+def project_namespace(project_root: str | None = None) -> str:
+    """
+    Namespace de memória do projeto: o nome da pasta raiz (o mesmo slug de
+    code_versions/<slug>). Sem projeto detectado (fallback), retorna "".
+    """
+    if project_root is None:
+        project_root = detect_active_project_root(fallback=None)
+    if not project_root or os.path.abspath(project_root) == os.path.abspath(BASE_DIR):
+        return ""
+    return os.path.basename(os.path.abspath(project_root))
+
+
 # Diretórios
 
 LOG_DIR = os.path.join(BASE_DIR, "..", "data", "logs")
@@ -102,8 +115,26 @@ TURNS_PATH = os.path.abspath(os.path.join(LOG_DIR, "turns.json"))
 CODE_VERSION = os.path.abspath(os.path.join(LOG_DIR, "code_versions"))
 # Arquivos de metadados e índice FAISS
 COMPILED_BLOCKS_PATH = os.path.join(LOG_DIR, "activity_compiled_blocks.json")
+LONG_TERM_PATH = os.path.join(LOG_DIR, "activity_hourly_context.json")
+# Índice único antigo, lido apenas pela migração para índices por camada
 FAISS_INDEX_PATH = os.path.join(FAISS_DIR, "dev_activity_index.faiss")
-METADATA_PATH = os.path.join(FAISS_DIR, "dev_activity_metadata.json")
+# Índices por camada (um por camada), lidos apenas pela migração para partições
+FAISS_TIER_INDEX_PATH = os.path.join(FAISS_DIR, "dev_activity_index_{nivel}.faiss")
+# Partições por período: shards/<período>/dev_activity_index_<nivel>.faiss + shards/catalogo_<nivel>.json
+SHARD_DIR = os.path.join(FAISS_DIR, "shards")
+TIME_INDEX_PATH = os.path.join(FAISS_DIR, "dev_activity_time_index.npz")
+METADATA_PATH = os.path.join(FAISS_DIR, "dev_activity_metadata.jsonl")
+METADATA_OFFSETS_PATH = os.path.join(FAISS_DIR, "dev_activity_metadata.idx")
+# Backend opcional em SQLite (com índice FTS5 para busca por palavra-chave)
+METADATA_DB_PATH = os.path.join(FAISS_DIR, "dev_activity_metadata.sqlite3")
+METADATA_BACKEND = os.getenv("NEXUS_METADATA_BACKEND", "jsonl").strip().lower()  # jsonl | sqlite
+# Write-ahead log das operações desde o último checkpoint e manifesto do checkpoint
+WAL_PATH = os.path.join(FAISS_DIR, "dev_activity_index.wal")
+MANIFEST_PATH = os.path.join(FAISS_DIR, "dev_activity_manifest.json")
+# Registro dos índices de embeddings (modelo, dimensão, pastas) e de qual está ativo
+EMBEDDING_REGISTRY_PATH = os.path.join(FAISS_DIR, "embedding_registry.json")
+# Formato antigo (JSON monolítico), lido apenas pela migração
+LEGACY_METADATA_PATH = os.path.join(FAISS_DIR, "dev_activity_metadata.json")
 CHAT_HISTORY_FILE = os.path.join(LOG_DIR, "chat_history.json")
 ASSETS_DIR = os.path.join(BASE_DIR, "..", "gui", "assets")
 
@@ -111,32 +142,139 @@ ASSETS_DIR = os.path.join(BASE_DIR, "..", "gui", "assets")
 os.makedirs(os.path.abspath(LOG_DIR), exist_ok=True)
 os.makedirs(os.path.abspath(TEMP_DIR), exist_ok=True)
 os.makedirs(os.path.abspath(FAISS_DIR), exist_ok=True)
+os.makedirs(os.path.abspath(SHARD_DIR), exist_ok=True)
 os.makedirs(os.path.abspath(SCREENSHOT_DIR), exist_ok=True)
 os.makedirs(os.path.abspath(CODE_VERSION), exist_ok=True)
 
 # Carregamento do FAISS e Metadata
-def load_faiss_and_metadata():
-    if os.path.exists(FAISS_INDEX_PATH) and os.path.exists(METADATA_PATH):
-        index = faiss.read_index(FAISS_INDEX_PATH)
-        with open(METADATA_PATH, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
-        # print("FAISS e Metadata carregados.")
+def tier_index_path(nivel: str) -> str:
+    return FAISS_TIER_INDEX_PATH.format(nivel=nivel)
+
+@lru_cache(maxsize=None)
+def metadata_backend() -> str:
+    """Backend de registros em uso: "sqlite" só se pedido e se o SQLite tiver FTS5."""
+    if METADATA_BACKEND != "sqlite":
+        return "jsonl"
+    from core.sqlite_store import fts5_disponivel
+    if not fts5_disponivel():
+        print("Aviso: SQLite sem FTS5 disponível. Usando o log JSONL para os metadados.")
+        return "jsonl"
+    return "sqlite"
+
+def metadata_files(metadata_path=METADATA_PATH) -> list[str]:
+    """Arquivos cujo conteúdo identifica a versão dos registros em disco."""
+    if metadata_backend() == "sqlite":
+        return [METADATA_DB_PATH, METADATA_DB_PATH + "-wal"]
+    return [metadata_path, os.path.splitext(metadata_path)[0] + ".idx"]
+
+def load_faiss_and_metadata(metadata_path=METADATA_PATH, indice=None):
+    """
+    Retorna os índices FAISS de cada camada e o armazenamento de registros
+    (log JSONL ou SQLite), migrando os formatos antigos se ainda existirem.
+    Os índices são os de `indice` (entrada do registro de modelos; por
+    padrão, o índice ativo), com a dimensão do modelo que os gerou.
+    """
+    from core.record_log import RecordLog, migrar_json_legado
+    from core.memory_index import NIVEIS
+    from core.memory_shards import CamadaParticionada
+    from core.model_registry import INDICE_LEGADO, caminhos_indice, indice_ativo
+    if metadata_backend() == "sqlite":
+        from core.sqlite_store import SQLiteRecordStore, migrar_log_para_sqlite
+        metadata = SQLiteRecordStore(METADATA_DB_PATH)
+        if os.path.exists(metadata_path) or os.path.exists(LEGACY_METADATA_PATH):
+            log_jsonl = RecordLog(metadata_path)
+            migrar_json_legado(LEGACY_METADATA_PATH, log_jsonl)
+            migrados = migrar_log_para_sqlite(log_jsonl, metadata)
+            if migrados:
+                print(f"Metadata migrado para SQLite ({migrados} registros).")
     else:
-        dimension = 384  # Tamanho do vetor de embedding
-        index = faiss.IndexFlatL2(dimension)
-        metadata = []
-        # print("Criando novo FAISS e Metadata.")
-    return index, metadata
+        metadata = RecordLog(metadata_path)
+        migrados = migrar_json_legado(LEGACY_METADATA_PATH, metadata)
+        if migrados:
+            print(f"Metadata migrado para log append-only ({migrados} registros).")
+    if indice is None:
+        indice = indice_ativo()
+    dimension = indice["dimensao"]  # Tamanho do vetor de embedding do modelo do índice
+    shard_dir, _ = caminhos_indice(indice)
+    # Os formatos antigos só existem para o índice original
+    legado = indice["nome"] == INDICE_LEGADO
+    # IDs estáveis: o ID de cada vetor é a posição do registro no log
+    camadas = {}
+    for nivel in NIVEIS:
+        if legado and os.path.exists(tier_index_path(nivel)):
+            migrar_camada_para_particoes(nivel, dimension, metadata)
+        camadas[nivel] = CamadaParticionada(nivel, shard_dir, dimension)
+    if legado and os.path.exists(FAISS_INDEX_PATH):
+        migrar_indice_unico(FAISS_INDEX_PATH, camadas, metadata)
+    return camadas, metadata
+
+def _particoes_dos_registros(metadata, ids):
+    """(inícios, fins, projetos) dos registros, para escolher a partição de cada vetor."""
+    from core.memory_filters import extrair_atributos, projeto_do_registro
+    inicios, fins, projetos = [], [], []
+    for registro_id in ids:
+        registro = metadata.get(int(registro_id)) or {}
+        _, _, _, inicio, fim = extrair_atributos(registro)
+        inicios.append(inicio)
+        fins.append(fim)
+        projetos.append(projeto_do_registro(registro))
+    return inicios, fins, projetos
+
+def migrar_camada_para_particoes(nivel, dimension, metadata, tamanho_lote=4096):
+    """
+    Distribui o índice único de uma camada entre as partições por período.
+    Partições deixadas por uma migração interrompida são descartadas antes;
+    os arquivos antigos só são renomeados para `.migrado` no fim.
+    """
+    from core.memory_index import IndiceCamada
+    from core.memory_shards import CamadaParticionada, caminho_catalogo
+    path = tier_index_path(nivel)
+    for parcial in glob.glob(os.path.join(SHARD_DIR, "**", f"dev_activity_index_{nivel}.faiss*"), recursive=True):
+        os.remove(parcial)
+    catalogo = caminho_catalogo(SHARD_DIR, nivel)
+    if os.path.exists(catalogo):
+        os.remove(catalogo)
+    antiga = IndiceCamada(nivel, path, dimension)
+    particionada = CamadaParticionada(nivel, SHARD_DIR, dimension)
+    ids = antiga.ids()
+    for inicio in range(0, len(ids), tamanho_lote):
+        vetores, presentes = antiga.vetores(ids[inicio:inicio + tamanho_lote])
+        particionada.adicionar(vetores, presentes, *_particoes_dos_registros(metadata, presentes))
+    particionada.aguardar_promocao()
+    particionada.salvar(forcar=True)
+    del antiga  # Libera o mapeamento do arquivo antigo antes de renomeá-lo
+    for sufixo in ("", ".excluidos.npy", ".f16", ".f16.ids"):
+        if os.path.exists(path + sufixo):
+            os.replace(path + sufixo, path + sufixo + ".migrado")
+    print(f"Índice '{nivel}' migrado para {len(particionada)} partição(ões) ({len(ids)} vetores).")
 
-faiss_index, metadata = load_faiss_and_metadata()
+def migrar_indice_unico(index_path, camadas, metadata):
+    """Distribui os vetores do índice único antigo entre os índices de cada camada."""
+    index = faiss.read_index(index_path)
+    if isinstance(index, faiss.IndexIDMap2):
+        ids = faiss.vector_to_array(index.id_map)
+        vetores = index.index.reconstruct_n(0, index.ntotal) if index.ntotal else None
+    else:
+        # Índice posicional (anterior aos IDs estáveis): ID = posição no log
+        ntotal = min(index.ntotal, len(metadata))
+        ids = np.arange(ntotal, dtype=np.int64)
+        vetores = index.reconstruct_n(0, ntotal) if ntotal else None
+    por_nivel = {}
+    for pos, registro_id in enumerate(ids):
+        registro = metadata.get(int(registro_id))
+        if registro is None:
+            continue
+        nivel = registro.get("nivel", "curto")
+        por_nivel.setdefault(nivel if nivel in camadas else "curto", []).append(pos)
+    for nivel, posicoes in por_nivel.items():
+        camadas[nivel].adicionar(vetores[posicoes], ids[posicoes], *_particoes_dos_registros(metadata, ids[posicoes]))
+        camadas[nivel].salvar()
+    os.replace(index_path, index_path + ".migrado")
 
-# Salvar FAISS e metadata
+# Salvar FAISS e metadata (delegado ao serviço de memória residente)
 def save_faiss_and_metadata():
-    from utils.logger import write_monitor_log as log
-    faiss.write_index(faiss_index, FAISS_INDEX_PATH)
-    with open(METADATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    log("FAISS e Metadata atualizados.")
+    from core.memory_service import get_memory_service
+    get_memory_service().salvar()
 
 # Novo método: adicionar embedding para um bloco compilado
 def adicionar_bloco_ao_faiss(embedding_vector, bloco_compilado):
@@ -144,10 +282,7 @@ def adicionar_bloco_ao_faiss(embedding_vector, bloco_compilado):
     Adiciona um vetor de embedding (np.array) ao índice FAISS
     e atualiza o metadata.
     """
+    from core.memory_service import get_memory_service
     if "nivel" not in bloco_compilado:
         bloco_compilado["nivel"] = "curto" 
-    faiss_index.add(np.array([embedding_vector], dtype=np.float32))
-    metadata.append(bloco_compilado)
-    save_faiss_and_metadata()
-
-
+    get_memory_service().adicionar(embedding_vector, bloco_compilado)
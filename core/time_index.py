@@ -0,0 +1,161 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import bisect
+import threading
+import numpy as np
+
+# A cauda de inserções é fundida aos arrays quando passa deste tamanho (ou de 1/16 deles)
+TAMANHO_CAUDA = 4096
+
+
+class IndiceTemporal:
+    """
+    Índice temporal persistido: arrays numpy ordenados pelo início do período
+    de cada registro, com o fim e o ID correspondentes.
+
+    Registros curtos têm período de duração zero; blocos médios e longos
+    cobrem [timestamp_inicio, timestamp_fim]. Consultas de intervalo e de
+    "mais recentes" usam busca binária e nunca leem os registros do log.
+
+    Entre checkpoints os arrays não são reescritos: inserções entram numa
+    cauda pequena mantida ordenada e remoções viram tombstones (que valem
+    só para os arrays) filtrados no resultado das consultas. Os dois são
+    aplicados aos arrays em `salvar` ou quando a cauda cresce demais.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self.inicio = np.empty(0, dtype=np.float64)
+        self.fim = np.empty(0, dtype=np.float64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.max_duracao = 0.0
+        self.total_log = 0
+        self._cauda = []  # (inicio, fim, ID) ordenados pelo início
+        self._cauda_inicio = []  # chaves de busca binária da cauda
+        self._removidos = set()  # tombstones de IDs dos arrays
+        self._sujo = False
+
+    # --- Persistência ---
+    def carregar(self) -> bool:
+        """Lê o índice do disco. Retorna False se não existir ou estiver ilegível."""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as dados:
+                self.inicio = dados["inicio"]
+                self.fim = dados["fim"]
+                self.ids = dados["ids"]
+                self.total_log = int(dados["total_log"])
+        except (OSError, KeyError, ValueError):
+            return False
+        self.max_duracao = float((self.fim - self.inicio).max()) if self.ids.size else 0.0
+        return True
+
+    def salvar(self, total_log: int):
+        with self._lock:
+            if not self._sujo and total_log == self.total_log and os.path.exists(self.path):
+                return
+            self._compactar()
+            self.total_log = total_log
+            tmp = self.path + ".tmp.npz"
+            np.savez(tmp, inicio=self.inicio, fim=self.fim, ids=self.ids, total_log=np.int64(total_log))
+            os.replace(tmp, self.path)
+            self._sujo = False
+
+    # --- Manutenção ---
+    def adicionar(self, registro_id: int, inicio: float | None, fim: float | None):
+        if inicio is None:
+            return
+        fim = fim if fim is not None else inicio
+        with self._lock:
+            # Registros chegam quase sempre em ordem: a inserção cai no fim da cauda
+            posicao = bisect.bisect_right(self._cauda_inicio, inicio)
+            self._cauda_inicio.insert(posicao, inicio)
+            self._cauda.insert(posicao, (inicio, fim, int(registro_id)))
+            self.max_duracao = max(self.max_duracao, fim - inicio)
+            self._sujo = True
+            if len(self._cauda) > max(TAMANHO_CAUDA, self.ids.size // 16):
+                self._compactar()
+
+    def remover(self, registro_ids):
+        with self._lock:
+            ids = {int(i) for i in registro_ids}
+            if self._cauda:
+                cauda = [p for p in self._cauda if p[2] not in ids]
+                if len(cauda) < len(self._cauda):
+                    self._cauda = cauda
+                    self._cauda_inicio = [p[0] for p in cauda]
+            # Uma reinserção posterior (registro atualizado) vai para a cauda, onde o tombstone não vale
+            self._removidos.update(ids)
+            self._sujo = True
+
+    def _compactar(self):
+        """Aplica os tombstones aos arrays e funde a cauda (normalmente só um append)."""
+        if self._removidos:
+            manter = ~np.isin(self.ids, self._tombstones())
+            self.inicio, self.fim, self.ids = self.inicio[manter], self.fim[manter], self.ids[manter]
+            self._removidos = set()
+        if not self._cauda:
+            return
+        novos = np.array(self._cauda, dtype=np.float64)
+        self._cauda, self._cauda_inicio = [], []
+        inicio = np.concatenate([self.inicio, novos[:, 0]])
+        fim = np.concatenate([self.fim, novos[:, 1]])
+        ids = np.concatenate([self.ids, novos[:, 2].astype(np.int64)])
+        # Só reordena se a cauda começa antes do fim dos arrays
+        if self.inicio.size and novos[0, 0] < self.inicio[-1]:
+            ordem = np.argsort(inicio, kind="stable")
+            inicio, fim, ids = inicio[ordem], fim[ordem], ids[ordem]
+        self.inicio, self.fim, self.ids = inicio, fim, ids
+
+    def _tombstones(self) -> np.ndarray:
+        return np.fromiter(self._removidos, dtype=np.int64, count=len(self._removidos))
+
+    def _juntar(self, inicio: np.ndarray, ids: np.ndarray, cauda: list) -> np.ndarray:
+        """IDs de um trecho dos arrays (sem os tombstones) e da cauda, em ordem cronológica."""
+        if self._removidos and ids.size:
+            vivos = ~np.isin(ids, self._tombstones())
+            inicio, ids = inicio[vivos], ids[vivos]
+        if not cauda:
+            return ids
+        inicio = np.concatenate([inicio, np.array([p[0] for p in cauda], dtype=np.float64)])
+        ids = np.concatenate([ids, np.array([p[2] for p in cauda], dtype=np.int64)])
+        return ids[np.argsort(inicio, kind="stable")]
+
+    # --- Consultas ---
+    def intervalo(self, inicio: float, fim: float) -> np.ndarray:
+        """IDs cujo período se sobrepõe a [inicio, fim], em ordem cronológica."""
+        with self._lock:
+            # Só registros que começam até `fim` e no máximo `max_duracao` antes de `inicio`
+            lo = np.searchsorted(self.inicio, inicio - self.max_duracao, side="left")
+            hi = np.searchsorted(self.inicio, fim, side="right")
+            mascara = self.fim[lo:hi] >= inicio
+            cauda = self._cauda[
+                bisect.bisect_left(self._cauda_inicio, inicio - self.max_duracao):
+                bisect.bisect_right(self._cauda_inicio, fim)
+            ]
+            return self._juntar(
+                self.inicio[lo:hi][mascara], self.ids[lo:hi][mascara], [p for p in cauda if p[1] >= inicio]
+            )
+
+    def anteriores(self, limite: float) -> np.ndarray:
+        """IDs cujo período terminou antes de `limite`."""
+        with self._lock:
+            mascara = self.fim < limite
+            return self._juntar(self.inicio[mascara], self.ids[mascara], [p for p in self._cauda if p[1] < limite])
+
+    def mais_recentes(self, n: int = 1) -> np.ndarray:
+        """Os `n` IDs com início mais recente, do mais novo para o mais antigo."""
+        with self._lock:
+            if n <= 0:
+                return self.ids[:0]
+            # Pega tombstones a mais dos arrays para sobrarem `n` depois do filtro
+            m = n + len(self._removidos)
+            return self._juntar(self.inicio[-m:], self.ids[-m:], self._cauda[-n:])[-n:][::-1]
+
+    def __len__(self):
+        with self._lock:
+            removidos = int(np.isin(self.ids, self._tombstones()).sum()) if self._removidos else 0
+            return int(self.ids.size) - removidos + len(self._cauda)
@@ -0,0 +1,213 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import threading
+import time
+from core.storage import (
+    CODE_VERSION, EMBEDDING_REGISTRY_PATH, LONG_TERM_PATH, MANIFEST_PATH, SCREENSHOT_DIR, TIME_INDEX_PATH,
+    metadata_files
+)
+from core.memory_index import NIVEIS
+from core.memory_filters import epoch
+from core.checkpoint import gravar_atomico
+from core.model_registry import descartar_indices, pastas_dos_indices
+from utils.logger import write_monitor_log as log
+
+# --- Política de retenção ---
+# Por camada: (dias, máximo de registros). 0 = sem limite. Registros de curto
+# prazo mais antigos que o TTL ou além do orçamento são removidos (os blocos
+# médios e longos que os resumem continuam).
+RETENCAO = {
+    nivel: (
+        float(os.getenv(f"NEXUS_RETENTION_DAYS_{nivel.upper()}", dias)),
+        int(os.getenv(f"NEXUS_RETENTION_MAX_{nivel.upper()}", maximo)),
+    )
+    for nivel, dias, maximo in (("curto", "7", "5000"), ("medio", "90", "20000"), ("longo", "0", "0"))
+}
+# Contexto horário (activity_hourly_context.json): (dias, máximo de superblocos)
+RETENCAO_CONTEXTO_HORARIO = (float(os.getenv("NEXUS_RETENTION_DAYS_HOURLY", "30")), 50)
+# Diretórios de arquivos: (dias, orçamento em MB)
+RETENCAO_SCREENSHOTS = (
+    float(os.getenv("NEXUS_RETENTION_DAYS_SCREENSHOTS", "7")),
+    float(os.getenv("NEXUS_RETENTION_MB_SCREENSHOTS", "500")),
+)
+RETENCAO_CODIGO = (
+    float(os.getenv("NEXUS_RETENTION_DAYS_CODE", "30")),
+    float(os.getenv("NEXUS_RETENTION_MB_CODE", "500")),
+)
+INTERVALO_VACUUM = float(os.getenv("NEXUS_VACUUM_INTERVAL", "3600"))  # segundos
+TAMANHO_LOTE = 4096
+
+ultimo_relatorio = None
+
+
+def _bytes_da_memoria() -> int:
+    """
+    Bytes em disco das partições (índices, cópias float16, catálogos) e WAL
+    de cada índice registrado, dos registros e do índice temporal.
+    """
+    arquivos = [TIME_INDEX_PATH, MANIFEST_PATH, EMBEDDING_REGISTRY_PATH] + metadata_files()
+    for shard_dir, wal in pastas_dos_indices():
+        arquivos += [wal, wal + ".anterior"]
+        for raiz, _, nomes in os.walk(shard_dir):
+            arquivos += [os.path.join(raiz, nome) for nome in nomes]
+    return sum(os.path.getsize(p) for p in arquivos if os.path.exists(p))
+
+
+def ids_a_descartar(memoria, nivel: str, agora: float) -> list[int]:
+    """IDs da camada fora da política: expirados pelo TTL e, depois, os mais antigos além do orçamento."""
+    dias, maximo = RETENCAO.get(nivel, (0, 0))
+    descartar = set()
+    if dias > 0:
+        descartar.update(memoria.ids_expirados(nivel, agora - dias * 86400))
+    if maximo > 0:
+        restantes = [i for i in memoria.ids_por_nivel([nivel]) if i not in descartar]
+        if len(restantes) > maximo:
+            descartar.update(restantes[:-maximo])
+    return sorted(descartar)
+
+
+def aparar_contexto_horario(agora: float, path: str = LONG_TERM_PATH) -> tuple[int, int]:
+    """Remove superblocos expirados e mantém os mais recentes. Retorna (superblocos, bytes) removidos."""
+    if not os.path.exists(path):
+        return 0, 0
+    dias, maximo = RETENCAO_CONTEXTO_HORARIO
+    with open(path, "r", encoding="utf-8") as f:
+        superblocos = json.load(f)
+    manter = superblocos
+    if dias > 0:
+        limite = agora - dias * 86400
+        manter = [
+            s for s in manter
+            if (epoch(s.get("timestamp_fim") or s.get("timestamp_gerado")) or agora) >= limite
+        ]
+    if maximo > 0:
+        manter = manter[-maximo:]
+    if len(manter) == len(superblocos):
+        return 0, 0
+    antes = os.path.getsize(path)
+    gravar_atomico(path, json.dumps(manter, indent=2, ensure_ascii=False).encode("utf-8"))
+    return len(superblocos) - len(manter), antes - os.path.getsize(path)
+
+
+def aparar_diretorio(diretorio: str, dias: float, mb: float, manter_ultimo_por_pasta: bool = False) -> tuple[int, int]:
+    """
+    Apaga, dos mais antigos para os mais novos, os arquivos mais velhos que
+    `dias` e os que passarem do orçamento de `mb`. Com `manter_ultimo_por_pasta`,
+    o arquivo mais recente de cada subpasta nunca é apagado (ex.: o último
+    snapshot de código de cada projeto). Retorna (arquivos, bytes) removidos.
+    """
+    if not os.path.isdir(diretorio):
+        return 0, 0
+    arquivos, protegidos = [], set()
+    for raiz, _, nomes in os.walk(diretorio):
+        da_pasta = []
+        for nome in nomes:
+            path = os.path.join(raiz, nome)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            da_pasta.append((st.st_mtime, st.st_size, path))
+        if manter_ultimo_por_pasta and da_pasta:
+            protegidos.add(max(da_pasta)[2])
+        arquivos.extend(da_pasta)
+    arquivos.sort()
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    limite = time.time() - dias * 86400 if dias > 0 else None
+    orcamento = mb * 1024 * 1024 if mb > 0 else None
+    removidos = removidos_bytes = 0
+    for mtime, tamanho, path in arquivos:
+        expirado = limite is not None and mtime < limite
+        excedente = orcamento is not None and total > orcamento
+        if not (expirado or excedente) or path in protegidos:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= tamanho
+        removidos += 1
+        removidos_bytes += tamanho
+    return removidos, removidos_bytes
+
+
+def executar_vacuum(memoria=None) -> dict:
+    """
+    Uma rodada de retenção: remove os registros fora da política de cada
+    camada, reconstrói os índices só com os vetores vivos, compacta os
+    registros e apara o contexto horário, os screenshots e os snapshots de
+    código. Retorna (e registra no log) o que foi recuperado.
+    """
+    global ultimo_relatorio
+    if memoria is None:
+        from core.memory_service import get_memory_service
+        memoria = get_memory_service()
+    inicio = time.perf_counter()
+    agora = time.time()
+    bytes_antes = _bytes_da_memoria()
+
+    expirados = {}
+    for nivel in NIVEIS:
+        ids = ids_a_descartar(memoria, nivel, agora)
+        if ids:
+            memoria.remover(ids)
+        expirados[nivel] = len(ids)
+    compactacao = memoria.compactar(TAMANHO_LOTE)
+    # Índices de modelos substituídos por uma reindexação
+    indices_removidos = descartar_indices()
+
+    superblocos, bytes_contexto = aparar_contexto_horario(agora)
+    screenshots, bytes_screenshots = aparar_diretorio(SCREENSHOT_DIR, *RETENCAO_SCREENSHOTS)
+    snapshots, bytes_codigo = aparar_diretorio(CODE_VERSION, *RETENCAO_CODIGO, manter_ultimo_por_pasta=True)
+
+    relatorio = {
+        "registros_expirados": expirados,
+        "vetores_recuperados": compactacao["vetores"],
+        "indices_removidos": indices_removidos,
+        "bytes_memoria": bytes_antes - _bytes_da_memoria(),
+        "superblocos_removidos": superblocos,
+        "bytes_contexto_horario": bytes_contexto,
+        "screenshots_removidos": screenshots,
+        "bytes_screenshots": bytes_screenshots,
+        "snapshots_codigo_removidos": snapshots,
+        "bytes_codigo": bytes_codigo,
+        "duracao_s": time.perf_counter() - inicio,
+    }
+    relatorio["bytes_recuperados"] = (
+        relatorio["bytes_memoria"] + bytes_contexto + bytes_screenshots + bytes_codigo
+    )
+    ultimo_relatorio = relatorio
+    log(
+        f"Vacuum: {sum(expirados.values())} registros expirados "
+        f"({', '.join(f'{n}={q}' for n, q in expirados.items())}), "
+        f"{relatorio['vetores_recuperados']} vetores recuperados, "
+        f"{len(indices_removidos)} índice(s) de modelos antigos apagado(s), "
+        f"{relatorio['bytes_recuperados'] / 1e6:.1f} MB liberados "
+        f"(memória {relatorio['bytes_memoria'] / 1e6:.1f} MB, "
+        f"{screenshots} screenshots, {snapshots} snapshots de código, {superblocos} superblocos) "
+        f"em {relatorio['duracao_s']:.1f} s."
+    )
+    return relatorio
+
+
+def _laco_vacuum(parar: threading.Event):
+    while not parar.wait(INTERVALO_VACUUM):
+        try:
+            executar_vacuum()
+        except Exception as e:
+            log(f"Falha no vacuum da memória: {e}. Nova tentativa na próxima rodada.")
+
+
+def iniciar_vacuum_periodico(parar: threading.Event) -> threading.Thread | None:
+    """
+    Inicia a thread que executa o vacuum a cada INTERVALO_VACUUM segundos
+    até `parar` ser sinalizado. Só o processo que grava a memória (o do
+    tracker) deve chamá-la. NEXUS_VACUUM_INTERVAL=0 desativa o vacuum.
+    """
+    if INTERVALO_VACUUM <= 0:
+        return None
+    thread = threading.Thread(target=_laco_vacuum, args=(parar,), daemon=True)
+    thread.start()
+    return thread
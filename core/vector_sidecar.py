@@ -0,0 +1,145 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+from array import array
+import numpy as np
+
+
+class VetoresExatos:
+    """
+    Cópia compacta (float16) dos vetores de uma camada, usada para
+    re-ranquear com distância exata os candidatos de um índice comprimido.
+
+    As linhas são densas e append-only: o arquivo `.f16` guarda os vetores
+    em sequência e o `.ids` guarda, para cada linha, o ID do registro. A
+    leitura é feita por memmap, então só as linhas consultadas vão para a
+    RAM. Linhas de IDs removidos só são descartadas em `compactar`.
+    """
+
+    def __init__(self, path: str, dimensao: int):
+        self.path = path
+        self.ids_path = path + ".ids"
+        self.dimensao = dimensao
+        self._lock = threading.RLock()
+        self._mapa = None
+        self._abrir()
+
+    def _abrir(self):
+        self._concluir_compactacao()
+        for p in (self.path, self.ids_path):
+            if not os.path.exists(p):
+                open(p, "ab").close()
+        self._ids = array("q")
+        with open(self.ids_path, "rb") as f:
+            dados = f.read()
+        self._ids.frombytes(dados[:len(dados) - len(dados) % self._ids.itemsize])
+        # Após uma interrupção, vale o menor dos dois arquivos
+        linhas = min(len(self._ids), os.path.getsize(self.path) // self._bytes_por_linha)
+        if linhas < len(self._ids):
+            del self._ids[linhas:]
+        for p, tamanho in ((self.path, linhas * self._bytes_por_linha), (self.ids_path, linhas * self._ids.itemsize)):
+            if os.path.getsize(p) != tamanho:
+                with open(p, "r+b") as f:
+                    f.truncate(tamanho)
+        self._linha = {int(i): n for n, i in enumerate(self._ids)}
+
+    def _concluir_compactacao(self):
+        """Conclui (ou descarta) uma compactação interrompida; ver `compactar`."""
+        tmp_vetores, tmp_ids = self.path + ".tmp", self.ids_path + ".tmp"
+        if os.path.exists(tmp_ids) and not os.path.exists(tmp_vetores):
+            os.replace(tmp_ids, self.ids_path)
+        for tmp in (tmp_vetores, tmp_ids):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @property
+    def _bytes_por_linha(self) -> int:
+        return self.dimensao * 2
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, registro_id) -> bool:
+        return int(registro_id) in self._linha
+
+    def tamanho_em_disco(self) -> int:
+        return len(self._ids) * (self._bytes_por_linha + self._ids.itemsize)
+
+    def adicionar(self, vetores, ids):
+        """Acrescenta os vetores dos IDs ainda ausentes (IDs já presentes são ignorados)."""
+        vetores = np.asarray(vetores, dtype=np.float32).reshape(-1, self.dimensao)
+        with self._lock:
+            novos = [n for n, i in enumerate(ids) if int(i) not in self._linha]
+            if not novos:
+                return
+            with open(self.path, "ab") as f:
+                f.write(vetores[novos].astype(np.float16).tobytes())
+            novos_ids = array("q", (int(ids[n]) for n in novos))
+            with open(self.ids_path, "ab") as f:
+                f.write(novos_ids.tobytes())
+            for i in novos_ids:
+                self._linha[i] = len(self._ids)
+                self._ids.append(i)
+
+    def obter(self, ids) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna (vetores float32, máscara de encontrados) na ordem dos IDs pedidos.
+        Linhas de IDs ausentes vêm zeradas e com a máscara em False.
+        """
+        with self._lock:
+            linhas = np.array([self._linha.get(int(i), -1) for i in ids], dtype=np.int64)
+            encontrados = linhas >= 0
+            vetores = np.zeros((len(linhas), self.dimensao), dtype=np.float32)
+            if encontrados.any():
+                if self._mapa is None or self._mapa.shape[0] != len(self._ids):
+                    self._mapa = np.memmap(self.path, dtype=np.float16, mode="r", shape=(len(self._ids), self.dimensao))
+                vetores[encontrados] = self._mapa[linhas[encontrados]]
+            return vetores, encontrados
+
+    def compactar(self, ids_vivos, tamanho_lote: int = 4096) -> int:
+        """
+        Descarta as linhas de IDs fora de `ids_vivos`, copiando as demais em
+        lotes. O `.f16` é trocado antes do `.ids`; uma troca interrompida é
+        concluída na próxima abertura. Retorna os bytes recuperados.
+        """
+        with self._lock:
+            ids = np.frombuffer(self._ids, dtype=np.int64) if len(self._ids) else np.empty(0, dtype=np.int64)
+            linhas = np.flatnonzero(np.isin(ids, np.asarray(ids_vivos, dtype=np.int64)))
+            if len(linhas) == len(ids):
+                return 0
+            antes = self.tamanho_em_disco()
+            self._mapa = None
+            tmp_vetores, tmp_ids = self.path + ".tmp", self.ids_path + ".tmp"
+            mapa = np.memmap(self.path, dtype=np.float16, mode="r", shape=(len(ids), self.dimensao))
+            with open(tmp_vetores, "wb") as f:
+                for inicio in range(0, len(linhas), tamanho_lote):
+                    f.write(np.ascontiguousarray(mapa[linhas[inicio:inicio + tamanho_lote]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            del mapa
+            with open(tmp_ids, "wb") as f:
+                f.write(ids[linhas].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_vetores, self.path)
+            os.replace(tmp_ids, self.ids_path)
+            self._abrir()
+            return antes - self.tamanho_em_disco()
+
+
+def reranquear(exatos: VetoresExatos, query_vec, dists, ids, k: int):
+    """
+    Recalcula a distância L2 exata dos candidatos de uma busca comprimida e
+    devolve o top-k reordenado. Candidatos sem vetor exato mantêm a distância
+    aproximada do índice.
+    """
+    validos = ids[0] >= 0
+    candidatos, aproximadas = ids[0][validos], dists[0][validos]
+    if candidatos.size == 0:
+        return dists[:, :0], ids[:, :0]
+    vetores, encontrados = exatos.obter(candidatos)
+    exatas = aproximadas.astype(np.float32).copy()
+    exatas[encontrados] = ((vetores[encontrados] - query_vec[0]) ** 2).sum(axis=1)
+    ordem = np.argsort(exatas, kind="stable")[:k]
+    return exatas[ordem].reshape(1, -1), candidatos[ordem].reshape(1, -1)
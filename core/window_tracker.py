@@ -6,11 +6,11 @@ import psutil
 import pygetwindow as gw
 from datetime import datetime
 import pyautogui
-from utils.ocr import extract_text_from_image, capture_full_screenshot_with_motion, maintain_latest_screenshots
+from utils.ocr import extract_text_from_images, capture_full_screenshot_with_motion, maintain_latest_screenshots
 from core.context import resumir_arquivo_compilado, generate_compiled_code #,get_project_files_summary
-from core.storage import SCREENSHOT_DIR, detect_active_project_root
+from core.storage import SCREENSHOT_DIR, detect_active_project_root, project_namespace
 from utils.logger import write_monitor_log as log
-import hashlib
+from utils.change_detector import detector_mudancas
 from utils.metadata_compactor import (
     salvar_em_buffer,
     compactar_bloco_de_20,
@@ -26,7 +26,6 @@ from models.llm_config import NODE_MODELS_DEFAULT
 # Estado anterior
 last_mouse_pos = None
 last_window_title = None
-last_screenshot_hash = None
 
 # Função para verificar se houve atividade relevante
 def houve_atividade_relevante(duracao=3, intervalo=0.5, min_atividades=2):
@@ -34,7 +33,7 @@ def houve_atividade_relevante(duracao=3, intervalo=0.5, min_atividades=2):
     Verifica se houve pelo menos `min_atividades` diferentes (mouse, janela ou visual)
     ao longo de `duracao` segundos, em janelas de `intervalo` segundos.
     """
-    global last_mouse_pos, last_window_title, last_screenshot_hash
+    global last_mouse_pos, last_window_title
     contador = 0
 
     for _ in range(int(duracao / intervalo)):
@@ -53,12 +52,9 @@ def houve_atividade_relevante(duracao=3, intervalo=0.5, min_atividades=2):
             atividade = True
         last_window_title = current_title
 
-        # Verifica mudança visual (screenshot hash reduzido)
-        screenshot = pyautogui.screenshot().resize((100, 100))
-        screenshot_hash = hashlib.sha256(screenshot.tobytes()).hexdigest()
-        if screenshot_hash != last_screenshot_hash:
+        # Verifica mudança visual (tela amostrada; tolera cursor piscando)
+        if detector_mudancas.tela_mudou():
             atividade = True
-        last_screenshot_hash = screenshot_hash
 
         if atividade:
             contador += 1
@@ -88,11 +84,12 @@ def track_activity():
     screenshots, last_screenshot = capture_full_screenshot_with_motion(
         SCREENSHOT_DIR, ultima_img, ultima_pos, last_capture_time, interval=INTERVAL
     )
-    # screenshots é uma lista (pode ser vazia, 1, ou muitos caminhos)
+    # screenshots é uma lista de quadros em memória (pode ser vazia, 1, ou muitos);
+    # só o último vai para o disco, em segundo plano (last_screenshot)
     if screenshots:
         all_extracted_text = []
-        for screenshot_path in screenshots:
-            ocr_text_part = extract_text_from_image(screenshot_path) if screenshot_path else ""
+        # Monitores em paralelo; os quadros de cada um, em ordem
+        for ocr_text_part in extract_text_from_images(screenshots):
             if ocr_text_part:
                 all_extracted_text.append(ocr_text_part)
 
@@ -153,6 +150,7 @@ def track_activity():
                     "memory_percent": memory_usage,
                     "context_summary": context_summary,
                     "code_version_path": summary_path,
+                    "projeto": project_namespace(project_root),  # Namespace da memória
                     "nivel": "curto",
                     # As tags agora funcionam com o texto de todas as telas
                     "tags": list(set([
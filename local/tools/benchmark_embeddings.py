@@ -0,0 +1,99 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+import argparse
+import time
+import numpy as np
+from core.model_registry import modelo_ativo
+from models.embedding_backends import BACKENDS
+
+# Compara os backends de embeddings (torch, onnx, onnx-int8) em CPU:
+# vazão (textos/s), similaridade com os vetores do torch e recall@k de
+# buscas feitas com cada backend em relação às feitas com o torch.
+
+TEXTOS_EXEMPLO = [
+    "Visual Studio Code - memory_service.py editando a busca por nível",
+    "Google Chrome - documentação do FAISS IndexHNSWFlat",
+    "Terminal - pytest falhou em test_storage com KeyError",
+    "Slack - revisão do PR de particionamento por semana",
+    "Visual Studio Code - window_tracker.py OCR da janela ativa",
+    "Google Chrome - Stack Overflow numpy memmap somente leitura",
+    "Terminal - git rebase interativo na branch de embeddings",
+    "PyCharm - langgraph_nodes.py nó de consulta semântica",
+]
+
+
+def carregar_textos(n: int) -> list[str]:
+    """Textos reais da memória (janela + resumo); completa com exemplos se faltar."""
+    textos = []
+    try:
+        from core.memory_service import get_memory_service
+        for _, registro in get_memory_service().iterar():
+            texto = f"{registro.get('active_window', '')} {registro.get('context_summary', '')}".strip()
+            if texto:
+                textos.append(texto)
+            if len(textos) >= n:
+                break
+    except Exception as e:
+        print(f"Memória indisponível ({e}); usando textos de exemplo.")
+    i = 0
+    while len(textos) < n:
+        textos.append(f"{TEXTOS_EXEMPLO[i % len(TEXTOS_EXEMPLO)]} #{i}")
+        i += 1
+    return textos
+
+
+def medir(backend, textos: list[str], lote: int) -> tuple[np.ndarray, float]:
+    backend.encode(textos[:lote])  # aquecimento
+    inicio = time.perf_counter()
+    vetores = np.concatenate([backend.encode(textos[i:i + lote]) for i in range(0, len(textos), lote)])
+    return np.asarray(vetores, dtype=np.float32), time.perf_counter() - inicio
+
+
+def recall_em_k(referencia: np.ndarray, candidato: np.ndarray, consultas: int, k: int) -> float:
+    """Fração dos k vizinhos (produto interno) da referência recuperados com os vetores do candidato."""
+    acertos = 0
+    for q in range(consultas):
+        ref = set(np.argsort(-(referencia @ referencia[q]))[:k])
+        cand = set(np.argsort(-(candidato @ candidato[q]))[:k])
+        acertos += len(ref & cand)
+    return acertos / (consultas * k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de embeddings.")
+    parser.add_argument("--textos", type=int, default=2000)
+    parser.add_argument("--lote", type=int, default=32)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--modelo", help="padrão: o modelo do índice ativo")
+    args = parser.parse_args()
+
+    textos = carregar_textos(args.textos)
+    consultas = min(args.consultas, len(textos))
+    modelo = args.modelo or modelo_ativo()
+    print(f"{len(textos)} textos, lote {args.lote}, modelo {modelo}")
+    print(f"{'backend':<10} {'textos/s':>10} {'cos médio':>10} {'cos mín':>10} {f'recall@{args.k}':>10}")
+
+    referencia = None
+    for nome in args.backends.split(","):
+        try:
+            backend = BACKENDS[nome](modelo)
+        except Exception as e:
+            print(f"{nome:<10} indisponível: {e}")
+            continue
+        vetores, duracao = medir(backend, textos, args.lote)
+        if referencia is None:
+            if nome != "torch":
+                print("Aviso: a referência de similaridade e recall é o primeiro backend listado.")
+            referencia = vetores
+        cos = np.sum(referencia * vetores, axis=1) / (
+            np.linalg.norm(referencia, axis=1) * np.linalg.norm(vetores, axis=1)
+        )
+        recall = recall_em_k(referencia, vetores, consultas, args.k)
+        print(f"{nome:<10} {len(textos) / duracao:>10.1f} {cos.mean():>10.4f} {cos.min():>10.4f} {recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+import argparse
+import difflib
+import time
+from collections import Counter
+import numpy as np
+from PIL import Image
+from utils.ocr_engine import PoolOCR
+from utils.ocr_preprocess import PRESETS_OCR
+
+# Compara os presets de pré-processamento do OCR num conjunto de
+# screenshots: tempo por imagem e precisão contra o gabarito. O gabarito
+# de `tela.png` é o texto em `tela.txt` na mesma pasta; sem ele, a
+# referência é a saída do primeiro preset listado.
+#
+#   python local/tools/benchmark_ocr.py --pasta data/ocr_fixtures
+#   python local/tools/benchmark_ocr.py --presets original,padrao --repeticoes 3
+
+PASTA_FIXTURES = os.path.join(os.path.dirname(__file__), "..", "..", "data", "ocr_fixtures")
+EXTENSOES = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def carregar_fixtures(pasta: str) -> list[tuple[str, Image.Image, str | None]]:
+    fixtures = []
+    for nome in sorted(os.listdir(pasta)):
+        if not nome.lower().endswith(EXTENSOES):
+            continue
+        caminho = os.path.join(pasta, nome)
+        gabarito = os.path.splitext(caminho)[0] + ".txt"
+        texto = open(gabarito, encoding="utf-8").read() if os.path.isfile(gabarito) else None
+        imagem = Image.open(caminho)
+        imagem.load()
+        fixtures.append((nome, imagem, texto))
+    return fixtures
+
+
+def palavras_de(texto: str) -> list[str]:
+    return texto.lower().split()
+
+
+def comparar(referencia: str, candidato: str) -> tuple[float, float, float]:
+    """Precisão e revocação das palavras (multiconjunto) e similaridade de caracteres."""
+    ref, cand = Counter(palavras_de(referencia)), Counter(palavras_de(candidato))
+    comuns = sum((ref & cand).values())
+    precisao = comuns / max(sum(cand.values()), 1)
+    revocacao = comuns / max(sum(ref.values()), 1)
+    similaridade = difflib.SequenceMatcher(
+        None, " ".join(palavras_de(referencia)), " ".join(palavras_de(candidato)), autojunk=False
+    ).ratio()
+    return precisao, revocacao, similaridade
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos presets de pré-processamento do OCR.")
+    parser.add_argument("--pasta", default=PASTA_FIXTURES, help="screenshots (e gabaritos .txt)")
+    parser.add_argument("--presets", default=",".join(PRESETS_OCR))
+    parser.add_argument("--repeticoes", type=int, default=1, help="execuções por imagem (tempo = mediana)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pasta):
+        print(f"Pasta de fixtures não encontrada: {args.pasta}")
+        return
+    fixtures = carregar_fixtures(args.pasta)
+    if not fixtures:
+        print(f"Nenhuma imagem em {args.pasta}")
+        return
+    presets = args.presets.split(",")
+    com_gabarito = sum(1 for _, _, texto in fixtures if texto is not None)
+    print(f"{len(fixtures)} imagens ({com_gabarito} com gabarito), {args.repeticoes} repetição(ões)")
+    if com_gabarito < len(fixtures):
+        print(f"Sem gabarito, a referência é a saída do preset '{presets[0]}'.")
+
+    pool = PoolOCR(workers=1)
+    print(f"Motor: {pool.motor.nome}")
+    print(f"{'preset':<10} {'ms/img':>8} {'p95 ms':>8} {'palavras':>9} {'precisão':>9} {'revocação':>10} {'similar.':>9}")
+    referencias = {}
+    for preset in presets:
+        if preset not in PRESETS_OCR:
+            print(f"{preset:<10} desconhecido")
+            continue
+        tempos, totais, metricas = [], 0, []
+        for nome, imagem, gabarito in fixtures:
+            duracoes = []
+            for _ in range(max(1, args.repeticoes)):
+                inicio = time.perf_counter()
+                texto = pool.texto(imagem.copy(), preset)
+                duracoes.append(time.perf_counter() - inicio)
+            tempos.append(float(np.median(duracoes)) * 1000)
+            totais += len(palavras_de(texto))
+            referencia = gabarito if gabarito is not None else referencias.setdefault(nome, texto)
+            metricas.append(comparar(referencia, texto))
+        precisao, revocacao, similaridade = np.mean(metricas, axis=0)
+        print(
+            f"{preset:<10} {np.mean(tempos):>8.0f} {np.percentile(tempos, 95):>8.0f} {totais:>9} "
+            f"{precisao:>9.3f} {revocacao:>10.3f} {similaridade:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+import argparse
+import time
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from utils.change_detector import amostra, mudanca_visivel
+
+# Verifica o detector de mudanças da sonda de atividade em telas sintéticas
+# de editor: digitar poucos caracteres precisa contar como atividade e o
+# cursor piscando não. Sai com código 1 se algum caso falhar.
+#
+#   python local/tools/check_change_detector.py
+#   python local/tools/check_change_detector.py --resolucoes 3840x2160
+
+CODIGO = [
+    "def consultar_faiss(query: str, k: int = 5, preferencia: str = \"curto>medio>longo\"):",
+    "    memoria = get_memory_service()",
+    "    if not len(memoria):",
+    "        return []",
+    "    filtros = filtros or {}",
+    "    estruturados = {c: v for c, v in filtros.items() if c in CHAVES_ESTRUTURADAS}",
+] * 8
+
+
+class Editor:
+    """Tela de editor em tema escuro: linhas de código e cursor de texto."""
+
+    def __init__(self, largura: int, altura: int, fonte: int):
+        self.largura, self.altura = largura, altura
+        self.fonte = ImageFont.load_default(size=fonte)
+        self.linha = round(fonte * 1.5)
+        self.margem = 4 * fonte
+
+    def desenhar(self, linhas, cursor=None, rolagem=0) -> np.ndarray:
+        imagem = Image.new("RGB", (self.largura, self.altura), (30, 30, 30))
+        d = ImageDraw.Draw(imagem)
+        for n, texto in enumerate(linhas):
+            y = self.margem + (n - rolagem) * self.linha
+            d.text((self.margem, y), texto, font=self.fonte, fill=(212, 212, 212))
+        if cursor is not None:
+            n, coluna = cursor
+            x = self.margem + d.textlength(linhas[n][:coluna], font=self.fonte)
+            y = self.margem + (n - rolagem) * self.linha
+            d.rectangle((x, y, x + 1, y + self.linha - 4), fill=(255, 255, 255))
+        return np.asarray(imagem)
+
+
+def casos(editor: Editor):
+    """(nome, tela anterior, tela atual, mudança esperada)."""
+    base = list(CODIGO)
+    fim = len(base[3])
+    antes = editor.desenhar(base, (3, fim))
+    digitado = base[:3] + [base[3] + " no"] + base[4:]
+    meio = base[:1] + [base[1][:14] + "abc" + base[1][14:]] + base[2:]
+    nova = base[:4] + ["    log(\"vazio\")"] + base[4:]
+    return [
+        ("cursor piscando", antes, editor.desenhar(base), False),
+        ("3 caracteres no fim da linha", antes, editor.desenhar(digitado, (3, fim + 3)), True),
+        ("3 caracteres no meio da linha", editor.desenhar(base, (1, 14)), editor.desenhar(meio, (1, 17)), True),
+        ("linha nova", antes, editor.desenhar(nova, (4, len(nova[4]))), True),
+        ("rolagem", antes, editor.desenhar(base, (3, fim), rolagem=3), True),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o detector de mudanças em telas sintéticas.")
+    parser.add_argument("--resolucoes", default="3840x2160:20,2560x1440:16,1920x1080:14", help="LARGURAxALTURA:FONTE,...")
+    args = parser.parse_args()
+
+    falhas = 0
+    for resolucao in args.resolucoes.split(","):
+        tamanho, fonte = resolucao.split(":")
+        largura, altura = (int(v) for v in tamanho.split("x"))
+        print(f"{largura}x{altura}, fonte {fonte}px")
+        for nome, antes, depois, esperado in casos(Editor(largura, altura, int(fonte))):
+            inicio = time.perf_counter()
+            mudou = mudanca_visivel(amostra(antes), amostra(depois))
+            ms = (time.perf_counter() - inicio) * 1000
+            ok = mudou == esperado
+            falhas += not ok
+            print(f"  {'ok ' if ok else 'ERRO'} {nome:<32} mudou={mudou!s:<5} {ms:5.1f} ms")
+    if falhas:
+        print(f"{falhas} caso(s) com falha")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,18 @@
 import os
 import sys
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-import json
-import faiss
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 import numpy as np
 # from sentence_transformers import SentenceTransformer
 from models.embedding import embed_text
-from core.storage import faiss_index, metadata
+from core.memory_service import get_memory_service
 from utils.logger import write_monitor_log as log
 
 
-# Carregar FAISS e metadados
-log("FAISS carregado.")
-if not os.path.exists(faiss_index):
-    raise FileNotFoundError(f"Índice FAISS não encontrado em {faiss_index}")
-
-index = faiss.read_index(faiss_index)
-
-with open(metadata, "r", encoding="utf-8") as f:
-    metadata = json.load(f)
-
-log(f"Índice com {len(metadata)} registros.")
+# Carregar FAISS e metadados (camadas particionadas, catálogos e WAL via serviço de memória)
+memoria = get_memory_service()
+log(f"Índice com {len(memoria)} registros.")
+if not len(memoria):
+    log("Memória vazia: nenhum registro indexado ainda.")
 
 # Carregar modelo de embeddings
 # embed_model = SentenceTransformer("all-MiniLM-L6-v2")
@@ -28,12 +20,13 @@ log(f"Índice com {len(metadata)} registros.")
 # Função de busca
 def search_activity(query, top_k=5, tag_filter=None):
     query_embedding = embed_text([query])
-    distances, indices = index.search(np.array(query_embedding), top_k)
+    distances, indices = memoria.buscar(np.array(query_embedding), top_k)
 
     results = []
     for idx, dist in zip(indices[0], distances[0]):
-        if idx < len(metadata):
-            result = metadata[idx]
+        result = memoria.registro(int(idx))
+        if result is not None:
+            result = dict(result)
             result['distance'] = float(dist)
 
             # Se tiver filtro por tag, só adiciona se uma das tags bater
@@ -0,0 +1,45 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+import argparse
+from core.model_registry import ler_registro
+from core.reindex import TAMANHO_LOTE, WORKERS, reindexar
+
+# Troca o modelo de embeddings da memória sem apagá-la: reconstrói o índice
+# com o modelo novo ao lado do atual e troca os dois no fim.
+#
+#   python local/tools/reindex_embeddings.py sentence-transformers/all-mpnet-base-v2
+#   python local/tools/reindex_embeddings.py --listar
+
+
+def listar():
+    registro = ler_registro()
+    for nome, entrada in registro["indices"].items():
+        marcador = "*" if nome == registro["ativo"] else " "
+        print(f"{marcador} {nome:<50} {entrada['modelo']:<45} {entrada['dimensao']:>5}  {entrada.get('estado', '')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reindexa a memória com outro modelo de embeddings.")
+    parser.add_argument("modelo", nargs="?", help="nome do modelo SentenceTransformer")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--listar", action="store_true", help="mostra os índices registrados e sai")
+    args = parser.parse_args()
+
+    if args.listar or not args.modelo:
+        listar()
+        return
+    # A última recuperação e a troca são feitas sob o lock do serviço de
+    # memória deste processo. Rode com o tracker parado: registros que outro
+    # processo gravar entre essa recuperação e a troca ficam fora do índice novo
+    resumo = reindexar(args.modelo, args.lote, args.workers)
+    print(
+        f"{resumo['registros']} registros reindexados com {resumo['modelo']} "
+        f"({resumo['dimensao']} dimensões) em {resumo['duracao_s']:.1f} s. "
+        f"Índice ativo: {resumo['indice']}."
+    )
+
+
+if __name__ == "__main__":
+    main()
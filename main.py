@@ -46,6 +46,8 @@ def thinking_animation(stop_event):
         time.sleep(0.2)
 
 def continuous_tracking(stop_event):
+    from core.vacuum import iniciar_vacuum_periodico
+    iniciar_vacuum_periodico(stop_event)  # retenção e compactação da memória em segundo plano
     while not stop_event.is_set():
         track_activity()
         time.sleep(5)  # intervalo de captura
@@ -1,16 +1,96 @@
-from sentence_transformers import SentenceTransformer
+import threading
 import numpy as np
-import torch
-import random
+from concurrent.futures import Future
+from models.embedding_cache import CacheEmbeddings
+from models.embedding_backends import BACKEND, criar_backend
+from core.model_registry import MODELO_PADRAO, modelo_ativo
+from models.embedding_worker import ServicoEmbeddings, PRIORIDADE_CONSULTA
+from utils.logger import write_monitor_log as log
 
-torch.manual_seed(42)
-np.random.seed(42)
-random.seed(42)
+# Modelo de uma memória nova; o modelo em uso é sempre o do índice ativo
+# no registro de modelos (core.model_registry), que muda após uma reindexação
+MODEL_NAME = MODELO_PADRAO
 
-_embed_model = SentenceTransformer("all-MiniLM-L6-v2")
-_embed_model.eval()
+# Estados do modelo de embeddings (exibidos pela GUI)
+NAO_CARREGADO = "nao_carregado"
+CARREGANDO = "carregando"
+CARREGADO = "carregado"
+ERRO = "erro"
 
-def embed_text(texts: list[str] | str) -> np.ndarray:
+# O encoder (SentenceTransformer/torch ou ONNX Runtime, conforme
+# NEXUS_EMBED_BACKEND) só é importado e carregado no primeiro uso ou no
+# pré-aquecimento, para que importar este módulo seja barato
+_modelos = {}  # nome -> (backend, cache)
+_estados = {}
+_lock_carga = threading.Lock()
+
+def _carregar_modelo(nome: str):
+    carregado = _modelos.get(nome)
+    if carregado is not None:
+        return carregado
+    with _lock_carga:
+        if nome in _modelos:
+            return _modelos[nome]
+        _estados[nome] = CARREGANDO
+        try:
+            backend = criar_backend(nome, BACKEND)
+            # Textos repetidos (títulos de janela, resumos, perguntas) nunca voltam ao modelo
+            cache = CacheEmbeddings(backend.identificador, backend.dimensao)
+        except Exception as e:
+            _estados[nome] = ERRO
+            log(f"Falha ao carregar o modelo de embeddings {nome}: {e}")
+            raise
+        _modelos[nome] = (backend, cache)
+        _estados[nome] = CARREGADO
+        log(f"Modelo de embeddings {backend.identificador} carregado ({type(backend).__name__}).")
+        return _modelos[nome]
+
+def codificador(modelo: str | None = None):
+    """
+    Função lista de textos -> matriz de embeddings do `modelo` (por padrão,
+    o do índice ativo), com cache. O modelo é carregado na primeira chamada.
+    """
+    def codificar(textos: list[str]) -> np.ndarray:
+        backend, cache = _carregar_modelo(modelo or modelo_ativo())
+        return cache.obter(textos, backend.encode)
+    return codificar
+
+def dimensao_modelo(modelo: str) -> int:
+    return _carregar_modelo(modelo)[0].dimensao
+
+# Todos os embeddings passam por uma única thread que agrupa pedidos
+# simultâneos (tracker, compactação, chat) em lotes; consultas têm prioridade
+_servico = ServicoEmbeddings(codificador())
+
+def embedding_model_state() -> str:
+    """Estado do modelo do índice ativo: nao_carregado, carregando, carregado ou erro."""
+    return _estados.get(modelo_ativo(), NAO_CARREGADO)
+
+def prewarm_embedding_model() -> threading.Thread | None:
+    """Carrega o modelo ativo numa thread em segundo plano (não bloqueia quem chama)."""
+    if embedding_model_state() in (CARREGANDO, CARREGADO):
+        return None
+
+    def _aquecer():
+        try:
+            _carregar_modelo(modelo_ativo())
+        except Exception:
+            pass  # já registrado no log; o próximo embed_text tenta de novo
+
+    thread = threading.Thread(target=_aquecer, name="prewarm-embeddings", daemon=True)
+    thread.start()
+    return thread
+
+def embed_text_async(texts: list[str] | str, prioridade: int = PRIORIDADE_CONSULTA) -> Future:
+    """Enfileira os textos no serviço de embeddings e retorna um Future com a matriz."""
     if isinstance(texts, str):
         texts = [texts]
-    return _embed_model.encode(texts)
+    return _servico.enviar(list(texts), prioridade)
+
+def embed_text(texts: list[str] | str, prioridade: int = PRIORIDADE_CONSULTA) -> np.ndarray:
+    return embed_text_async(texts, prioridade).result()
+
+def embedding_cache_stats() -> dict:
+    """Consultas, acertos (memória e disco) e taxas de acerto do cache de embeddings."""
+    carregado = _modelos.get(modelo_ativo())
+    return carregado[1].taxas() if carregado is not None else {}
@@ -0,0 +1,156 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import re
+import shutil
+import numpy as np
+from utils.logger import write_monitor_log as log
+
+# Backend do encoder: "torch" (SentenceTransformer), "onnx" (ONNX Runtime,
+# float32) ou "onnx-int8" (ONNX Runtime com pesos quantizados em int8)
+BACKEND = os.getenv("NEXUS_EMBED_BACKEND", "torch").lower()
+ONNX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "models", "onnx"))
+THREADS_ONNX = int(os.getenv("NEXUS_EMBED_ONNX_THREADS", "0"))  # 0 = padrão do ONNX Runtime
+TAMANHO_LOTE_ONNX = 32
+
+
+class BackendTorch:
+    """Encoder original: SentenceTransformer sobre PyTorch."""
+
+    def __init__(self, modelo: str):
+        import random
+        import torch
+        from sentence_transformers import SentenceTransformer
+        torch.manual_seed(42)
+        np.random.seed(42)
+        random.seed(42)
+        self._modelo = SentenceTransformer(modelo)
+        self._modelo.eval()
+        self.dimensao = self._modelo.get_sentence_embedding_dimension()
+        self.identificador = modelo
+
+    def encode(self, textos: list[str]) -> np.ndarray:
+        return self._modelo.encode(textos)
+
+
+def _dir_onnx(modelo: str) -> str:
+    return os.path.join(ONNX_DIR, re.sub(r"[^\w.-]", "_", modelo))
+
+
+def exportar_onnx(modelo: str, quantizado: bool = False) -> str:
+    """
+    Exporta o transformer do SentenceTransformer para ONNX (uma única vez) e,
+    se pedido, gera a versão com quantização dinâmica int8. O pooling e a
+    normalização do SentenceTransformer são refeitos em numpy pelo backend;
+    a configuração deles fica em `nexus_pooling.json`. Retorna o caminho do .onnx.
+    """
+    diretorio = _dir_onnx(modelo)
+    caminho = os.path.join(diretorio, "model.onnx")
+    caminho_int8 = os.path.join(diretorio, "model_int8.onnx")
+    if not os.path.exists(caminho):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize, Pooling
+        st = SentenceTransformer(modelo, device="cpu")
+        st.eval()
+        pooling = next(m for m in st.modules() if isinstance(m, Pooling))
+        if not pooling.pooling_mode_mean_tokens:
+            raise ValueError(f"{modelo}: só o pooling por média é suportado no backend ONNX.")
+        transformer = st[0].auto_model
+        tmp = diretorio + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        st.tokenizer.save_pretrained(tmp)
+        exemplo = st.tokenizer(["exemplo de texto"], return_tensors="pt")
+        entradas = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in exemplo]
+        eixos = {n: {0: "lote", 1: "tokens"} for n in entradas}
+        eixos["last_hidden_state"] = {0: "lote", 1: "tokens"}
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer, tuple(exemplo[n] for n in entradas), os.path.join(tmp, "model.onnx"),
+                input_names=entradas, output_names=["last_hidden_state"],
+                dynamic_axes=eixos, opset_version=14,
+            )
+        with open(os.path.join(tmp, "nexus_pooling.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "max_seq_length": st.max_seq_length,
+                "normalizar": any(isinstance(m, Normalize) for m in st.modules()),
+                "dimensao": st.get_sentence_embedding_dimension(),
+            }, f, indent=2)
+        shutil.rmtree(diretorio, ignore_errors=True)
+        os.replace(tmp, diretorio)
+        log(f"Modelo de embeddings {modelo} exportado para ONNX em {diretorio}.")
+    if quantizado and not os.path.exists(caminho_int8):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(caminho, caminho_int8 + ".tmp", weight_type=QuantType.QInt8)
+        os.replace(caminho_int8 + ".tmp", caminho_int8)
+        log(f"Modelo de embeddings {modelo} quantizado para int8 em {caminho_int8}.")
+    return caminho_int8 if quantizado else caminho
+
+
+class BackendOnnx:
+    """
+    Encoder em ONNX Runtime (CPU), com pooling por média e normalização L2
+    iguais às do SentenceTransformer: os vetores ficam no mesmo espaço de
+    384 dimensões do índice. Com `quantizado`, usa os pesos em int8.
+    """
+
+    def __init__(self, modelo: str, quantizado: bool = False):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        caminho = exportar_onnx(modelo, quantizado)
+        diretorio = os.path.dirname(caminho)
+        with open(os.path.join(diretorio, "nexus_pooling.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        opcoes = ort.SessionOptions()
+        if THREADS_ONNX > 0:
+            opcoes.intra_op_num_threads = THREADS_ONNX
+        self._sessao = ort.InferenceSession(caminho, opcoes, providers=["CPUExecutionProvider"])
+        self._entradas = [e.name for e in self._sessao.get_inputs()]
+        self._tokenizer = AutoTokenizer.from_pretrained(diretorio)
+        self._max_tokens = config["max_seq_length"]
+        self._normalizar = config["normalizar"]
+        self.dimensao = config["dimensao"]
+        # Vetores int8 diferem levemente dos float32: não compartilham o cache
+        self.identificador = f"{modelo}@int8" if quantizado else modelo
+
+    def _encode_lote(self, textos: list[str]) -> np.ndarray:
+        tokens = self._tokenizer(
+            textos, padding=True, truncation=True, max_length=self._max_tokens, return_tensors="np"
+        )
+        entradas = {n: tokens[n].astype(np.int64) for n in self._entradas}
+        saida = self._sessao.run(None, entradas)[0]
+        mascara = tokens["attention_mask"][..., None].astype(np.float32)
+        vetores = (saida * mascara).sum(axis=1) / np.clip(mascara.sum(axis=1), 1e-9, None)
+        if self._normalizar:
+            vetores /= np.clip(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12, None)
+        return vetores.astype(np.float32)
+
+    def encode(self, textos: list[str]) -> np.ndarray:
+        if not textos:
+            return np.empty((0, self.dimensao), dtype=np.float32)
+        return np.concatenate([
+            self._encode_lote(textos[i:i + TAMANHO_LOTE_ONNX])
+            for i in range(0, len(textos), TAMANHO_LOTE_ONNX)
+        ])
+
+
+BACKENDS = {
+    "torch": lambda modelo: BackendTorch(modelo),
+    "onnx": lambda modelo: BackendOnnx(modelo),
+    "onnx-int8": lambda modelo: BackendOnnx(modelo, quantizado=True),
+}
+
+
+def criar_backend(modelo: str, nome: str = BACKEND):
+    """Instancia o backend pedido; se não estiver disponível, volta para o PyTorch."""
+    if nome not in BACKENDS:
+        log(f"Backend de embeddings desconhecido '{nome}'. Usando torch.")
+        nome = "torch"
+    if nome != "torch":
+        try:
+            return BACKENDS[nome](modelo)
+        except Exception as e:
+            log(f"Backend de embeddings '{nome}' indisponível ({e}). Usando torch.")
+    return BACKENDS["torch"](modelo)
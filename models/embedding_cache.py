@@ -0,0 +1,154 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.logger import write_monitor_log as log
+
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "logs", "embedding_cache"))
+TAMANHO_LRU = int(os.getenv("NEXUS_EMBED_CACHE_SIZE", "4096"))  # vetores em memória
+MAX_LINHAS_DISCO = int(os.getenv("NEXUS_EMBED_CACHE_DISK_MAX", "100000"))  # 0 = só memória
+INTERVALO_RELATORIO = 1000  # consultas entre dois registros da taxa de acerto no log
+
+
+def chave_embedding(modelo: str, texto: str) -> bytes:
+    """Chave do cache: SHA-1 de (modelo, texto)."""
+    return hashlib.sha1(f"{modelo}\0{texto}".encode("utf-8")).digest()
+
+
+class CacheEmbeddings:
+    """
+    Cache de embeddings em dois níveis, indexado por (modelo, hash do texto):
+    uma LRU em memória e um arquivo em disco, compartilhado entre execuções
+    e processos.
+
+    O arquivo `<modelo>.emb` é uma sequência de linhas de tamanho fixo
+    (chave SHA-1 + vetor float32) lida por memmap; o índice chave -> linha
+    é montado na abertura e acompanha o que outros processos acrescentam.
+    Cada lote novo é acrescentado com uma única escrita, e uma linha
+    incompleta no fim (queda no meio da escrita) é ignorada.
+    """
+
+    def __init__(self, modelo: str, dimensao: int, diretorio: str = CACHE_DIR):
+        self.modelo = modelo
+        self.dimensao = dimensao
+        self.path = os.path.join(diretorio, re.sub(r"[^\w.-]", "_", modelo) + ".emb")
+        self._lock = threading.RLock()
+        self._lru = OrderedDict()
+        self._linhas = {}
+        self._lidos = 0  # bytes do arquivo já indexados
+        self._mapa = None
+        self._tipo = np.dtype([("chave", "S20"), ("vetor", "<f4", (dimensao,))])
+        self.estatisticas = {"consultas": 0, "acertos_memoria": 0, "acertos_disco": 0, "faltas": 0}
+        if MAX_LINHAS_DISCO > 0:
+            os.makedirs(diretorio, exist_ok=True)
+            self._acompanhar_disco()
+
+    # --- Disco ---
+    def _acompanhar_disco(self):
+        """Indexa as linhas acrescentadas ao arquivo desde a última leitura (inclusive por outro processo)."""
+        try:
+            tamanho = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        total = tamanho // self._tipo.itemsize
+        if total * self._tipo.itemsize <= self._lidos:
+            return
+        self._mapa = np.memmap(self.path, dtype=self._tipo, mode="r", shape=(total,))
+        inicio = self._lidos // self._tipo.itemsize
+        for n, chave in enumerate(self._mapa["chave"][inicio:], start=inicio):
+            self._linhas.setdefault(bytes(chave), n)
+        self._lidos = total * self._tipo.itemsize
+
+    def _gravar_disco(self, chaves, vetores):
+        if MAX_LINHAS_DISCO <= 0 or len(self._linhas) >= MAX_LINHAS_DISCO:
+            return
+        linhas = np.empty(len(chaves), dtype=self._tipo)
+        linhas["chave"] = chaves
+        linhas["vetor"] = vetores
+        with open(self.path, "ab") as f:
+            # Completa uma linha parcial deixada por uma queda antes de acrescentar
+            excesso = f.tell() % self._tipo.itemsize
+            if excesso:
+                f.truncate(f.tell() - excesso)
+            f.write(linhas.tobytes())
+        self._acompanhar_disco()
+        if len(self._linhas) >= MAX_LINHAS_DISCO:
+            log(f"Cache de embeddings: limite de {MAX_LINHAS_DISCO} vetores em disco atingido; novos ficam só em memória.")
+
+    # --- LRU ---
+    def _lembrar(self, chave: bytes, vetor: np.ndarray):
+        self._lru[chave] = vetor
+        self._lru.move_to_end(chave)
+        while len(self._lru) > TAMANHO_LRU:
+            self._lru.popitem(last=False)
+
+    # --- Consulta ---
+    def obter(self, textos: list[str], codificar) -> np.ndarray:
+        """
+        Embeddings dos textos, na ordem pedida. Só os textos ausentes dos dois
+        níveis (sem repetição) passam por `codificar(lista) -> matriz`.
+        """
+        chaves = [chave_embedding(self.modelo, t) for t in textos]
+        resultado = np.empty((len(textos), self.dimensao), dtype=np.float32)
+        faltantes = {}
+        with self._lock:
+            for n, chave in enumerate(chaves):
+                vetor = self._buscar(chave)
+                if vetor is None:
+                    faltantes.setdefault(chave, []).append(n)
+                else:
+                    resultado[n] = vetor
+            self._contar(len(textos), sum(len(p) for p in faltantes.values()))
+        if faltantes:
+            novas = list(faltantes)
+            vetores = np.asarray(codificar([textos[faltantes[c][0]] for c in novas]), dtype=np.float32)
+            with self._lock:
+                for chave, vetor in zip(novas, vetores):
+                    resultado[faltantes[chave]] = vetor
+                    self._lembrar(chave, vetor.copy())
+                self._gravar_disco(novas, vetores)
+        return resultado
+
+    def _buscar(self, chave: bytes) -> np.ndarray | None:
+        vetor = self._lru.get(chave)
+        if vetor is not None:
+            self._lru.move_to_end(chave)
+            self.estatisticas["acertos_memoria"] += 1
+            return vetor
+        if MAX_LINHAS_DISCO > 0:
+            linha = self._linhas.get(chave)
+            if linha is None:
+                self._acompanhar_disco()
+                linha = self._linhas.get(chave)
+            if linha is not None:
+                vetor = np.array(self._mapa["vetor"][linha], dtype=np.float32)
+                self._lembrar(chave, vetor)
+                self.estatisticas["acertos_disco"] += 1
+                return vetor
+        return None
+
+    def _contar(self, consultas: int, faltas: int):
+        antes = self.estatisticas["consultas"]
+        self.estatisticas["consultas"] += consultas
+        self.estatisticas["faltas"] += faltas
+        if antes // INTERVALO_RELATORIO != self.estatisticas["consultas"] // INTERVALO_RELATORIO:
+            e = self.taxas()
+            log(
+                f"Cache de embeddings ({self.modelo}): {e['consultas']} consultas, "
+                f"acerto {e['taxa_acerto']:.1%} (memória {e['taxa_memoria']:.1%}, disco {e['taxa_disco']:.1%}), "
+                f"{len(self._linhas)} vetores em disco."
+            )
+
+    def taxas(self) -> dict:
+        """Estatísticas acumuladas e taxas de acerto (total, memória e disco)."""
+        with self._lock:
+            e = dict(self.estatisticas)
+        total = max(e["consultas"], 1)
+        e["taxa_memoria"] = e["acertos_memoria"] / total
+        e["taxa_disco"] = e["acertos_disco"] / total
+        e["taxa_acerto"] = (e["acertos_memoria"] + e["acertos_disco"]) / total
+        return e
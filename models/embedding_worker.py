@@ -0,0 +1,91 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from utils.logger import write_monitor_log as log
+
+# Prioridades da fila (menor = atendida antes)
+PRIORIDADE_CONSULTA = 0  # perguntas do chat: alguém está esperando a resposta
+PRIORIDADE_INGESTAO = 1  # tracker e compactação, em segundo plano
+
+TAMANHO_LOTE = int(os.getenv("NEXUS_EMBED_BATCH", "32"))  # textos por chamada ao modelo
+MAX_ESPERA_MS = float(os.getenv("NEXUS_EMBED_MAX_WAIT_MS", "10"))
+TAMANHO_FILA = int(os.getenv("NEXUS_EMBED_QUEUE", "256"))  # pedidos pendentes (quem enfileira espera se lotar)
+
+
+class ServicoEmbeddings:
+    """
+    Thread única que gera todos os embeddings do processo.
+
+    Os pedidos entram numa fila de prioridade limitada e são agrupados em
+    lotes: ao receber o primeiro pedido, o serviço espera até MAX_ESPERA_MS
+    por outros (ou até juntar TAMANHO_LOTE textos) e codifica todos numa
+    só chamada. Cada pedido recebe um Future com a sua parte do resultado.
+    Consultas do chat passam à frente da ingestão em segundo plano.
+    """
+
+    def __init__(self, codificar):
+        self._codificar = codificar  # lista de textos -> matriz de embeddings
+        self._fila = queue.PriorityQueue(maxsize=TAMANHO_FILA)
+        self._sequencia = itertools.count()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.textos = 0
+
+    def _garantir_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._laco, name="embeddings", daemon=True)
+                    self._thread.start()
+
+    def enviar(self, textos: list[str], prioridade: int = PRIORIDADE_CONSULTA) -> Future:
+        """Enfileira os textos e retorna um Future com a matriz de embeddings."""
+        futuro = Future()
+        if not textos or threading.current_thread() is self._thread:
+            # Nada a agrupar (lista vazia ou chamada de dentro do próprio serviço): codifica direto
+            futuro.set_result(self._codificar(list(textos)))
+            return futuro
+        self._garantir_thread()
+        self._fila.put((prioridade, next(self._sequencia), list(textos), futuro))
+        return futuro
+
+    def _coletar_lote(self) -> list:
+        pedidos = [self._fila.get()]
+        total = len(pedidos[0][2])
+        prazo = time.monotonic() + MAX_ESPERA_MS / 1000
+        while total < TAMANHO_LOTE:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                pedido = self._fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            pedidos.append(pedido)
+            total += len(pedido[2])
+        return pedidos
+
+    def _laco(self):
+        while True:
+            pedidos = self._coletar_lote()
+            textos = [t for _, _, lote, _ in pedidos for t in lote]
+            try:
+                vetores = np.asarray(self._codificar(textos), dtype=np.float32)
+            except Exception as e:
+                log(f"Serviço de embeddings: falha ao codificar {len(textos)} textos: {e}")
+                for _, _, _, futuro in pedidos:
+                    futuro.set_exception(e)
+                continue
+            self.lotes += 1
+            self.textos += len(textos)
+            inicio = 0
+            for _, _, lote, futuro in pedidos:
+                futuro.set_result(vetores[inicio:inicio + len(lote)])
+                inicio += len(lote)
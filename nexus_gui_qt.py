@@ -10,13 +10,14 @@ from PySide6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
                              QScrollArea, QFrame, QListWidget, QListWidgetItem, QMenu,
                              QMessageBox)
 from PySide6.QtGui import QMovie, QIcon, QPixmap, QAction
-from PySide6.QtCore import Signal, QObject, Qt, QThread
+from PySide6.QtCore import Signal, QObject, Qt, QThread, QTimer
 # from models.llm_config import AVAILABLE_MODELS, set_selected_model
 from models.llm_manager import check_api_key
 from main import continuous_tracking
 from core.storage import CHAT_TITLES_FILE, ASSETS_DIR, BASE_DIR
 from nodes_graph.langgraph_nodes import graph_executor, store, load_turnos_from_disk, get_turnos, save_turnos_to_disk
 from models.llm_config import AVAILABLE_MODELS, NODE_MODELS_DEFAULT, get_format_from_name
+from models.embedding import prewarm_embedding_model, embedding_model_state, CARREGADO, ERRO
 # Mapeamento reverso para obter o nome amigável a partir do ID do modelo
 AVAILABLE_MODELS_REVERSE = {v: k for k, v in AVAILABLE_MODELS.items()}
 
@@ -75,6 +76,13 @@ class NexusApp(QWidget):
         self.model_selections = {} # Armazena as seleções de modelo da GUI
         self.init_ui()
 
+        # O modelo de embeddings carrega em segundo plano enquanto a janela já está aberta
+        prewarm_embedding_model()
+        self.embedding_timer = QTimer(self)
+        self.embedding_timer.timeout.connect(self._update_embedding_status)
+        self.embedding_timer.start(500)
+        self._update_embedding_status()
+
     def init_ui(self):
         self.setWindowTitle("Nexus Agent")
         self.setGeometry(100, 100, 900, 700)
@@ -97,6 +105,18 @@ class NexusApp(QWidget):
         # self.model_combo.currentTextChanged.connect(self._on_model_changed)
         # self._on_model_changed(self.model_combo.currentText())
 
+    def _update_embedding_status(self):
+        estado = embedding_model_state()
+        if estado == CARREGADO:
+            self.embedding_status_label.hide()
+            self.embedding_timer.stop()
+            return
+        if estado == ERRO:
+            self.embedding_status_label.setText("Falha ao carregar o modelo de embeddings (veja o log). Nova tentativa na próxima pergunta.")
+        else:
+            self.embedding_status_label.setText("Carregando modelo de embeddings... a primeira busca na memória pode demorar.")
+        self.embedding_status_label.show()
+
     def _update_api_key_visibility(self):
         """Verifica todos os seletores de modelo e mostra o campo de API se algum for da OpenAI."""
         uses_openai = False
@@ -234,6 +254,10 @@ class NexusApp(QWidget):
         self.scroll_area.setWidget(self.chat_history_container)
         chat_layout.addWidget(self.scroll_area)
 
+        self.embedding_status_label = QLabel()
+        self.embedding_status_label.setObjectName("EmbeddingStatus")
+        chat_layout.addWidget(self.embedding_status_label)
+
         input_layout = QHBoxLayout()
         self.user_input = QLineEdit()
         self.user_input.setPlaceholderText("Digite sua pergunta...")
@@ -624,6 +648,7 @@ class NexusApp(QWidget):
             }
             QComboBox::drop-down { border: none; }
             QScrollArea { border: none; }
+            #EmbeddingStatus { font-size: 12px; color: #aab7c4; }
         """)
 
 if __name__ == "__main__":
@@ -14,7 +14,8 @@ from langgraph.prebuilt import create_react_agent
 from langchain_openai import ChatOpenAI
 from langchain.storage import InMemoryStore as KeyValueStore
 from .nexus_tools_retriever import TOOLS_NEXUS
-from core.storage import METADATA_PATH, TURNS_PATH
+from core.storage import TURNS_PATH, project_namespace
+from core.memory_service import get_memory_service
 from datetime import date, timedelta
 
 
@@ -69,6 +70,7 @@ class NexusState(TypedDict, total=False):
     fim: Optional[str]
     detalhes: Optional[str]
     tentativas: Optional[int]
+    projeto: Optional[str]  # Namespace da memória; ausente = projeto ativo detectado
     
     # Campos para carregar a configuração de modelo dinâmica
     model_router_name: Optional[str]
@@ -171,29 +173,30 @@ def node_consultar_memoria(state: NexusState) -> NexusState:
 
     # Consulta temporal ou "mais recente"
     if tipo == "temporal" and state.get("inicio") and state.get("fim"):
-        with open(METADATA_PATH, "r", encoding="utf-8") as f:
-            meta = json.load(f)
         inicio = state["inicio"]
         fim = state["fim"]
-        # Pegue índices dos blocos que caem no intervalo
-        indices_relevantes = [
-            i for i, b in enumerate(meta)
-            if inicio <= b.get("timestamp", "") <= fim
-        ]
-        topk_indices = indices_relevantes[:8]  # Limite hard, se quiser parametrizar fique à vontade
+        # Índice temporal: blocos (curtos, médios e longos) cujo período cruza o intervalo
+        indices_relevantes = get_memory_service().intervalo(inicio, fim)
+        if len(indices_relevantes) > 8:
+            # Período com muitos blocos: escolhe os mais relevantes dentro dele
+            topk_indices = consultar_faiss(pergunta, k=8, filtros={"inicio": inicio, "fim": fim})
+        else:
+            topk_indices = indices_relevantes
         log(f"Node: consultar_memoria | Temporal: {len(topk_indices)} blocos no período {inicio} até {fim}.")
     elif tipo == "mais_recente":
-        with open(METADATA_PATH, "r", encoding="utf-8") as f:
-            meta = json.load(f)
-        if meta:
-            topk_indices = [len(meta) - 1]  # Só o último bloco
-        else:
-            topk_indices = []
+        topk_indices = get_memory_service().mais_recentes(1)  # Só o último bloco
         log(f"Node: consultar_memoria | Mais recente: índice {topk_indices}")
     else:
-        # Semântica via FAISS (sempre retorna índices dos blocos!)
-        topk_indices = consultar_faiss(pergunta, k=8)
-        log(f"Node: consultar_memoria | Semântica FAISS: {len(topk_indices)} blocos.")
+        # Semântica via FAISS (sempre retorna índices dos blocos!), por padrão só no projeto atual
+        projeto = state.get("projeto")
+        if projeto is None:
+            projeto = project_namespace()
+        if projeto:
+            topk_indices = consultar_faiss(pergunta, k=8, filtros={"projeto": projeto})
+        if not topk_indices:
+            topk_indices = consultar_faiss(pergunta, k=8)  # Sem projeto ou sem memória dele: busca global
+            projeto = ""
+        log(f"Node: consultar_memoria | Semântica FAISS: {len(topk_indices)} blocos (projeto: {projeto or 'todos'}).")
 
     return {**state, "topk_indices": topk_indices}
 
@@ -369,7 +372,13 @@ def node_interpretar_codigo(state: NexusState) -> NexusState:
     pergunta = state["pergunta"]
     log(f"Node: interpretar_codigo | Analisando pergunta sobre código: '{pergunta[:80]}...'")
 
-    summary_code = load_latest_code_summary()
+    # Snapshot de código do projeto atual (sem projeto detectado, o mais recente de todos)
+    projeto = state.get("projeto")
+    if projeto is None:
+        projeto = project_namespace()
+    summary_code = load_latest_code_summary(projeto or None)
+    if projeto and summary_code == "não encontrado":
+        summary_code = load_latest_code_summary()
     resposta_bruta = ""
     duration = 0 
 
@@ -3,8 +3,9 @@ from langchain_core.retrievers import BaseRetriever
 from typing import List
 import os
 
-from core.context import consultar_faiss
-from utils.ocr import capture_full_screenshot_with_motion, extract_text_from_image
+from core.context import consultar_faiss, get_blocks_by_indices
+from utils.ocr import capturar_quadros, reter_quadro, extract_text_from_images
+from utils.frames import gravador_png
 from models.llm_manager import load_llm
 from langchain_community.tools import tool
 
@@ -34,8 +35,9 @@ def ler_arquivo(path: str) -> str:
 def tirar_screenshot(_: str = "") -> str:
     """Tira um screenshot da tela inteira e salva em arquivo temporário."""
     try:
-        path, _ = capture_full_screenshot_with_motion()
-        return f"Screenshot salva em: {path}"
+        paths = [reter_quadro(quadro) for quadro in capturar_quadros()]
+        gravador_png.aguardar()
+        return f"Screenshot salva em: {', '.join(paths)}"
     except Exception as e:
         return f"Erro ao capturar screenshot: {e}"
 
@@ -43,8 +45,9 @@ def tirar_screenshot(_: str = "") -> str:
 def ocr_da_tela(_: str = "") -> str:
     """Executa OCR (reconhecimento de texto) da tela atual."""
     try:
-        path, _ = capture_full_screenshot_with_motion()
-        texto = extract_text_from_image(path)
+        # OCR direto dos quadros em memória, sem gravar arquivo
+        textos = extract_text_from_images(capturar_quadros())
+        texto = "\n".join(t for t in textos if t)
         return texto or "Nenhum texto encontrado."
     except Exception as e:
         return f"Erro ao extrair texto: {e}"
@@ -58,7 +61,7 @@ class NexusRetriever(BaseRetriever):
     k: int = 5
 
     def _get_relevant_documents(self, query: str) -> List[Document]:
-        blocos = consultar_faiss(query, k=self.k)
+        blocos = get_blocks_by_indices(consultar_faiss(query, k=self.k))
         return [
             Document(
                 page_content=b.get("context_summary", ""),
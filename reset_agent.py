@@ -7,7 +7,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "data"))
 
 def apagar_arquivos_data():
-    extensoes = ["json", "faiss", "txt", "png", "jpg", "jpeg", "gif", "mp4", "webm", "wav", "mp3"]
+    extensoes = ["json", "jsonl", "idx", "npz", "npy", "f16", "ids", "wal", "anterior", "sqlite3", "sqlite3-wal", "sqlite3-shm", "migrado", "emb", "faiss", "txt", "png", "jpg", "jpeg", "gif", "mp4", "webm", "wav", "mp3"]
     arquivos_para_apagar = []
 
     # Busca todos os arquivos com extensões relevantes dentro de /data e subpastas
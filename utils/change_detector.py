@@ -0,0 +1,97 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import mss
+import numpy as np
+from PIL import Image
+
+COLUNAS_AMOSTRA = 960  # pontos por linha da amostra (passo de 4 px em 4K, 2 px em Full HD)
+LIMIAR_PIXEL = int(os.getenv("NEXUS_MUDANCA_LIMIAR", "24"))  # diferença de luminância (0-255) que conta como mudança
+# Maior mudança tolerada, em pontos da amostra: um cursor de texto piscando
+LARGURA_CURSOR = int(os.getenv("NEXUS_CURSOR_LARGURA", "2"))
+ALTURA_CURSOR = int(os.getenv("NEXUS_CURSOR_ALTURA", "12"))
+
+
+def amostra(origem) -> np.ndarray:
+    """
+    Luminância aproximada (canal verde, o mesmo no BGRA e no RGB) de um
+    Quadro, array numpy ou imagem PIL, lida com passo proporcional à largura
+    (~COLUNAS_AMOSTRA pontos por linha): um quadro 4K vira 540x960 bytes sem
+    converter a imagem inteira, e o texto ocupa o mesmo número de pontos
+    em telas com escala de interface proporcional à resolução.
+    """
+    if isinstance(origem, Image.Image):
+        origem = np.asarray(origem.convert("L") if origem.mode not in ("RGB", "RGBA", "L") else origem)
+    elif not isinstance(origem, np.ndarray):
+        origem = origem.array  # Quadro: visão do buffer BGRA do mss
+    if origem.ndim == 3:
+        origem = origem[:, :, 1]
+    passo = max(1, round(origem.shape[1] / COLUNAS_AMOSTRA))
+    # Cópia: o buffer do mss é reaproveitado na próxima captura
+    return origem[::passo, ::passo].copy()
+
+
+def mudanca_visivel(
+    anterior: np.ndarray,
+    atual: np.ndarray,
+    limiar: int = LIMIAR_PIXEL,
+    largura: int = LARGURA_CURSOR,
+    altura: int = ALTURA_CURSOR
+) -> bool:
+    """
+    Compara duas amostras ponto a ponto: a tela mudou se os pontos que
+    variaram mais de `limiar` não cabem num retângulo largura x altura
+    (em pontos). Um cursor piscando fica de fora; poucos caracteres
+    digitados (o texto novo mais o cursor que andou) já passam da largura.
+    """
+    if anterior.shape != atual.shape:
+        return True
+    diferentes = np.abs(np.subtract(anterior, atual, dtype=np.int16)) > limiar
+    colunas = np.flatnonzero(diferentes.any(axis=0))
+    if not colunas.size:
+        return False
+    linhas = np.flatnonzero(diferentes.any(axis=1))
+    return colunas[-1] - colunas[0] > largura or linhas[-1] - linhas[0] > altura
+
+
+class DetectorMudancas:
+    """
+    Detector de mudança de tela usado pela sonda de atividade e pela
+    captura com movimento: guarda a última amostra de cada chave (ex.: um
+    monitor) e a compara com a nova (ver mudanca_visivel). A captura lê o
+    buffer do mss direto em numpy, sem passar por uma imagem PIL.
+    """
+
+    def __init__(self, limiar: int = LIMIAR_PIXEL):
+        self.limiar = limiar
+        self._amostras = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # o mss precisa ser usado na thread que o criou
+
+    def _sct(self):
+        if getattr(self._local, "sct", None) is None:
+            self._local.sct = mss.mss()
+        return self._local.sct
+
+    def capturar(self, monitor: int = 1) -> np.ndarray:
+        """Captura o monitor (1 = primário) como visão numpy BGRA altura x largura x 4."""
+        sct = self._sct()
+        monitores = sct.monitors
+        captura = sct.grab(monitores[monitor] if monitor < len(monitores) else monitores[-1])
+        largura, altura = captura.size
+        return np.frombuffer(captura.raw, dtype=np.uint8).reshape(altura, largura, 4)
+
+    def mudou(self, chave, origem) -> bool:
+        """Compara `origem` com a última vista para a chave; a primeira vez conta como mudança."""
+        atual = amostra(origem)
+        with self._lock:
+            anterior = self._amostras.get(chave)
+            self._amostras[chave] = atual
+        return anterior is None or mudanca_visivel(anterior, atual, self.limiar)
+
+    def tela_mudou(self, monitor: int = 1) -> bool:
+        return self.mudou(("monitor", monitor), self.capturar(monitor))
+
+
+detector_mudancas = DetectorMudancas()
@@ -0,0 +1,94 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import queue
+import threading
+import numpy as np
+from PIL import Image
+from utils.logger import write_monitor_log as log
+
+TAMANHO_FILA_GRAVACAO = 8  # quadros aguardando gravação em PNG
+
+
+class Quadro:
+    """
+    Captura de um monitor mantida em memória: o buffer BGRA devolvido pelo
+    mss, sem cópia. `array` é uma visão numpy (altura x largura x 4) desse
+    buffer e `imagem()` converte para PIL RGB uma única vez. O quadro só
+    vai para o disco se for escolhido para retenção (ver GravadorPNG);
+    `caminho` fica None até lá.
+    """
+
+    __slots__ = ("monitor", "timestamp", "largura", "altura", "_bruto", "_imagem", "caminho")
+
+    def __init__(self, monitor: int, timestamp: str, captura):
+        self.monitor = monitor
+        self.timestamp = timestamp
+        self.largura, self.altura = captura.size
+        self._bruto = captura.raw  # bytearray BGRA do mss
+        self._imagem = None
+        self.caminho = None
+
+    @property
+    def tamanho(self) -> tuple[int, int]:
+        return self.largura, self.altura
+
+    @property
+    def array(self) -> np.ndarray:
+        return np.frombuffer(self._bruto, dtype=np.uint8).reshape(self.altura, self.largura, 4)
+
+    def imagem(self) -> Image.Image:
+        if self._imagem is None:
+            # Decodifica BGRX direto do buffer (sem passar por .rgb do mss)
+            self._imagem = Image.frombuffer("RGB", self.tamanho, self._bruto, "raw", "BGRX", 0, 1)
+        return self._imagem
+
+    def nome_arquivo(self) -> str:
+        return f"screenshot_monitor{self.monitor}_{self.timestamp}.png"
+
+
+class GravadorPNG:
+    """
+    Thread que grava em PNG os quadros retidos, fora da thread de captura.
+    `gravar` define o caminho do quadro e retorna na hora; `aguardar`
+    bloqueia até a fila esvaziar (ex.: antes de entregar o arquivo a
+    alguém).
+    """
+
+    def __init__(self):
+        self._fila = queue.Queue(maxsize=TAMANHO_FILA_GRAVACAO)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _garantir_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._laco, name="gravador-png", daemon=True)
+                    self._thread.start()
+
+    def gravar(self, quadro: Quadro, diretorio: str) -> str:
+        quadro.caminho = os.path.join(diretorio, quadro.nome_arquivo())
+        self._garantir_thread()
+        self._fila.put(quadro)
+        return quadro.caminho
+
+    def aguardar(self):
+        if self._thread is not None:
+            self._fila.join()
+
+    def _laco(self):
+        while True:
+            quadro = self._fila.get()
+            try:
+                os.makedirs(os.path.dirname(quadro.caminho), exist_ok=True)
+                tmp = quadro.caminho + ".tmp"
+                quadro.imagem().save(tmp, format="PNG")
+                os.replace(tmp, quadro.caminho)
+            except Exception as e:
+                log(f"Falha ao gravar o screenshot {quadro.caminho}: {e}")
+            finally:
+                self._fila.task_done()
+
+
+gravador_png = GravadorPNG()
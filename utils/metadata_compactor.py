@@ -5,11 +5,13 @@ import json
 from datetime import datetime
 from collections import Counter
 import hashlib
-import faiss
 from langchain_community.vectorstores import FAISS
 import numpy as np
 from models.embedding import embed_text
-from core.storage import FAISS_INDEX_PATH, METADATA_PATH, LOG_DIR, BASE_DIR, TEMP_DIR
+from models.embedding_worker import PRIORIDADE_INGESTAO
+from core.storage import MANIFEST_PATH, LOG_DIR, BASE_DIR, TEMP_DIR
+from core.memory_service import get_memory_service
+from core.memory_filters import texto_para_embedding
 from utils.logger import write_monitor_log as log
 # Caminhos das memórias
 
@@ -36,40 +38,73 @@ def salvar_json(path, data):
 
 # === Inicializa FAISS e Metadata vazios se não existirem ===
 def init_faiss_if_missing():
-    if not os.path.exists(FAISS_INDEX_PATH):
-        log("Inicializando FAISS vazio")
-        index = faiss.IndexFlatL2(384)
-        faiss.write_index(index, FAISS_INDEX_PATH)
-    if not os.path.exists(METADATA_PATH):
-        log("Inicializando metadata vazio")
-        salvar_json(METADATA_PATH, [])
-
+    if not os.path.exists(MANIFEST_PATH):
+        log("Inicializando FAISS e metadata vazios")
+        get_memory_service().salvar()
+
+
+
+# Similaridade de cosseno a partir da qual um registro novo é considerado
+# repetição do anterior (mesma janela) e é fundido a ele em vez de indexado
+LIMIAR_DUPLICATA = float(os.getenv("NEXUS_DEDUP_THRESHOLD", "0.95"))
+
+
+# === Deduplicação na ingestão ===
+def fundir_com_anterior(memoria, embedding, record) -> dict | None:
+    """
+    Compara o registro novo com o último registro de curto prazo. Se for da
+    mesma janela e do mesmo projeto e o cosseno entre os embeddings passar de LIMIAR_DUPLICATA,
+    estende o anterior (timestamp_fim, repeticoes, tags, screenshot) e
+    retorna o registro fundido; caso contrário retorna None.
+    """
+    anterior_id = memoria.ultimo_id("curto")
+    if anterior_id is None:
+        return None
+    anterior = memoria.registro(anterior_id)
+    if not anterior or anterior.get("active_window") != record.get("active_window"):
+        return None
+    if anterior.get("projeto", "") != record.get("projeto", ""):
+        return None
+    vetor = memoria.vetor(anterior_id)
+    if vetor is None:
+        return None
+    normas = float(np.linalg.norm(vetor) * np.linalg.norm(embedding))
+    if normas == 0 or float(np.dot(vetor, embedding)) / normas < LIMIAR_DUPLICATA:
+        return None
+
+    anterior["timestamp_fim"] = record["timestamp"]
+    anterior["repeticoes"] = anterior.get("repeticoes", 1) + 1
+    anterior["tags"] = sorted(set(anterior.get("tags", [])) | set(record.get("tags", [])))
+    if record.get("screenshot"):
+        anterior["screenshot"] = record["screenshot"]
+    memoria.atualizar(anterior_id, anterior)
+    return anterior
 
 
 # === Memória de Curto Prazo ===
 def salvar_em_buffer(record):
+    # Também indexa no FAISS para que o modelo tenha contexto imediato
+    # texto_base = f"{record['active_window']} {record['extracted_text']}"
+    embedding = embed_text([texto_para_embedding(record)], PRIORIDADE_INGESTAO)[0]
+    memoria = get_memory_service()
+
     buffer = carregar_json(RAW_BUFFER_PATH)
+    fundido = fundir_com_anterior(memoria, embedding, record)
+    if fundido is not None:
+        # Repetição do contexto anterior: só estende o registro existente
+        if buffer and buffer[-1].get("timestamp") == fundido.get("timestamp"):
+            buffer[-1] = fundido
+            salvar_json(RAW_BUFFER_PATH, buffer)
+        log(f"Registro repetido fundido ao anterior ({fundido['repeticoes']} ocorrências).")
+        return
+
     buffer.append(record)
     if len(buffer) > 20:
         buffer = buffer[-20:]
     salvar_json(RAW_BUFFER_PATH, buffer)
 
-    # Também indexa no FAISS para que o modelo tenha contexto imediato
-    # texto_base = f"{record['active_window']} {record['extracted_text']}"
-    texto_base = f"{record['active_window']} {record.get('context_summary', '')}"
-    embedding = embed_text([texto_base])[0]
-
-    if os.path.exists(FAISS_INDEX_PATH):
-        index = faiss.read_index(FAISS_INDEX_PATH)
-    else:
-        index = faiss.IndexFlatL2(384)
-    index.add(np.array([embedding], dtype=np.float32))
-    faiss.write_index(index, FAISS_INDEX_PATH)
-
-    # Salva no metadata (temporário) como "curto_prazo"
-    metadata = carregar_json(METADATA_PATH)
-    metadata.append(record)
-    salvar_json(METADATA_PATH, metadata)
+    # Salva no índice e no metadata (temporário) como "curto_prazo"
+    memoria.adicionar(embedding, record)
 
 # === Compactar bloco de 20 para memória de médio prazo ===
 def compactar_bloco_de_20():
@@ -79,11 +114,12 @@ def compactar_bloco_de_20():
 
     bloco = buffer[:20]
     t0 = datetime.fromisoformat(bloco[0]["timestamp"])
-    tN = datetime.fromisoformat(bloco[-1]["timestamp"])
+    tN = datetime.fromisoformat(bloco[-1].get("timestamp_fim", bloco[-1]["timestamp"]))
 
     janelas = [r["active_window"] for r in bloco]
     tags = sum((r.get("tags", []) for r in bloco), [])
     janela_mais_comum = Counter(janelas).most_common(1)[0][0]
+    projeto_mais_comum = Counter(r.get("projeto", "") for r in bloco).most_common(1)[0][0]
     principais_tags = [t for t, _ in Counter(tags).most_common(5)]
     blocos_horarios = [
         f"{bloco[i]['timestamp'][11:16]}-{bloco[i+4]['timestamp'][11:16]}: {bloco[i]['active_window']}"
@@ -98,9 +134,10 @@ def compactar_bloco_de_20():
         "resumo_compilado": True,
         "periodo": f"{t0.strftime('%H:%M')} às {tN.strftime('%H:%M')}",
         "janela_mais_frequente": janela_mais_comum,
+        "projeto": projeto_mais_comum,
         "principais_tags": principais_tags,
         "context_summary": "Atividades principais:\n" + "\n".join(blocos_horarios),
-        "quantidade_registros": 20
+        "quantidade_registros": sum(r.get("repeticoes", 1) for r in bloco)
     }
 
     # Salvar em memória de médio prazo
@@ -112,24 +149,10 @@ def compactar_bloco_de_20():
     salvar_json(COMPILED_BLOCKS_PATH, blocos)
 
     # Salvar no FAISS (sincronizado com metadata)
-    embedding = embed_text([resumo["context_summary"]])[0]
-    index = faiss.IndexFlatL2(384)
-    if os.path.exists(FAISS_INDEX_PATH):
-        index = faiss.read_index(FAISS_INDEX_PATH)
-    index.add(np.array([embedding], dtype=np.float32))
-    faiss.write_index(index, FAISS_INDEX_PATH)
-
-    metadata = carregar_json(METADATA_PATH)
-    metadata.append(resumo)
-    if len(metadata) > len(blocos):  # sincroniza com blocos válidos
-        metadata = metadata[-len(blocos):]
-        index = faiss.IndexFlatL2(384)
-    for b in metadata:
-        if "context_summary" in b:
-            vec = embed_text([b["context_summary"]])[0]
-            index.add(np.array([vec], dtype=np.float32))
-        faiss.write_index(index, FAISS_INDEX_PATH)
-    salvar_json(METADATA_PATH, metadata)
+    embedding = embed_text([texto_para_embedding(resumo)], PRIORIDADE_INGESTAO)[0]
+    memoria = get_memory_service()
+    memoria.adicionar(embedding, resumo)
+    # A retenção dos registros curtos fica a cargo do vacuum (core.vacuum)
 
     # Atualiza buffer mantendo os últimos 10 registros
     salvar_json(RAW_BUFFER_PATH, buffer[-10:])
@@ -144,20 +167,34 @@ def consolidar_blocos_medios():
     while len(blocos) >= 36:
         blocos_para_consolidar = blocos[:36]
 
+        janelas = Counter(b.get("janela_mais_frequente", "") for b in blocos_para_consolidar)
+        projeto = Counter(b.get("projeto", "") for b in blocos_para_consolidar).most_common(1)[0][0]
         superbloco = {
             "nivel": "longo",
             "timestamp_gerado": datetime.now().isoformat(),
+            "timestamp_inicio": blocos_para_consolidar[0]["timestamp_inicio"],
+            "timestamp_fim": blocos_para_consolidar[-1]["timestamp_fim"],
             "blocos_compilados": 36,
+            "projeto": projeto,
             "periodo": f"{blocos_para_consolidar[0]['timestamp_inicio'][11:16]} às {blocos_para_consolidar[-1]['timestamp_fim'][11:16]}",
             "resumos": [b["context_summary"] for b in blocos_para_consolidar],
             "tags": list(set(t for b in blocos_para_consolidar for t in b["principais_tags"]))
         }
+        superbloco["context_summary"] = (
+            f"Período {superbloco['periodo']}. Janelas mais frequentes: "
+            + ", ".join(j for j, _ in janelas.most_common(5) if j)
+            + (f". Tags: {', '.join(superbloco['tags'])}" if superbloco["tags"] else "")
+        )
 
         # Salva no JSON de longo prazo
         long_term = carregar_json(LONG_TERM_PATH)
         long_term.append(superbloco)
         salvar_json(LONG_TERM_PATH, long_term)
 
+        # Indexa o superbloco na camada de longo prazo
+        embedding = embed_text([texto_para_embedding(superbloco)], PRIORIDADE_INGESTAO)[0]
+        get_memory_service().adicionar(embedding, superbloco)
+
         # Remove os 20 blocos mais antigos
         blocos = blocos[20:]
         salvar_json(COMPILED_BLOCKS_PATH, blocos)
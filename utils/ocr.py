@@ -3,12 +3,17 @@ import os
 import sys
 import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from PIL import ImageGrab, ImageChops, ImageStat, Image
+from PIL import Image
 from pynput.mouse import Controller
 import pytesseract
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from core.storage import SCREENSHOT_DIR
 from utils.logger import write_monitor_log as log
+from utils.frames import Quadro, gravador_png
+from utils.ocr_tiles import ocr_por_tiles
+from utils.ocr_engine import pool_ocr, WORKERS_OCR
+from utils.change_detector import LIMIAR_PIXEL, amostra, mudanca_visivel
 from dotenv import load_dotenv
 import re
 import mss
@@ -21,6 +26,8 @@ tesseract_path = os.getenv("TESSERACT_PATH")
 if tesseract_path:
     pytesseract.pytesseract.tesseract_cmd = tesseract_path
 
+# Um monitor por thread; as regiões de cada quadro vão para o pool de OCR
+_executor_monitores = ThreadPoolExecutor(max_workers=WORKERS_OCR, thread_name_prefix="ocr-monitor")
 
 
 def maintain_latest_screenshots(directory: str, max_files: int = 20):
@@ -87,14 +94,18 @@ def filtro_linguistico(ocr_text):
     # 4. Junta as linhas filtradas e limita o tamanho total
     return "\n".join(filtered_lines)[:1500]
 
-def extract_text_from_image(image_path):
-    # Garante que SCREENSHOT_DIR existe
-    if not os.path.exists(SCREENSHOT_DIR):
-        os.makedirs(SCREENSHOT_DIR)
-        
+def _como_imagem(origem) -> Image.Image:
+    """Aceita uma imagem PIL ou o caminho de um arquivo."""
+    return origem if isinstance(origem, Image.Image) else Image.open(origem)
+
+def extract_text_from_image(origem):
     try:
-        img = Image.open(image_path)
-        raw_text = pytesseract.image_to_string(img, lang="por+eng+spa")
+        if isinstance(origem, Quadro):
+            # Quadros capturados: só os tiles que mudaram desde a última captura do monitor vão para o OCR
+            raw_text = ocr_por_tiles.texto(origem)
+        else:
+            # Pré-processamento (preset NEXUS_OCR_PRESET) e OCR no pool
+            raw_text = pool_ocr.texto(_como_imagem(origem))
         clean_text = raw_text.strip()
         clean_text = re.sub(r'\s+', ' ', clean_text)
         clean_text = re.sub(r'[^\x00-\x7F]+', ' ', clean_text)
@@ -106,25 +117,71 @@ def extract_text_from_image(image_path):
         log(f"Erro no OCR: {e}")
         return ""
 
+def extract_text_from_images(origens) -> list[str]:
+    """
+    OCR de vários quadros/imagens, com os monitores processados em paralelo.
+    Quadros do mesmo monitor seguem em ordem (o cache de tiles depende da
+    sequência). Retorna os textos na ordem de `origens`.
+    """
+    origens = list(origens)
+    grupos = {}
+    for i, origem in enumerate(origens):
+        chave = ("monitor", origem.monitor) if isinstance(origem, Quadro) else ("imagem", i)
+        grupos.setdefault(chave, []).append(i)
+    if len(grupos) <= 1:
+        return [extract_text_from_image(origem) for origem in origens]
+
+    def processar(indices):
+        return [(i, extract_text_from_image(origens[i])) for i in indices]
 
-def movimento_detectado(img1, img2, threshold=10):
-    diff = ImageChops.difference(img1, img2)
-    stat = ImageStat.Stat(diff)
-    rms = sum([v ** 2 for v in stat.mean]) ** 0.5
-    return rms > threshold
+    textos = [""] * len(origens)
+    for futuro in [_executor_monitores.submit(processar, indices) for indices in grupos.values()]:
+        for i, texto in futuro.result():
+            textos[i] = texto
+    return textos
+
+
+def movimento_detectado(img1, img2, threshold=LIMIAR_PIXEL):
+    """
+    Compara dois quadros (Quadro, array ou imagem PIL) por amostragem: True se
+    pontos com diferença de luminância acima de `threshold` ocupam mais que um cursor.
+    """
+    return mudanca_visivel(amostra(img1), amostra(img2), threshold)
 
 
 
+def capturar_quadros() -> list[Quadro]:
+    """Captura cada monitor para a memória (nada é gravado em disco)."""
+    with mss.mss() as sct:
+        # CORREÇÃO: Lógica para selecionar o(s) monitor(es) correto(s)
+        monitors = sct.monitors[1:]  # Começa com o padrão de monitores secundários
+        # Se a lista acima estiver vazia (cenário de monitor único), usa o monitor primário
+        if not monitors:
+            monitors = [sct.monitors[1]] # Usa apenas o primário em uma lista
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # O loop agora funciona para múltiplos ou um único monitor
+        return [Quadro(idx + 1, timestamp, sct.grab(monitor)) for idx, monitor in enumerate(monitors)]
+
+
+def reter_quadro(quadro: Quadro, output_dir=SCREENSHOT_DIR) -> str:
+    """Agenda a gravação do quadro em PNG (em segundo plano) e retorna o caminho."""
+    return gravador_png.gravar(quadro, output_dir)
+
+
 def capture_full_screenshot_with_motion(
-    output_dir,
+    output_dir=SCREENSHOT_DIR,
     ultima_imgs=None,
     ultima_pos=None,
     last_capture_time=0,
     interval=5,
-    threshold=10
+    threshold=LIMIAR_PIXEL
 ):
-    os.makedirs(output_dir, exist_ok=True)
-    screenshots = []
+    """
+    Captura os monitores em memória e retorna (quadros com movimento, caminho
+    do quadro retido). Os quadros seguem direto para o OCR; só o último com
+    movimento, que o registro referencia, é gravado em PNG, fora desta thread.
+    """
     now = time.time()
     if now - last_capture_time < interval:
         return [], None
@@ -134,32 +191,11 @@ def capture_full_screenshot_with_motion(
 
     movimento_mouse = (ultima_pos is None) or (current_pos != ultima_pos)
 
-    with mss.mss() as sct:
-        # CORREÇÃO: Lógica para selecionar o(s) monitor(es) correto(s)
-        monitors = sct.monitors[1:]  # Começa com o padrão de monitores secundários
-        # Se a lista acima estiver vazia (cenário de monitor único), usa o monitor primário
-        if not monitors:
-            monitors = [sct.monitors[1]] # Usa apenas o primário em uma lista
+    quadros = []
+    for idx, quadro in enumerate(capturar_quadros()):
+        movimento_tela = True if not ultima_imgs or idx >= len(ultima_imgs) else movimento_detectado(ultima_imgs[idx], quadro, threshold)
+        if movimento_tela or movimento_mouse:
+            quadros.append(quadro)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        imgs_pil = []
-        
-        # O loop agora funciona para múltiplos ou um único monitor
-        for idx, monitor in enumerate(monitors):
-            filename = f"screenshot_monitor{idx+1}_{timestamp}.png"
-            path = os.path.join(output_dir, filename)
-            img_mss = sct.grab(monitor)
-            mss.tools.to_png(img_mss.rgb, img_mss.size, output=path)
-            img_pil = Image.frombytes("RGB", img_mss.size, img_mss.rgb)
-            imgs_pil.append(img_pil)
-
-            movimento_tela = True if not ultima_imgs or idx >= len(ultima_imgs) else movimento_detectado(ultima_imgs[idx], img_pil, threshold)
-
-            if movimento_tela or movimento_mouse:
-                screenshots.append(path)
-            else:
-                if os.path.exists(path):
-                    os.remove(path)
-
-    last_valid_path = screenshots[-1] if screenshots else None
-    return screenshots, last_valid_path
\ No newline at end of file
+    last_valid_path = reter_quadro(quadros[-1], output_dir) if quadros else None
+    return quadros, last_valid_path
\ No newline at end of file
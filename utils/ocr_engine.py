@@ -0,0 +1,267 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils.ocr_preprocess import ajustar_palavras, montar_texto, opcoes_do_preset, preparar
+from utils.logger import write_monitor_log as log
+
+IDIOMAS_OCR = "por+eng+spa"
+# Motor de OCR: "tesserocr" (API do Tesseract no processo, traineddata
+# carregado uma vez por worker), "pytesseract" (um processo tesseract por
+# imagem) ou "auto" (tesserocr se estiver instalado)
+MOTOR_OCR = os.getenv("NEXUS_OCR_ENGINE", "auto").lower()
+WORKERS_OCR = int(os.getenv("NEXUS_OCR_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+JANELA_METRICAS = 500  # últimas chamadas consideradas nas métricas de latência
+INTERVALO_RELATORIO = 200  # chamadas entre dois registros das métricas no log
+
+_local = threading.local()  # marca as threads do pool (chamadas aninhadas não vão para a fila)
+
+
+def caminho_tessdata() -> str | None:
+    """Pasta do traineddata: TESSDATA_PREFIX ou a pasta `tessdata` ao lado do TESSERACT_PATH."""
+    if os.getenv("TESSDATA_PREFIX"):
+        return os.getenv("TESSDATA_PREFIX")
+    executavel = os.getenv("TESSERACT_PATH")
+    if executavel:
+        pasta = os.path.join(os.path.dirname(executavel), "tessdata")
+        if os.path.isdir(pasta):
+            return pasta
+    return None
+
+
+def _dpi(imagem) -> int | None:
+    """DPI definido pelo pré-processamento (ver utils.ocr_preprocess.preparar)."""
+    dpi = imagem.info.get("dpi")
+    return int(dpi[0]) if dpi else None
+
+
+class MotorPytesseract:
+    """Tesseract via pytesseract: cada chamada inicia um processo e recarrega os idiomas."""
+
+    nome = "pytesseract"
+
+    def __init__(self, idiomas: str = IDIOMAS_OCR):
+        import pytesseract
+        if os.getenv("TESSERACT_PATH"):
+            pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_PATH")
+        self._pytesseract = pytesseract
+        self.idiomas = idiomas
+
+    def _config(self, imagem) -> str:
+        dpi = _dpi(imagem)
+        return f"--dpi {dpi}" if dpi else ""
+
+    def texto(self, imagem) -> str:
+        return self._pytesseract.image_to_string(imagem, lang=self.idiomas, config=self._config(imagem))
+
+    def palavras(self, imagem) -> list[tuple[int, int, int, int, str, float]]:
+        dados = self._pytesseract.image_to_data(
+            imagem, lang=self.idiomas, config=self._config(imagem), output_type=self._pytesseract.Output.DICT
+        )
+        return [
+            (dados["left"][i], dados["top"][i], dados["width"][i], dados["height"][i], texto.strip(),
+             float(dados["conf"][i]))
+            for i, texto in enumerate(dados["text"])
+            if texto and texto.strip()
+        ]
+
+
+class MotorTesserocr:
+    """
+    Tesseract pela API C++ (tesserocr), sem subprocessos: cada worker
+    mantém uma instância de PyTessBaseAPI com os idiomas já carregados. As
+    instâncias ficam numa fila e são criadas sob demanda, até WORKERS_OCR;
+    o reconhecimento libera o GIL, então threads rodam em paralelo.
+    """
+
+    nome = "tesserocr"
+
+    def __init__(self, idiomas: str = IDIOMAS_OCR, workers: int = WORKERS_OCR):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.idiomas = idiomas
+        self._livres = queue.Queue()
+        self._criadas = 0
+        self._maximo = max(1, workers)
+        self._lock = threading.Lock()
+        self._livres.put(self._criar())  # falha aqui (sem traineddata) volta para o pytesseract
+
+    def _criar(self):
+        caminho = caminho_tessdata()
+        api = (
+            self._tesserocr.PyTessBaseAPI(path=caminho, lang=self.idiomas)
+            if caminho else self._tesserocr.PyTessBaseAPI(lang=self.idiomas)
+        )
+        self._criadas += 1
+        return api
+
+    def _obter_api(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._criadas < self._maximo:
+                    return self._criar()
+            return self._livres.get()
+
+    def _definir_imagem(self, api, imagem):
+        api.SetImage(imagem)
+        dpi = _dpi(imagem)
+        if dpi:
+            api.SetSourceResolution(dpi)
+
+    def texto(self, imagem) -> str:
+        api = self._obter_api()
+        try:
+            self._definir_imagem(api, imagem)
+            return api.GetUTF8Text()
+        finally:
+            self._livres.put(api)
+
+    def palavras(self, imagem) -> list[tuple[int, int, int, int, str, float]]:
+        RIL = self._tesserocr.RIL
+        api = self._obter_api()
+        try:
+            self._definir_imagem(api, imagem)
+            api.Recognize()
+            resultado = []
+            for palavra in self._tesserocr.iterate_level(api.GetIterator(), RIL.WORD):
+                texto = (palavra.GetUTF8Text(RIL.WORD) or "").strip()
+                caixa = palavra.BoundingBox(RIL.WORD)
+                if texto and caixa:
+                    x1, y1, x2, y2 = caixa
+                    resultado.append((x1, y1, x2 - x1, y2 - y1, texto, palavra.Confidence(RIL.WORD)))
+            return resultado
+        finally:
+            self._livres.put(api)
+
+
+def criar_motor(nome: str = MOTOR_OCR):
+    """Instancia o motor pedido; sem tesserocr (ou sem traineddata), usa o pytesseract."""
+    if nome in ("auto", "tesserocr"):
+        try:
+            return MotorTesserocr()
+        except Exception as e:
+            if nome == "tesserocr":
+                log(f"Motor de OCR tesserocr indisponível ({e}). Usando pytesseract.")
+    elif nome != "pytesseract":
+        log(f"Motor de OCR desconhecido '{nome}'. Usando pytesseract.")
+    return MotorPytesseract()
+
+
+class PoolOCR:
+    """
+    Executa o OCR de várias imagens (monitores, regiões) em paralelo num
+    pool de WORKERS_OCR threads sobre o motor configurado, medindo a
+    espera na fila e a duração de cada chamada. Cada imagem passa pelo
+    pré-processamento do preset (utils.ocr_preprocess) na própria thread do
+    pool; as palavras voltam nas coordenadas da imagem original.
+    """
+
+    def __init__(self, motor=None, workers: int = WORKERS_OCR, preset=None):
+        self._motor = motor
+        self.workers = max(1, workers)
+        self.opcoes = opcoes_do_preset(preset)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._espera = deque(maxlen=JANELA_METRICAS)
+        self._duracao = deque(maxlen=JANELA_METRICAS)
+        self.chamadas = 0
+
+    @property
+    def motor(self):
+        if self._motor is None:
+            with self._lock:
+                if self._motor is None:
+                    self._motor = criar_motor()
+                    log(f"OCR: motor {self._motor.nome} com {self.workers} worker(s).")
+        return self._motor
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+        return self._executor
+
+    def _medir(self, funcao, imagem, enviado: float):
+        inicio = time.perf_counter()
+        _local.no_pool = True
+        try:
+            return funcao(imagem)
+        finally:
+            _local.no_pool = False
+            fim = time.perf_counter()
+            self._registrar(inicio - enviado, fim - inicio)
+
+    def _registrar(self, espera: float, duracao: float):
+        with self._lock:
+            self._espera.append(espera)
+            self._duracao.append(duracao)
+            self.chamadas += 1
+            relatar = self.chamadas % INTERVALO_RELATORIO == 0
+        if relatar:
+            m = self.metricas()
+            log(
+                f"OCR ({m['motor']}): {m['chamadas']} chamadas, duração média {m['duracao_media_ms']:.0f} ms "
+                f"(p95 {m['duracao_p95_ms']:.0f} ms), espera p95 {m['espera_p95_ms']:.0f} ms."
+            )
+
+    def _executar(self, operacao: str, opcoes: dict, imagem):
+        imagem, fator = preparar(imagem, opcoes)
+        if operacao == "texto" and not opcoes["confianca_minima"]:
+            return self.motor.texto(imagem)
+        # O filtro de confiança precisa das palavras (saída TSV do Tesseract)
+        palavras = ajustar_palavras(self.motor.palavras(imagem), fator, opcoes["confianca_minima"])
+        return montar_texto(palavras) if operacao == "texto" else palavras
+
+    def mapear(self, operacao: str, imagens: list, preset=None) -> list:
+        """
+        Aplica a operação ("texto" ou "palavras") a cada imagem, em paralelo,
+        na ordem dada. `preset` substitui o preset do pool (ex.: benchmark).
+        """
+        opcoes = self.opcoes if preset is None else opcoes_do_preset(preset)
+        self.motor  # cria o motor (e registra no log) antes de distribuir as imagens
+
+        def funcao(imagem):
+            return self._executar(operacao, opcoes, imagem)
+
+        if len(imagens) == 1 or getattr(_local, "no_pool", False):
+            # Uma imagem só (ou chamada de dentro do pool): executa direto, sem fila
+            return [self._medir(funcao, imagem, time.perf_counter()) for imagem in imagens]
+        enviado = time.perf_counter()
+        futuros = [self._pool().submit(self._medir, funcao, imagem, enviado) for imagem in imagens]
+        return [f.result() for f in futuros]
+
+    def texto(self, imagem, preset=None) -> str:
+        return self.mapear("texto", [imagem], preset)[0]
+
+    def palavras(self, imagem, preset=None) -> list:
+        return self.mapear("palavras", [imagem], preset)[0]
+
+    def metricas(self) -> dict:
+        """Latência das últimas chamadas (ms): média, p50, p95 e máximo da duração; p95 da espera."""
+        with self._lock:
+            duracao = np.array(self._duracao) * 1000
+            espera = np.array(self._espera) * 1000
+            chamadas = self.chamadas
+        if not duracao.size:
+            duracao = espera = np.zeros(1)
+        return {
+            "motor": self._motor.nome if self._motor is not None else None,
+            "workers": self.workers,
+            "chamadas": chamadas,
+            "duracao_media_ms": float(duracao.mean()),
+            "duracao_p50_ms": float(np.percentile(duracao, 50)),
+            "duracao_p95_ms": float(np.percentile(duracao, 95)),
+            "duracao_max_ms": float(duracao.max()),
+            "espera_p95_ms": float(np.percentile(espera, 95)),
+        }
+
+
+pool_ocr = PoolOCR()
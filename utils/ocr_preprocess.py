@@ -0,0 +1,120 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import numpy as np
+from PIL import Image, ImageOps
+from utils.logger import write_monitor_log as log
+
+# Preset de pré-processamento aplicado antes do Tesseract (ver PRESETS_OCR).
+# O padrão "original" mantém o OCR de antes; os outros são opt-in até o
+# benchmark (local/tools/benchmark_ocr.py) mostrar ganho nas telas reais.
+PRESET_OCR = os.getenv("NEXUS_OCR_PRESET", "original").lower()
+DPI_TELA = int(os.getenv("NEXUS_OCR_DPI", "96"))  # DPI do monitor (96 = escala de 100% no Windows)
+LUMINANCIA_TEMA_ESCURO = 110  # média de cinza abaixo da qual a imagem é tratada como tema escuro
+BLOCO_LIMIAR = 31  # lado (pixels) da vizinhança do limiar adaptativo
+CONSTANTE_LIMIAR = 10  # quanto abaixo da média local um pixel precisa estar para virar texto
+
+OPCOES_PADRAO = {
+    "cinza": False,  # converte para escala de cinza (1 canal em vez de 3)
+    "inverter": False,  # True, False ou "auto" (inverte só temas escuros)
+    "escala": 1.0,  # fator de redimensionamento
+    "largura_maxima": None,  # limita a largura após a escala (normaliza telas grandes)
+    "limiar": None,  # None ou "adaptativo" (binarização pela média local)
+    "dpi": None,  # DPI da tela informado ao Tesseract (corrigido pela escala)
+    "confianca_minima": 0,  # descarta palavras com confiança menor (0-100)
+}
+
+PRESETS_OCR = {
+    # Imagem nativa em RGB, sem pré-processamento nem filtro de confiança (padrão)
+    "original": {},
+    # Cinza, tema escuro invertido (Tesseract espera texto escuro em fundo
+    # claro) e palavras de baixa confiança descartadas
+    "padrao": {"cinza": True, "inverter": "auto", "dpi": DPI_TELA, "confianca_minima": 30},
+    # Menos pixels: reduz a imagem e limita a largura; troca precisão por tempo
+    "rapido": {
+        "cinza": True, "inverter": "auto", "escala": 0.75, "largura_maxima": 1920,
+        "dpi": DPI_TELA, "confianca_minima": 30,
+    },
+    # Texto pequeno de IDE: amplia e binariza com limiar adaptativo
+    "preciso": {
+        "cinza": True, "inverter": "auto", "escala": 2.0, "limiar": "adaptativo",
+        "dpi": DPI_TELA, "confianca_minima": 40,
+    },
+}
+
+
+def opcoes_do_preset(preset=None) -> dict:
+    """Opções completas de um preset (nome ou dict); nome desconhecido usa o "original"."""
+    if isinstance(preset, dict):
+        return {**OPCOES_PADRAO, **preset}
+    nome = preset or PRESET_OCR
+    if nome not in PRESETS_OCR:
+        log(f"Preset de OCR desconhecido '{nome}'. Usando 'original'.")
+        nome = "original"
+    return {**OPCOES_PADRAO, **PRESETS_OCR[nome]}
+
+
+def tema_escuro(cinza: np.ndarray) -> bool:
+    return float(cinza.mean()) < LUMINANCIA_TEMA_ESCURO
+
+
+def limiar_adaptativo(cinza: np.ndarray, bloco: int = BLOCO_LIMIAR, constante: int = CONSTANTE_LIMIAR) -> np.ndarray:
+    """
+    Binariza pela média da vizinhança bloco x bloco de cada pixel (como o
+    ADAPTIVE_THRESH_MEAN_C do OpenCV), calculada com uma imagem integral:
+    fundos com gradiente ou painéis de cores diferentes não viram texto.
+    """
+    a = cinza.astype(np.int64)
+    r = bloco // 2
+    integral = np.pad(a, ((r + 1, r), (r + 1, r)), mode="edge").cumsum(0).cumsum(1)
+    soma = integral[bloco:, bloco:] - integral[:-bloco, bloco:] - integral[bloco:, :-bloco] + integral[:-bloco, :-bloco]
+    media = soma / (bloco * bloco)
+    return np.where(a > media - constante, 255, 0).astype(np.uint8)
+
+
+def preparar(imagem: Image.Image, opcoes: dict) -> tuple[Image.Image, float]:
+    """
+    Aplica o pré-processamento à imagem e retorna (imagem, fator de escala).
+    As coordenadas das palavras reconhecidas na imagem nova são divididas
+    pelo fator para voltar ao quadro original (ver ajustar_palavras).
+    """
+    largura, altura = imagem.size
+    fator = opcoes["escala"]
+    if opcoes["largura_maxima"] and largura * fator > opcoes["largura_maxima"]:
+        fator = opcoes["largura_maxima"] / largura
+    if opcoes["cinza"] or opcoes["inverter"] or opcoes["limiar"]:
+        imagem = imagem.convert("L")
+    if fator != 1.0:
+        tamanho = (max(1, round(largura * fator)), max(1, round(altura * fator)))
+        imagem = imagem.resize(tamanho, Image.BILINEAR if fator < 1 else Image.BICUBIC)
+    if opcoes["inverter"] is True or (opcoes["inverter"] == "auto" and tema_escuro(np.asarray(imagem))):
+        imagem = ImageOps.invert(imagem)
+    if opcoes["limiar"] == "adaptativo":
+        imagem = Image.fromarray(limiar_adaptativo(np.asarray(imagem)))
+    if opcoes["dpi"]:
+        dpi = max(1, round(opcoes["dpi"] * fator))
+        imagem.info["dpi"] = (dpi, dpi)
+    # O pytesseract grava o temporário no formato de `format`; BMP evita a compressão PNG
+    imagem.format = "BMP"
+    return imagem, fator
+
+
+def ajustar_palavras(palavras, fator: float, confianca_minima: float = 0) -> list[tuple[int, int, int, int, str]]:
+    """Filtra (esquerda, topo, largura, altura, texto, confiança) pela confiança e desfaz a escala."""
+    return [
+        (round(esquerda / fator), round(topo / fator), round(largura / fator), round(altura / fator), texto)
+        for esquerda, topo, largura, altura, texto, confianca in palavras
+        if confianca >= confianca_minima
+    ]
+
+
+def montar_texto(palavras) -> str:
+    """Reagrupa palavras de várias regiões em linhas, de cima para baixo e da esquerda para a direita."""
+    linhas = []
+    for esquerda, topo, _, altura, texto in sorted(palavras, key=lambda p: (p[1], p[0])):
+        centro = topo + altura / 2
+        if linhas and abs(centro - linhas[-1][0]) <= max(altura, linhas[-1][1]) / 2:
+            linhas[-1][2].append((esquerda, texto))
+        else:
+            linhas.append([centro, altura, [(esquerda, texto)]])
+    return "\n".join(" ".join(t for _, t in sorted(palavras_linha)) for _, _, palavras_linha in linhas)
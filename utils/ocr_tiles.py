@@ -0,0 +1,243 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import threading
+import zlib
+import numpy as np
+from utils.ocr_engine import pool_ocr
+from utils.ocr_preprocess import montar_texto
+from utils.logger import write_monitor_log as log
+
+TAMANHO_TILE = int(os.getenv("NEXUS_OCR_TILE", "256"))  # pixels
+MARGEM_REGIAO = 1  # tiles acrescentados em volta de cada região suja (palavras que cruzam o tile)
+BORDA_RECORTE = 2  # pixels: palavra a essa distância de uma borda interna do recorte foi cortada
+LIMITE_TELA_CHEIA = 0.6  # fração de tiles sujos a partir da qual a tela inteira vai para o OCR
+INTERVALO_RELATORIO = 100  # capturas entre dois registros da economia de OCR no log
+
+
+def hashes_dos_tiles(array: np.ndarray, tamanho: int = TAMANHO_TILE) -> np.ndarray:
+    """
+    CRC32 de cada tile do quadro, numa grade linhas x colunas. O CRC detecta
+    com certeza mudanças pequenas e localizadas (o caso comum) e é bem mais
+    rápido que um hash criptográfico sobre os ~33 MB de um quadro 4K.
+    """
+    altura, largura = array.shape[:2]
+    linhas, colunas = -(-altura // tamanho), -(-largura // tamanho)
+    hashes = np.empty((linhas, colunas), dtype=np.uint32)
+    for r in range(linhas):
+        faixa = array[r * tamanho:(r + 1) * tamanho]
+        for c in range(colunas):
+            tile = np.ascontiguousarray(faixa[:, c * tamanho:(c + 1) * tamanho])
+            hashes[r, c] = zlib.crc32(tile)
+    return hashes
+
+
+def regioes_sujas(mascara: np.ndarray) -> list[tuple[int, int, int, int]]:
+    """
+    Agrupa os tiles sujos em regiões (componentes conectados, vizinhança 8)
+    e retorna o retângulo de tiles de cada uma: (linha0, coluna0, linha1, coluna1), fim exclusivo.
+    """
+    visitados = np.zeros_like(mascara, dtype=bool)
+    regioes = []
+    linhas, colunas = mascara.shape
+    for r0, c0 in zip(*np.nonzero(mascara)):
+        if visitados[r0, c0]:
+            continue
+        pilha = [(r0, c0)]
+        visitados[r0, c0] = True
+        rmin, cmin, rmax, cmax = r0, c0, r0, c0
+        while pilha:
+            r, c = pilha.pop()
+            rmin, cmin, rmax, cmax = min(rmin, r), min(cmin, c), max(rmax, r), max(cmax, c)
+            for vr in (r - 1, r, r + 1):
+                for vc in (c - 1, c, c + 1):
+                    if 0 <= vr < linhas and 0 <= vc < colunas and mascara[vr, vc] and not visitados[vr, vc]:
+                        visitados[vr, vc] = True
+                        pilha.append((vr, vc))
+        regioes.append((int(rmin), int(cmin), int(rmax) + 1, int(cmax) + 1))
+    return regioes
+
+
+def mesclar_retangulos(retangulos: list[tuple[int, int, int, int]]) -> list[tuple[int, int, int, int]]:
+    """Une retângulos (x0, y0, x1, y1) que se sobrepõem até nenhum par se sobrepor."""
+    retangulos = list(retangulos)
+    mesclou = True
+    while mesclou:
+        mesclou = False
+        for i in range(len(retangulos)):
+            for j in range(i + 1, len(retangulos)):
+                a, b = retangulos[i], retangulos[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    retangulos[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del retangulos[j]
+                    mesclou = True
+                    break
+            if mesclou:
+                break
+    return retangulos
+
+
+class OCRPorTiles:
+    """
+    OCR incremental por monitor. Cada quadro é dividido em tiles de
+    TAMANHO_TILE pixels, com um hash por tile comparado ao do quadro
+    anterior do mesmo monitor. Só os tiles que mudaram, agrupados em
+    regiões com um tile de margem, passam pelo Tesseract; as palavras de
+    cada tile ficam em cache (atribuídas pelo centro da caixa) e as que
+    não encostam em tiles alterados são reaproveitadas. O custo do OCR
+    acompanha o que mudou na tela.
+
+    Uma palavra que encosta numa borda interna do recorte foi cortada e é
+    descartada; se ela toca um tile alterado, o recorte cresce até contê-la
+    e é reconhecido de novo, então o cache nunca guarda fragmentos.
+
+    As regiões de um quadro são reconhecidas em paralelo no pool de OCR
+    (utils.ocr_engine); monitores diferentes podem ser processados ao
+    mesmo tempo (o estado de cada um tem lock próprio).
+    """
+
+    def __init__(self, reconhecer=None, tamanho: int = TAMANHO_TILE):
+        # lista de imagens -> lista de palavras de cada uma
+        self._reconhecer = reconhecer or (lambda imagens: pool_ocr.mapear("palavras", imagens))
+        self.tamanho = tamanho
+        self._monitores = {}  # monitor -> {"lock", "forma", "hashes", "palavras": {(linha, coluna): [...]}}
+        self._lock = threading.Lock()
+        self.estatisticas = {"capturas": 0, "tiles": 0, "tiles_ocr": 0, "regioes": 0}
+
+    def _estado(self, monitor: int) -> dict:
+        with self._lock:
+            return self._monitores.setdefault(
+                monitor, {"lock": threading.Lock(), "forma": None, "hashes": None, "palavras": {}}
+            )
+
+    def texto(self, quadro) -> str:
+        estado = self._estado(quadro.monitor)
+        with estado["lock"]:
+            array = quadro.array
+            hashes = hashes_dos_tiles(array, self.tamanho)
+            if estado["hashes"] is None or estado["hashes"].shape != hashes.shape or estado["forma"] != array.shape:
+                estado["forma"] = array.shape
+                estado["palavras"] = {}
+                sujos = np.ones(hashes.shape, dtype=bool)
+            else:
+                sujos = estado["hashes"] != hashes
+            if sujos.mean() >= LIMITE_TELA_CHEIA:
+                regioes = [(0, 0, hashes.shape[0], hashes.shape[1])]
+            else:
+                regioes = regioes_sujas(sujos)
+
+            retangulos = mesclar_retangulos(self._recorte(quadro, regiao) for regiao in regioes)
+            reconhecidas = self._reconhecer_recortes(quadro, retangulos, sujos)
+
+            # Palavras que tocam um tile alterado saem do cache e voltam pela leitura nova
+            palavras = {
+                tile: restantes
+                for tile, lista in estado["palavras"].items()
+                if (restantes := [p for p in lista if not self._toca_sujo(p, sujos)])
+            }
+            for palavra in reconhecidas:
+                esquerda, topo, largura, altura, _ = palavra
+                tile = (int((topo + altura / 2) // self.tamanho), int((esquerda + largura / 2) // self.tamanho))
+                palavras.setdefault(tile, []).append(palavra)
+            estado["palavras"] = palavras
+            estado["hashes"] = hashes
+            self._contar(hashes.size, int(sujos.sum()), len(retangulos))
+            return montar_texto(p for lista in palavras.values() for p in lista)
+
+    def _recorte(self, quadro, regiao) -> tuple[int, int, int, int]:
+        """Retângulo (x0, y0, x1, y1) da região de tiles com MARGEM_REGIAO tiles em volta."""
+        r0, c0, r1, c1 = regiao
+        t = self.tamanho
+        return (
+            max(0, (c0 - MARGEM_REGIAO) * t),
+            max(0, (r0 - MARGEM_REGIAO) * t),
+            min(quadro.largura, (c1 + MARGEM_REGIAO) * t),
+            min(quadro.altura, (r1 + MARGEM_REGIAO) * t),
+        )
+
+    def _reconhecer_recortes(self, quadro, retangulos, sujos) -> list[tuple]:
+        """
+        Reconhece os recortes em paralelo e retorna, em coordenadas do quadro,
+        as palavras inteiras que tocam algum tile alterado. Recortes com
+        palavras cortadas numa borda interna crescem e são lidos de novo.
+        """
+        imagem = quadro.imagem()
+        margem = MARGEM_REGIAO * self.tamanho
+        lidos = {}
+        while True:
+            pendentes = [r for r in retangulos if r not in lidos]
+            if pendentes:
+                resultados = self._reconhecer([imagem.crop(r) for r in pendentes])
+                for (x0, y0, x1, y1), reconhecidas in zip(pendentes, resultados):
+                    lidos[(x0, y0, x1, y1)] = [
+                        (esquerda + x0, topo + y0, largura, altura, texto)
+                        for esquerda, topo, largura, altura, texto in reconhecidas
+                    ]
+            crescidos = []
+            for retangulo in retangulos:
+                cortadas = [
+                    p for p in lidos[retangulo]
+                    if self._cortada(p, retangulo, quadro) and self._toca_sujo(p, sujos)
+                ]
+                for esquerda, topo, largura, altura, _ in cortadas:
+                    retangulo = (
+                        max(0, min(retangulo[0], esquerda - margem)),
+                        max(0, min(retangulo[1], topo - margem)),
+                        min(quadro.largura, max(retangulo[2], esquerda + largura + margem)),
+                        min(quadro.altura, max(retangulo[3], topo + altura + margem)),
+                    )
+                crescidos.append(retangulo)
+            crescidos = mesclar_retangulos(crescidos)
+            if set(crescidos) == set(retangulos):
+                break
+            retangulos = crescidos
+        return [
+            p for r in retangulos for p in lidos[r]
+            if not self._cortada(p, r, quadro) and self._toca_sujo(p, sujos)
+        ]
+
+    @staticmethod
+    def _cortada(palavra, retangulo, quadro) -> bool:
+        """A caixa encosta numa borda do recorte que não é borda da tela."""
+        esquerda, topo, largura, altura, _ = palavra
+        x0, y0, x1, y1 = retangulo
+        return (
+            (x0 > 0 and esquerda <= x0 + BORDA_RECORTE)
+            or (y0 > 0 and topo <= y0 + BORDA_RECORTE)
+            or (x1 < quadro.largura and esquerda + largura >= x1 - BORDA_RECORTE)
+            or (y1 < quadro.altura and topo + altura >= y1 - BORDA_RECORTE)
+        )
+
+    def _toca_sujo(self, palavra, sujos) -> bool:
+        esquerda, topo, largura, altura, _ = palavra
+        t = self.tamanho
+        linhas = slice(int(topo // t), int((topo + max(altura, 1) - 1) // t) + 1)
+        colunas = slice(int(esquerda // t), int((esquerda + max(largura, 1) - 1) // t) + 1)
+        return bool(sujos[linhas, colunas].any())
+
+    def _contar(self, tiles: int, tiles_ocr: int, regioes: int):
+        e = self.estatisticas
+        with self._lock:
+            e["capturas"] += 1
+            e["tiles"] += tiles
+            e["tiles_ocr"] += tiles_ocr
+            e["regioes"] += regioes
+            relatar = e["capturas"] % INTERVALO_RELATORIO == 0
+        if relatar:
+            log(
+                f"OCR por tiles: {e['capturas']} capturas, {e['tiles_ocr'] / max(e['tiles'], 1):.1%} "
+                f"dos tiles reconhecidos ({e['regioes']} regiões)."
+            )
+
+    def esquecer(self, monitor: int | None = None):
+        """Descarta o cache de um monitor (ou de todos); a próxima captura passa inteira pelo OCR."""
+        with self._lock:
+            estados = list(self._monitores.values()) if monitor is None else [self._monitores.get(monitor)]
+        for estado in estados:
+            if estado is not None:
+                with estado["lock"]:
+                    estado["hashes"] = None
+                    estado["palavras"] = {}
+
+
+ocr_por_tiles = OCRPorTiles()